@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 # dns_switcher.py — Ultimate merged DNS switcher (Chart.js dashboard)
-# Requirements: flask, psutil, requests, dnspython
+# Requirements: flask, psutil, requests, dnspython (opsional: jeepney untuk backend D-Bus di Linux)
 # pip install flask psutil requests dnspython
 
 import os
@@ -15,16 +15,61 @@ import subprocess
 import threading
 import logging
 import csv
-import psutil
-import requests
-import dns.resolver
+import queue
+import sqlite3
+import math
+import ipaddress
+import errno
+import struct
+import socket
+import random
+import heapq
+
+# Dijalankan sebagai script, direktori dns.py ada di sys.path[0] dan file ini menutupi paket dnspython "dns"
+if __name__ in ("__main__", "__mp_main__"):
+    sys.path[:] = [path for path in sys.path if os.path.abspath(path or os.curdir) != os.path.dirname(os.path.abspath(__file__))]
+
+import dns.rcode
+import dns.flags
+import dns.rdatatype
+import dns.exception
+from functools import lru_cache, wraps
+from contextlib import contextmanager
 from statistics import median
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from logging.handlers import RotatingFileHandler
-from flask import Flask, jsonify, render_template_string, request as flask_request
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from shutil import which as shutil_which
+from urllib.parse import urlsplit
 from datetime import datetime
-from collections import deque
+from collections import OrderedDict
+from array import array
+
+try:
+    import resource  # Tidak tersedia di Windows
+except ImportError:
+    resource = None
+
+# [OPTIMASI] flask, psutil, requests, dns.message/dns.resolver/dns.asyncquery, asyncio, ssl, http.client,
+# multiprocessing, argparse dan jeepney tidak di-import di sini, tetapi saat subsistem yang memakainya
+# pertama kali jalan (lihat --bench-startup).
+STARTUP_T0 = time.perf_counter()
+STARTED_AT = time.time()
+
+jeepney = None  # Opsional: backend D-Bus (systemd-resolved / NetworkManager), dimuat oleh load_jeepney()
+
+def load_jeepney():
+    """Import jeepney saat backend D-Bus pertama kali dipilih. False jika paketnya tidak terpasang."""
+    global jeepney, DBusAddress, Properties, new_method_call, message_bus, open_dbus_connection, unwrap_msg
+    if jeepney is None:
+        try:
+            import jeepney as module
+            from jeepney import DBusAddress, Properties, new_method_call
+            from jeepney.bus_messages import message_bus
+            from jeepney.io.blocking import open_dbus_connection
+            from jeepney.wrappers import unwrap_msg
+        except ImportError:
+            return False
+        jeepney = module
+    return True
 
 # -------------------------
 # CONFIG / DEFAULTS
@@ -32,17 +77,58 @@ from collections import deque
 CONFIG_FILE = "config.json"
 STATE_FILE = "dns_state.txt"
 LOG_FILE = "dns_switcher.log"
-CSV_FILE = "dns_history.csv"
+CSV_FILE = "dns_history.csv"  # Format lama, dimigrasikan otomatis ke HISTORY_DB
+HISTORY_DB = "dns_history.db"
+STATS_FILE = "dns_stats.json"
+HISTORY_LEN = 30  # Jumlah titik grafik "Live" di dashboard
 MAX_LOG_BYTES = 10_000_000
 LOG_BACKUPS = 3
+MIN_INTERVAL_S = 30
+MIN_INTERVAL_BUDGET_S = 10
 
 DEFAULT_CONFIG = {
     "interval": 60,
     "threads": 10,
     "dns_query_count": 3,
+    # [OPTIMASI] Jumlah server yang diuji per ronde (0 = semua). Sisanya dijadwalkan oleh bandit UCB.
+    "probe_budget": 10,
+    "probe_explore": 1.0,  # Bobot eksplorasi UCB; lebih besar = server "ekor panjang" lebih sering dicek ulang
+    "probe_max_stale_rounds": 30,  # Server yang tidak diuji selama sekian ronde selalu diuji ulang (0 = nonaktif)
+    "stats_snapshot_s": 300,  # Interval (detik) penyimpanan statistik per server ke STATS_FILE
+    "stats_window": 1024,  # [OPTIMASI] Sampel terakhir per server (ring buffer ~12 byte/sampel) untuk p50/p90/p99 jendela
+    # [OPTIMASI] Retensi history (hari): sampel mentah singkat, sisanya di-rollup per menit/jam/hari (min/avg/p95/max)
+    "history_retention_days": {"raw": 2, "1m": 14, "1h": 180, "1d": 1825},
+    # [OPTIMASI] Hysteresis: ganti DNS hanya jika lebih cepat minimal max(margin_ms, margin_pct% dari DNS aktif)
+    # secara konsisten selama window_s, dan DNS aktif sudah dipakai minimal min_dwell_s.
+    # DNS aktif yang tidak menjawab sama sekali selama missing_rounds ronde berturut-turut diganti tanpa menunggu dwell
+    "switch_policy": {"margin_ms": 5, "margin_pct": 10, "window_s": 120, "min_dwell_s": 600, "missing_rounds": 3},
     "dns_query_timeout_s": 1,
     "dns_query_delay_s": 0,  # [OPTIMASI] Default diubah ke 0 untuk benchmark lebih cepat
     "dns_query_domain": "google.com",
+    "dns_query_port": 53,
+    # [FITUR BARU] Probe cache-busting: query subdomain acak (nonce) di zona ini untuk mengukur latency
+    # resolusi rekursif (cold) terpisah dari latency cache hit (warm). Kosong = nonaktif.
+    "cold_probe_zone": "",
+    "cold_probe_count": 1,  # Jumlah query cold per server per ronde
+    "cold_weight": 0.3,     # Bobot latency cold saat memilih DNS (0 = hanya warm, 1 = hanya cold)
+    # [OPTIMASI] Bobot skor server: median, tail (p90), jitter, dan loss (loss 100% = +timeout ms × bobot)
+    "scoring": {"median": 0.5, "p90": 0.5, "jitter": 0.25, "loss": 1.0},
+    # [OPTIMASI] Engine probe: "async" (satu event loop, semua query dikirim bersamaan) atau "threads" (cara lama)
+    "probe_engine": "async",
+    "probe_concurrency": 256,  # Jumlah maksimum query yang sedang berjalan (in-flight) pada engine async
+    # [OPTIMASI] Hentikan query ke server yang sudah pasti kalah dari pemimpin ronde (engine async)
+    "early_stop": True,
+    # Transport engine async: "udp" (satu socket per address family, multiplex via query ID) atau "dnspython"
+    "probe_transport": "udp",
+    # [FITUR BARU] Probe DoT/DoH untuk server yang punya endpoint terenkripsi; koneksi TLS dipakai ulang antar ronde,
+    # biaya handshake dilaporkan terpisah. endpoints: {"IP": {"dot": "hostname", "doh": "https://host/dns-query"}}
+    "encrypted_probe": {"enabled": False, "transports": ["dot", "doh"], "timeout_s": 2, "ca_file": "", "endpoints": {}},
+    # [OPTIMASI] Cara mengubah DNS: "auto", "networkmanager"/"resolved" (D-Bus, tanpa fork & tanpa reconnect),
+    # "subprocess" (netsh/nmcli/networksetup) atau "fake" (in-memory, untuk uji/benchmark tanpa root)
+    "dns_backend": "auto",
+    "apply_atomic": True,  # Rollback jika DNS hanya berhasil dipasang di sebagian interface
+    "interface_poll_s": 5,  # Interval cek perubahan interface jika rtnetlink tidak tersedia (non-Linux)
+    "verify_timeout_s": 10,  # Batas waktu verifikasi DNS (dicek ulang dengan backoff, tidak memblokir loop utama)
     "use_ipv6": True,
     "auto_disable_ipv6": True,
     "dashboard": {"enabled": True, "host": "127.0.0.1", "port": 8080, "refresh_s": 5},
@@ -50,14 +136,19 @@ DEFAULT_CONFIG = {
     "auto_restart_adapter": True,
     "game_pause": True,
     "game_cache_seconds": 3,
-    "dns_update_url": "",
+    "dns_update_url": "",  # URL daftar DNS tambahan (JSON list / {"ipv4","ipv6"} / teks per baris)
+    "dns_update_interval_s": 21600,  # Interval cek ulang dns_update_url (conditional GET)
     "custom_dns": [],
     "games": [],
     "clear_terminal": True,
     "max_terminal_lines": 100,
     # [FITUR BARU] Opsi mode manual
-    "dns_selection_mode": "auto",  # Opsi: "auto" atau "manual"
+    "dns_selection_mode": "auto",  # Opsi: "auto", "manual" atau "forwarder"
     "manual_dns": ["8.8.8.8"],     # DNS yang digunakan jika mode "manual"
+    # [FITUR BARU] Mode "forwarder": OS diarahkan ke stub resolver lokal yang meneruskan ke server tercepat
+    # dan menyimpan jawaban di cache (LRU, TTL, negative caching, serve-stale)
+    "forwarder": {"listen": "127.0.0.1", "port": 53, "upstreams": 3, "cache_size": 10000,
+                  "max_ttl_s": 86400, "negative_ttl_s": 300, "serve_stale_s": 86400},
 }
 
 # Master DNS lists (expanded)
@@ -88,9 +179,16 @@ GAMES_BASE = ["valorant.exe","csgo.exe","dota2.exe","pubg.exe","apex.exe","fortn
 # -------------------------
 logger = logging.getLogger("dns_switcher")
 logger.setLevel(logging.INFO)
-handler = RotatingFileHandler(LOG_FILE, maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
-handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-logger.addHandler(handler)
+logger.addHandler(logging.NullHandler())  # File log dipasang oleh setup_logging() saat program mulai
+
+def setup_logging():
+    from logging.handlers import RotatingFileHandler
+    if any(isinstance(h, RotatingFileHandler) for h in logger.handlers):
+        return
+    # delay=True: file log baru dibuka saat pesan pertama ditulis
+    handler = RotatingFileHandler(LOG_FILE, maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8", delay=True)
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    logger.addHandler(handler)
 
 def log_info(msg):
     print("ℹ️", msg)
@@ -114,23 +212,217 @@ def show_error_popup(msg):
     except:
         print("❌", msg)
 
+# -------------------------
+# [FITUR BARU] METRICS (format teks Prometheus di /metrics)
+# -------------------------
+METRICS = []
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+        self.values = {}
+        METRICS.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.label_names, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        with self.lock:
+            items = list(self.values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{self._labels(key)} {value}"]
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    metric_type = "gauge"
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def timer(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_value(self, key, value):
+        counts, total, count = value[0][:], value[1], value[2]
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f"{self.name}_bucket{self._labels(key, [('le', bound)])} {cumulative}")
+        lines.append(f"{self.name}_bucket{self._labels(key, [('le', '+Inf')])} {count}")
+        lines.append(f"{self.name}_sum{self._labels(key)} {total}")
+        lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+def timed(histogram):
+    """Decorator: catat durasi fungsi ke histogram."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with histogram.timer():
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+PROBE_LATENCY_SECONDS = Histogram("dns_probe_latency_seconds", "Latency query probe per server", ["server"])
+PROBE_QUERIES_TOTAL = Counter("dns_probe_queries_total", "Query probe per server dan hasilnya (ok/lost)", ["server", "result"])
+TLS_HANDSHAKE_SECONDS = Histogram("dns_tls_handshake_seconds", "Durasi handshake TCP+TLS probe DoT/DoH", ["server", "transport"])
+PROBE_ROUND_SECONDS = Histogram("dns_probe_round_duration_seconds", "Durasi satu ronde probe")
+PROBES_PRUNED_TOTAL = Counter("dns_probes_pruned_total", "Query probe yang dibatalkan oleh early stopping")
+PROBES_IN_FLIGHT = Gauge("dns_probes_in_flight", "Query probe yang sedang berjalan")
+SUBPROCESS_TOTAL = Counter("dns_subprocess_spawns_total", "Jumlah subprocess yang dijalankan per perintah", ["command"])
+SUBPROCESS_SECONDS = Histogram("dns_subprocess_duration_seconds", "Durasi subprocess per perintah", ["command"])
+SET_DNS_SECONDS = Histogram("dns_set_dns_duration_seconds", "Durasi set_dns_on_interface")
+APPLY_SECONDS = Histogram("dns_apply_duration_seconds", "Durasi apply/reset DNS ke semua interface", ["op"])
+VERIFY_SECONDS = Histogram("dns_verify_duration_seconds", "Waktu sampai perubahan DNS terverifikasi (atau deadline)")
+VERIFY_TOTAL = Counter("dns_verify_total", "Hasil verifikasi perubahan DNS", ["result"])
+GAME_CHECK_SECONDS = Histogram("dns_game_check_duration_seconds", "Durasi satu pengecekan game")
+GAME_PIDS_INSPECTED_TOTAL = Counter("dns_game_pids_inspected_total", "PID yang namanya dibaca oleh deteksi game")
+GAME_TRACKED_PIDS = Gauge("dns_game_tracked_pids", "PID yang namanya tersimpan di cache deteksi game")
+GAME_PROC_EVENTS_TOTAL = Counter("dns_game_proc_events_total", "Event exec/comm/exit dari netlink proc connector")
+GAME_PAUSE_SECONDS_TOTAL = Counter("dns_game_pause_seconds_total", "Waktu switching DNS dijeda karena game")
+RESOLVER_SYNC_TOTAL = Counter("dns_resolver_sync_total", "Hasil sinkronisasi dns_update_url", ["result"])
+SWITCH_TOTAL = Counter("dns_switch_total", "Jumlah penggantian DNS", ["result"])
+INTERFACES_ACTIVE = Gauge("dns_interfaces_active", "Jumlah interface jaringan aktif")
+INTERFACE_EVENTS_TOTAL = Counter("dns_interface_events_total", "Event perubahan interface yang diterima", ["source"])
+FORWARDER_QUERIES_TOTAL = Counter("dns_forwarder_queries_total", "Query ke forwarder lokal per hasil (hit/miss/stale/error)", ["result"])
+FORWARDER_QUERY_SECONDS = Histogram("dns_forwarder_query_duration_seconds", "Latency jawaban forwarder lokal", ["result"])
+FORWARDER_CACHE_ENTRIES = Gauge("dns_forwarder_cache_entries", "Jumlah jawaban di cache forwarder")
+STARTUP_SECONDS = Gauge("dns_startup_seconds", "Waktu sejak modul dimuat sampai fase startup selesai", ["phase"])
+DASHBOARD_REQUEST_SECONDS = Histogram("dns_dashboard_request_duration_seconds", "Latency request dashboard per endpoint", ["endpoint"])
+
+def command_label(cmd):
+    parts = cmd.split() if isinstance(cmd, str) else list(cmd)
+    if not parts:
+        return "?"
+    name = os.path.basename(parts[0])
+    return f"{name} {parts[1]}" if len(parts) > 1 and not parts[1].startswith("-") else name
+
+def run_command(cmd, **kwargs):
+    """subprocess.run yang tercatat di metrik (jumlah spawn & durasi per perintah)."""
+    label = command_label(cmd)
+    SUBPROCESS_TOTAL.inc(command=label)
+    with SUBPROCESS_SECONDS.timer(command=label):
+        return subprocess.run(cmd, **kwargs)
+
 # -------------------------
 # load config
 # -------------------------
-def load_config():
+def load_config(strict=False, path=CONFIG_FILE):
+    """strict=True: lempar error jika config.json gagal dibaca (dipakai saat hot reload). path=None: default saja."""
     cfg = DEFAULT_CONFIG.copy()
-    if os.path.exists(CONFIG_FILE):
+    if path and os.path.exists(path):
         try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            with open(path, "r", encoding="utf-8") as f:
                 user = json.load(f)
             cfg.update(user)
         except Exception as e:
-            log_warn(f"Gagal baca {CONFIG_FILE}: {e} — pake default")
+            if strict:
+                raise
+            log_warn(f"Gagal baca {path}: {e} — pake default")
     # validation
-    cfg["interval"] = max(30, cfg.get("interval", 60))
+    cfg["probe_budget"] = max(0, int(cfg.get("probe_budget", 10)))
+    cfg["probe_max_stale_rounds"] = max(0, int(cfg.get("probe_max_stale_rounds", 30)))
+    # Dengan probe_budget aktif, satu ronde jauh lebih ringan sehingga interval boleh lebih pendek
+    cfg["interval"] = max(MIN_INTERVAL_BUDGET_S if cfg["probe_budget"] else MIN_INTERVAL_S, cfg.get("interval", 60))
     cfg["threads"] = max(1, min(50, cfg.get("threads", 10)))
+    cfg["probe_concurrency"] = max(1, int(cfg.get("probe_concurrency", 256)))
+    cfg["stats_window"] = max(1, int(cfg.get("stats_window", 1024)))
+    if cfg.get("probe_engine") not in ["async", "threads"]:
+        log_warn(f"probe_engine '{cfg.get('probe_engine')}' tidak dikenal — pake 'async'")
+        cfg["probe_engine"] = "async"
+    if cfg.get("probe_transport") not in ["udp", "dnspython"]:
+        log_warn(f"probe_transport '{cfg.get('probe_transport')}' tidak dikenal — pake 'udp'")
+        cfg["probe_transport"] = "udp"
+    if cfg.get("dns_backend") not in ["auto", "networkmanager", "resolved", "subprocess", "fake"]:
+        log_warn(f"dns_backend '{cfg.get('dns_backend')}' tidak dikenal — pake 'auto'")
+        cfg["dns_backend"] = "auto"
     if "games" not in cfg:
         cfg["games"] = []
+    cfg["switch_policy"] = {**DEFAULT_CONFIG["switch_policy"], **(cfg.get("switch_policy") or {})}
+    cfg["switch_policy"]["missing_rounds"] = max(1, int(cfg["switch_policy"]["missing_rounds"]))
+    cfg["forwarder"] = {**DEFAULT_CONFIG["forwarder"], **(cfg.get("forwarder") or {})}
+    cfg["scoring"] = {key: max(0.0, float(value)) for key, value in
+                      {**DEFAULT_CONFIG["scoring"], **(cfg.get("scoring") or {})}.items() if key in DEFAULT_CONFIG["scoring"]}
+    cfg["encrypted_probe"] = {**DEFAULT_CONFIG["encrypted_probe"], **(cfg.get("encrypted_probe") or {})}
+    cfg["encrypted_probe"]["transports"] = [t for t in cfg["encrypted_probe"]["transports"] if t in ("dot", "doh")]
+    if cfg.get("dns_selection_mode") not in ["auto", "manual", "forwarder"]:
+        log_warn(f"dns_selection_mode '{cfg.get('dns_selection_mode')}' tidak dikenal — pake 'auto'")
+        cfg["dns_selection_mode"] = "auto"
+    cfg["history_retention_days"] = {**DEFAULT_CONFIG["history_retention_days"], **(cfg.get("history_retention_days") or {})}
+    # Semua tier rollup dihitung dari sampel mentah, jadi sampel mentah harus bertahan minimal 2 hari
+    cfg["history_retention_days"]["raw"] = max(2, cfg["history_retention_days"]["raw"])
+    cfg["dns_update_interval_s"] = max(300, int(cfg.get("dns_update_interval_s", 21600)))
+    cfg["verify_timeout_s"] = max(0.5, float(cfg.get("verify_timeout_s", 10)))
+    cfg["cold_probe_zone"] = (cfg.get("cold_probe_zone") or "").strip(".")
+    cfg["cold_weight"] = min(1.0, max(0.0, float(cfg.get("cold_weight", 0.3))))
 
     # [PERBAIKAN KEAMANAN] Peringatan jika dashboard diekspos ke jaringan
     if cfg.get("dashboard", {}).get("enabled") and cfg.get("dashboard", {}).get("host") not in ["127.0.0.1", "localhost"]:
@@ -138,16 +430,143 @@ def load_config():
         
     return cfg
 
-config = load_config()
+config = load_config(path=None)  # config.json dibaca oleh startup(), bukan saat modul di-import
+
+REMOTE_DNS = []  # Diisi oleh ResolverListSync dari dns_update_url
 
-# merge DNS lists (master + custom)
+# merge DNS lists (master + custom + remote)
 def build_dns_list():
-    v4 = list(dict.fromkeys(DNS_IPV4_MASTER + [d for d in config.get("custom_dns", []) if ":" not in d]))
-    v6 = list(dict.fromkeys(DNS_IPV6_MASTER + [d for d in config.get("custom_dns", []) if ":" in d]))
+    extra = config.get("custom_dns", []) + REMOTE_DNS
+    v4 = list(dict.fromkeys(DNS_IPV4_MASTER + [d for d in extra if ":" not in d]))
+    v6 = list(dict.fromkeys(DNS_IPV6_MASTER + [d for d in extra if ":" in d]))
     return v4, v6
 
 DNS_IPV4, DNS_IPV6 = build_dns_list()
 
+# -------------------------
+# [FITUR BARU] Sinkronisasi daftar DNS dari dns_update_url
+# -------------------------
+RESOLVER_CACHE_FILE = "dns_resolvers_cache.json"
+RESOLVER_FETCH_TIMEOUT_S = 10
+
+def parse_resolver_list(text):
+    """Terima JSON (list, {"servers": [...]}, {"ipv4": [...], "ipv6": [...]}) atau teks satu alamat per baris.
+
+    Entri divalidasi & dinormalisasi (mis. IPv6 dipendekkan) lalu dideduplikasi dengan urutan tetap.
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = [line.split("#", 1)[0].strip() for line in text.splitlines()]
+    if isinstance(data, dict):
+        data = list(data.get("servers", [])) + list(data.get("ipv4", [])) + list(data.get("ipv6", []))
+    if not isinstance(data, list):
+        raise ValueError("format daftar DNS tidak dikenal")
+    servers = {}
+    for entry in data:
+        if not isinstance(entry, str) or not entry:
+            continue
+        try:
+            address = ipaddress.ip_address(entry.strip())
+        except ValueError:
+            continue
+        if address.is_multicast or address.is_unspecified:
+            continue
+        servers.setdefault(str(address), None)
+    return list(servers)
+
+class ResolverListSync:
+    """Ambil daftar DNS dari dns_update_url di background.
+
+    Cache di disk dimuat dulu sehingga startup tidak pernah menunggu jaringan. Request
+    berikutnya memakai ETag / Last-Modified (conditional GET) lewat satu requests.Session,
+    jadi daftar yang tidak berubah hanya memakan satu respons 304.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.session = None
+        self.cache = {}
+        self.wake = threading.Event()
+        self.thread = None
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                self.cache = json.load(f)
+        except (OSError, ValueError):
+            self.cache = {}
+
+    def _save_cache(self):
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.cache, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _merge(self, servers):
+        global REMOTE_DNS, DNS_IPV4, DNS_IPV6
+        REMOTE_DNS = servers
+        DNS_IPV4, DNS_IPV6 = build_dns_list()
+
+    def start(self):
+        url = config.get("dns_update_url")
+        if not url:
+            return
+        self._load_cache()
+        if self.cache.get("url") == url and self.cache.get("servers"):
+            self._merge(self.cache["servers"])
+            log_info(f"Daftar DNS dari cache: {len(self.cache['servers'])} server.")
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._loop, daemon=True)
+            self.thread.start()
+
+    def trigger(self):
+        """Sinkron segera (mis. setelah dns_update_url berubah saat hot reload)."""
+        if self.thread is None:
+            self.start()
+        self.wake.set()
+
+    def _loop(self):
+        while True:
+            if config.get("dns_update_url"):
+                try:
+                    self.sync()
+                except Exception as e:
+                    RESOLVER_SYNC_TOTAL.inc(result="error")
+                    log_warn(f"Sinkronisasi daftar DNS gagal: {e}")
+            self.wake.wait(config.get("dns_update_interval_s", 21600))
+            self.wake.clear()
+
+    def sync(self):
+        url = config["dns_update_url"]
+        if self.session is None:
+            import requests
+            self.session = requests.Session()
+            self.session.headers["User-Agent"] = "dns-switcher"
+        headers = {}
+        if self.cache.get("url") == url:
+            if self.cache.get("etag"):
+                headers["If-None-Match"] = self.cache["etag"]
+            if self.cache.get("last_modified"):
+                headers["If-Modified-Since"] = self.cache["last_modified"]
+        response = self.session.get(url, headers=headers, timeout=RESOLVER_FETCH_TIMEOUT_S)
+        if response.status_code == 304:
+            RESOLVER_SYNC_TOTAL.inc(result="not_modified")
+            return False
+        response.raise_for_status()
+        servers = parse_resolver_list(response.text)
+        if not servers:
+            raise ValueError("daftar DNS kosong atau tidak valid")
+        self.cache = {"url": url, "etag": response.headers.get("ETag"),
+                      "last_modified": response.headers.get("Last-Modified"), "servers": servers}
+        self._save_cache()
+        self._merge(servers)
+        RESOLVER_SYNC_TOTAL.inc(result="updated")
+        log_info(f"Daftar DNS diperbarui dari {url}: {len(servers)} server.")
+        return True
+
+resolver_sync = ResolverListSync(RESOLVER_CACHE_FILE)
+
 # -------------------------
 # admin check (cross-platform)
 # -------------------------
@@ -173,7 +592,7 @@ def check_ipv6_connectivity():
         else: # Linux, Darwin
             cmd = ["ping6", "-c", "1", "2001:4860:4860::8888"]
         
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
+        result = run_command(cmd, capture_output=True, text=True, timeout=5)
         if result.returncode == 0:
             log_info("✓ Konektivitas IPv6 terdeteksi.")
             return True
@@ -194,7 +613,7 @@ def get_interfaces():
     try:
         if system == "Windows":
             # Metode utama: 'netsh' untuk mendapatkan nama interface yang terhubung
-            out = subprocess.run(["netsh", "interface", "show", "interface"], capture_output=True, text=True, encoding="utf-8")
+            out = run_command(["netsh", "interface", "show", "interface"], capture_output=True, text=True, encoding="utf-8")
             for line in out.stdout.splitlines():
                 if "Connected" in line or "Terhubung" in line:
                     parts = line.split()
@@ -204,7 +623,7 @@ def get_interfaces():
         elif system in ["Linux", "Darwin"]:
             # Metode utama: 'nmcli' untuk Linux jika tersedia, ini lebih andal
             if shutil_which("nmcli"):
-                out = subprocess.run(["nmcli", "-t", "-f", "DEVICE,STATE", "device"], capture_output=True, text=True)
+                out = run_command(["nmcli", "-t", "-f", "DEVICE,STATE", "device"], capture_output=True, text=True)
                 for line in out.stdout.splitlines():
                     if ":" in line:
                         dev, state = line.split(":", 1)
@@ -212,207 +631,2441 @@ def get_interfaces():
                             interfaces.append(dev.strip())
             else: 
                 # Fallback untuk sistem non-nmcli (Linux dasar atau BSD)
-                out = subprocess.run(["ip", "link", "show", "up"], capture_output=True, text=True)
+                out = run_command(["ip", "link", "show", "up"], capture_output=True, text=True)
                 for line in out.stdout.splitlines():
-                    m = re.match(r"\d+: (\S+): <", line)
+                    m = re.match(r"\d+: ([^:@\s]+)(?:@\S+)?: <", line)  # veth/vlan: "nama@induk"
                     if m and m.group(1) != 'lo':
                         interfaces.append(m.group(1))
     except Exception as e:
         log_warn(f"get_interfaces error: {e}")
     return interfaces
 
+# [OPTIMASI] Registry interface aktif. Linux: event rtnetlink (link/alamat) memicu refresh;
+# OS lain: diff psutil.net_if_stats() berkala. get_interfaces() hanya dipanggil saat ada perubahan.
+NETLINK_ROUTE = 0
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+RTM_NEWLINK, RTM_DELLINK, RTM_NEWADDR, RTM_DELADDR = 16, 17, 20, 21
+INTERFACE_DEBOUNCE_S = 0.5  # Satu refresh untuk satu "ledakan" event (mis. VPN naik = link + beberapa alamat)
+
+class InterfaceRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.interfaces = []
+        self.dirty = threading.Event()
+        self.callbacks = []
+        self.source = None
+        self.refreshes = 0
+
+    def active(self):
+        with self.lock:
+            return list(self.interfaces)
+
+    def on_change(self, callback):
+        """callback(added, removed) dipanggil dari thread registry setiap kali daftar interface berubah."""
+        self.callbacks.append(callback)
+
+    def start(self):
+        self.refresh()
+        if self.source is None:
+            self.source = "netlink" if self._start_netlink() else "poll"
+            if self.source == "poll":
+                threading.Thread(target=self._poll_loop, daemon=True).start()
+            threading.Thread(target=self._refresh_loop, daemon=True).start()
+        return self.active()
+
+    def refresh(self):
+        current = get_interfaces()
+        with self.lock:
+            previous = self.interfaces
+            self.interfaces = current
+            self.refreshes += 1
+        INTERFACES_ACTIVE.set(len(current))
+        added = [i for i in current if i not in previous]
+        removed = [i for i in previous if i not in current]
+        if self.refreshes > 1 and (added or removed):
+            log_info(f"Interface berubah: +{added or '-'} / -{removed or '-'}")
+            for callback in self.callbacks:
+                try:
+                    callback(added, removed)
+                except Exception as e:
+                    log_warn(f"Callback interface error: {e}")
+        return current
+
+    def _refresh_loop(self):
+        while True:
+            self.dirty.wait()
+            time.sleep(INTERFACE_DEBOUNCE_S)
+            self.dirty.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                log_warn(f"Refresh interface gagal: {e}")
+
+    def _start_netlink(self):
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+        except (OSError, AttributeError) as e:
+            log_warn(f"rtnetlink tidak tersedia, interface dipantau dengan polling: {e}")
+            return False
+        threading.Thread(target=self._netlink_loop, args=(sock,), daemon=True).start()
+        return True
+
+    def _netlink_loop(self, sock):
+        while True:
+            try:
+                data = sock.recv(65536)
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    self.dirty.set()  # Event hilang: refresh penuh
+                    continue
+                log_warn(f"rtnetlink berhenti, fallback ke polling: {e}")
+                self.source = "poll"
+                self._poll_loop()
+                return
+            offset = 0
+            while offset + 16 <= len(data):
+                msg_len, msg_type = struct.unpack_from("=IH", data, offset)
+                if msg_len < 16:
+                    break
+                if msg_type in (RTM_NEWLINK, RTM_DELLINK, RTM_NEWADDR, RTM_DELADDR):
+                    INTERFACE_EVENTS_TOTAL.inc(source="netlink")
+                    self.dirty.set()
+                offset += (msg_len + 3) & ~3
+
+    @staticmethod
+    def _link_state():
+        try:
+            import psutil
+            return {name: stats.isup for name, stats in psutil.net_if_stats().items()}
+        except Exception:
+            return None
+
+    def _poll_loop(self):
+        last = self._link_state()
+        while True:
+            time.sleep(config.get("interface_poll_s", 5))
+            state = self._link_state()
+            if state != last:
+                INTERFACE_EVENTS_TOTAL.inc(source="poll")
+                self.dirty.set()
+            last = state
+
+interface_registry = InterfaceRegistry()
+
 # -------------------------
 # Latency Test using DNS Query
 # -------------------------
-def test_dns_latency(dns_server):
+NONCE_LABEL_LEN = 16
+
+def make_nonce_name(zone):
+    """Nama acak di bawah zona cold probe, dijamin tidak ada di cache resolver."""
+    return f"{random.getrandbits(64):016x}.{zone}"
+
+def ns_to_ms(elapsed_ns):
+    """Durasi perf_counter_ns -> ms dengan resolusi mikrodetik."""
+    return round(elapsed_ns / 1e6, 3)
+
+def collect_dns_samples(dns_server, cold=False):
+    """Jalankan query berurutan; kembalikan list latency ms (None = gagal).
+
+    cold=True mengirim cold_probe_count query ke nama nonce di cold_probe_zone;
+    NXDOMAIN dihitung berhasil karena resolver tetap harus melakukan rekursi.
+    """
+    import dns.resolver  # Hanya engine "threads" yang memakai resolver dnspython
     resolver = dns.resolver.Resolver(configure=False)
     resolver.nameservers = [dns_server]
+    resolver.port = config.get("dns_query_port", 53)
     resolver.timeout = config.get("dns_query_timeout_s", 1)
     resolver.lifetime = config.get("dns_query_timeout_s", 1)
     domain_to_query = config.get("dns_query_domain", "google.com")
     
-    query_count = max(1, config.get("dns_query_count", 3))
+    if cold:
+        query_count = max(1, config.get("cold_probe_count", 1))
+    else:
+        query_count = max(1, config.get("dns_query_count", 3))
     delay_s = config.get("dns_query_delay_s", 0)
-    latencies = []
+    samples = []
     
     for _ in range(query_count):
         try:
-            start_time = time.monotonic()
-            resolver.resolve(domain_to_query, 'A')
-            end_time = time.monotonic()
-            latencies.append(int((end_time - start_time) * 1000))
+            PROBES_IN_FLIGHT.inc()
+            start_ns = time.perf_counter_ns()
+            try:
+                resolver.resolve(make_nonce_name(config["cold_probe_zone"]) if cold else domain_to_query, 'A')
+            except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+                if not cold:
+                    raise
+            finally:
+                PROBES_IN_FLIGHT.dec()
+            samples.append(ns_to_ms(time.perf_counter_ns() - start_ns))
         # [BUG FIX] Menangkap exception yang lebih spesifik, bukan Exception umum
         except (dns.resolver.Timeout, dns.resolver.NoNameservers, dns.exception.DNSException):
-            # Gagal resolve dianggap latensi tak terhingga, jadi kita abaikan
-            pass
+            # Gagal resolve dicatat sebagai None (loss)
+            samples.append(None)
         if delay_s > 0:
             time.sleep(delay_s)
+    return samples
+
+def summarize_samples(samples):
+    """Ubah {server: [latency|None, ...]} menjadi {server: median latency ms} untuk server yang merespons."""
+    results = {}
+    for dns_server, latencies in samples.items():
+        latencies = [latency for latency in latencies if latency is not None]
+        if latencies:
+            results[dns_server] = round(median(latencies), 3)
+    return results
+
+def quantile(sorted_values, q):
+    """Kuantil dengan interpolasi linear dari list yang sudah diurutkan."""
+    position = (len(sorted_values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+class ScoringEngine:
+    """[OPTIMASI] Skor per server dari sampel satu ronde; lebih kecil = lebih baik.
+
+    skor = w_median·median + w_p90·p90 + w_jitter·jitter + w_loss·loss·timeout_ms
+
+    Query yang gagal ikut dihitung lewat loss (dan p90), sehingga server yang hanya
+    menjawab 1 dari 3 query tidak lagi menang hanya karena satu jawabannya cepat.
+    Bobot diatur lewat config "scoring"; cold probe digabung memakai cold_weight.
+    """
+
+    def __init__(self):
+        self.last = {}  # server -> rincian ronde terakhir (median/p90/jitter/loss/score)
+
+    @staticmethod
+    def details(latencies, weights, timeout_ms):
+        ok = [latency for latency in latencies if latency is not None]
+        if not ok:
+            return None
+        ordered = sorted(ok)
+        # Jitter: rata-rata selisih absolut antar sampel berurutan (urutan kirim, seperti RFC 3550)
+        jitter = sum(abs(b - a) for a, b in zip(ok, ok[1:])) / (len(ok) - 1) if len(ok) > 1 else 0.0
+        loss = 1 - len(ok) / len(latencies)
+        # Query yang hilang ikut menarik p90 ke arah timeout
+        tail = quantile(sorted(ordered + [timeout_ms] * (len(latencies) - len(ok))), 0.9)
+        middle = quantile(ordered, 0.5)
+        score = (weights["median"] * middle + weights["p90"] * tail
+                 + weights["jitter"] * jitter + weights["loss"] * loss * timeout_ms)
+        return {"median_ms": round(middle, 3), "p90_ms": round(tail, 3), "jitter_ms": round(jitter, 3),
+                "loss": round(loss, 3), "score": round(score, 3)}
+
+    @staticmethod
+    def worst_score(weights, timeout_ms):
+        """Batas atas skor: median, p90 dan jitter = timeout, semua query hilang."""
+        return (weights["median"] + weights["p90"] + weights["jitter"] + weights["loss"]) * timeout_ms
+
+    def server_details(self, warm, cold, weights, timeout_ms):
+        """Rincian satu server; cold=None jika cold probe tidak dipakai."""
+        entry = self.details(warm, weights, timeout_ms)
+        cold_weight = config.get("cold_weight", 0.3)
+        if entry is not None and cold is not None and cold_weight > 0:
+            # Server yang gagal di semua query cold dihitung dengan skor cold = timeout
+            cold_entry = self.details(cold or [None], weights, timeout_ms)
+            entry["cold_score"] = cold_entry["score"] if cold_entry else timeout_ms
+            entry["score"] = round((1 - cold_weight) * entry["score"] + cold_weight * entry["cold_score"], 3)
+        return entry
+
+    @staticmethod
+    def lower_bound(known, pending_ms, weights, timeout_ms):
+        """Skor terkecil yang masih mungkin dicapai jika sebagian query masih berjalan.
+
+        known: hasil yang sudah selesai (ms / None), pending_ms: umur query yang belum selesai.
+        Query yang belum menjawab paling cepat menjawab sekarang (latency >= umurnya) atau
+        hilang; median & p90 naik monoton terhadap latency, jadi cukup dicek "k query tercepat
+        menjawab sekarang, sisanya hilang" untuk setiap k. Jitter dianggap 0.
+        """
+        answered = [latency for latency in known if latency is not None]
+        lost = len(known) - len(answered)
+        total = len(known) + len(pending_ms)
+        pending_ms = sorted(pending_ms)
+        best = math.inf
+        for k in range(len(pending_ms) + 1):
+            ok = sorted(answered + pending_ms[:k])
+            if not ok:
+                continue
+            losses = lost + len(pending_ms) - k
+            tail = quantile(sorted(ok + [timeout_ms] * losses), 0.9)
+            best = min(best, weights["median"] * quantile(ok, 0.5) + weights["p90"] * tail
+                       + weights["loss"] * losses / total * timeout_ms)
+        return best
+
+    def score(self, samples, cold_samples=None):
+        """{server: [latency|None, ...]} -> {server: skor} untuk server yang menjawab minimal sekali."""
+        weights = config["scoring"]
+        timeout_ms = config.get("dns_query_timeout_s", 1) * 1000
+        use_cold = bool(cold_samples)
+        details = {}
+        for dns_server, latencies in samples.items():
+            entry = self.server_details(latencies, cold_samples.get(dns_server, []) if use_cold else None, weights, timeout_ms)
+            if entry is not None:
+                details[dns_server] = entry
+        self.last = details
+        return {dns_server: entry["score"] for dns_server, entry in details.items()}
+
+scoring_engine = ScoringEngine()
+
+def test_dns_latency(dns_server):
+    return summarize_samples({dns_server: collect_dns_samples(dns_server)}).get(dns_server)
+
+# -------------------------
+# [OPTIMASI] Multiplexed UDP prober
+# -------------------------
+class UDPMultiplexProber:
+    """Satu socket UDP jangka panjang per address family untuk semua probe.
+
+    Paket query dibangun sekali lalu hanya ID-nya yang diganti. Balasan dicocokkan
+    dengan query lewat (ID pesan DNS, alamat sumber), dan waktu diukur per paket
+    saat socket terbaca, bukan saat coroutine dilanjutkan.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.sockets = {}
+        self.pending = {}
+        self.templates = {}
+
+    def _socket(self, family):
+        sock = self.sockets.get(family)
+        if sock is None:
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            except OSError:
+                pass
+            sock.bind(("::", 0) if family == socket.AF_INET6 else ("0.0.0.0", 0))
+            self.loop.add_reader(sock.fileno(), self._on_readable, sock, family)
+            self.sockets[family] = sock
+        return sock
+
+    def _template(self, domain, rdtype):
+        wire = self.templates.get((domain, rdtype))
+        if wire is None:
+            import dns.message
+            wire = dns.message.make_query(domain, rdtype).to_wire()
+            self.templates[(domain, rdtype)] = wire
+        return wire
+
+    def _packet(self, query_id, domain, rdtype, nonce):
+        if not nonce:
+            return query_id.to_bytes(2, "big") + self._template(domain, rdtype)[2:]
+        # Template nonce: label pertama (offset 13) diganti label acak dengan panjang sama
+        template = self._template("x" * NONCE_LABEL_LEN + "." + domain, rdtype)
+        label = f"{random.getrandbits(64):016x}".encode()
+        return query_id.to_bytes(2, "big") + template[2:13] + label + template[13 + NONCE_LABEL_LEN:]
+
+    def _allocate_id(self, addr):
+        while True:
+            query_id = random.getrandbits(16)
+            if (query_id, addr) not in self.pending:
+                return query_id
+
+    def _on_readable(self, sock, family):
+        while True:
+            try:
+                data, src = sock.recvfrom(4096)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionResetError:
+                # Windows melaporkan ICMP port unreachable lewat recvfrom
+                continue
+            except OSError:
+                return
+            received_at = time.perf_counter_ns()
+            # Abaikan paket yang bukan response DNS
+            if len(data) < 12 or not data[2] & 0x80:
+                continue
+            try:
+                addr = socket.inet_pton(family, src[0].split("%", 1)[0])
+            except OSError:
+                continue
+            entry = self.pending.pop(((data[0] << 8) | data[1], addr), None)
+            if entry is None:
+                continue
+            future, sent_at = entry
+            if not future.done():
+                future.set_result((data[3] & 0x0F, received_at - sent_at))
+
+    async def query(self, dns_server, domain, rdtype, timeout, nonce=False):
+        """Kirim satu query; kembalikan (rcode, latency_ns) atau None jika timeout/gagal.
+
+        nonce=True mengirim query ke subdomain acak dari 'domain' (cold probe).
+        """
+        import asyncio
+        family = socket.AF_INET6 if ":" in dns_server else socket.AF_INET
+        try:
+            addr = socket.inet_pton(family, dns_server)
+            sock = self._socket(family)
+        except OSError:
+            return None
+        query_id = self._allocate_id(addr)
+        packet = self._packet(query_id, domain, rdtype, nonce)
+        future = self.loop.create_future()
+        key = (query_id, addr)
+        self.pending[key] = (future, time.perf_counter_ns())
+        try:
+            sock.sendto(packet, (dns_server, config.get("dns_query_port", 53)))
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, OSError):
+            return None
+        finally:
+            self.pending.pop(key, None)
+
+    def close(self):
+        for sock in self.sockets.values():
+            self.loop.remove_reader(sock.fileno())
+            sock.close()
+        self.sockets.clear()
+
+# -------------------------
+# [OPTIMASI] Async probe engine
+# -------------------------
+PENDING = object()  # Penanda query yang belum selesai dalam satu ronde
+RACE_CHECK_S = 0.005  # Interval pengecekan early stopping
+RACE_CHUNK = 8  # Batas bawah yang dihitung sebelum memberi giliran ke event loop (penerimaan balasan)
+
+class AsyncProbeEngine:
+    """Menguji banyak server sekaligus dalam satu event loop.
+
+    Semua query ke semua server dikirim bersamaan, dibatasi oleh jumlah query
+    in-flight ('probe_concurrency'). Satu ronde selesai dalam kira-kira satu
+    timeout, tanpa membuat thread baru setiap ronde.
+    """
+
+    def __init__(self, concurrency):
+        import asyncio  # Hanya engine probe async dan forwarder yang memakai event loop
+        self.loop = asyncio.new_event_loop()
+        self.concurrency = max(1, int(concurrency))
+        self.prober = UDPMultiplexProber(self.loop)
+        self.pruned = {}  # server -> batas bawah skor saat dihentikan (ronde terakhir)
+        self.leader = math.inf  # Skor terkecil server yang sudah selesai (ronde berjalan)
+        self.changed = set()    # Server dengan query gagal sejak pengecekan early stopping terakhir
+
+    def collect(self, servers, pinned=()):
+        """Jalankan satu ronde probe; kembalikan (warm, cold) masing-masing {server: [latency_ms|None, ...]}.
+
+        Server di 'pinned' (DNS aktif) tidak pernah dihentikan early stopping, supaya
+        SwitchPolicy selalu punya skor lengkap untuk dibandingkan dengan margin.
+        """
+        return self.loop.run_until_complete(self._round(list(servers), set(pinned)))
+
+    async def _round(self, servers, pinned=frozenset()):
+        import asyncio
+        semaphore = asyncio.Semaphore(self.concurrency)
+        cold = bool(config.get("cold_probe_zone"))
+        query_count = max(1, config.get("dns_query_count", 3))
+        cold_count = max(1, config.get("cold_probe_count", 1)) if cold else 0
+        # Per server: hasil per query (PENDING = belum selesai) dan waktu kirimnya (ns)
+        states = {server: {"results": [PENDING] * (query_count + cold_count), "sent": [None] * (query_count + cold_count),
+                           "score": None, "final": False, "pruned": False} for server in servers}
+        tasks = {server: asyncio.ensure_future(self._probe_server(semaphore, server, states[server], query_count))
+                 for server in servers}
+        self.pruned = {}
+        self.leader = math.inf
+        self.changed = set()
+        race = asyncio.ensure_future(self._race(states, tasks, query_count, pinned)) if config.get("early_stop", True) and len(servers) > 1 else None
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        if race is not None:
+            race.cancel()
+        warm_samples, cold_samples = {}, {}
+        for server, state in states.items():
+            if state["pruned"]:
+                # Jawaban parsial server yang dihentikan tidak boleh dinilai (tanpa query yang hilang
+                # skornya jadi terlalu bagus); yang dipakai hanya batas bawah di self.pruned
+                continue
+            warm = [result for result in state["results"][:query_count] if result is not PENDING]
+            if warm:
+                warm_samples[server] = warm
+            if cold:
+                cold_samples[server] = [result for result in state["results"][query_count:] if result is not PENDING]
+        return warm_samples, cold_samples
+
+    async def _probe_server(self, semaphore, dns_server, state, query_count):
+        import asyncio
+        delay_s = config.get("dns_query_delay_s", 0)
+        tasks = []
+        for i in range(len(state["results"])):
+            if i and delay_s > 0:
+                await asyncio.sleep(delay_s)
+            tasks.append(asyncio.ensure_future(self._query(semaphore, dns_server, state, i, cold=i >= query_count)))
+        try:
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
+        results = state["results"]
+        weights = config["scoring"]
+        timeout_ms = config.get("dns_query_timeout_s", 1) * 1000
+        entry = scoring_engine.server_details(results[:query_count], results[query_count:] if len(results) > query_count else None,
+                                              weights, timeout_ms)
+        state["score"] = entry["score"] if entry else None
+        state["final"] = True
+        if state["score"] is not None and state["score"] < self.leader:
+            self.leader = state["score"]
+
+    async def _race(self, states, tasks, query_count, pinned=frozenset()):
+        """[OPTIMASI] Early stopping: batalkan server yang skor terbaiknya pun sudah kalah dari pemimpin.
+
+        Pemimpin = server yang semua query-nya selesai dengan skor terkecil. Server lain
+        dihentikan begitu batas bawah skornya (lihat ScoringEngine.lower_bound) melewati
+        skor pemimpin, sehingga ronde selesai mengikuti server tercepat, bukan timeout.
+        Server pinned tetap diuji sampai selesai, tetapi boleh menjadi pemimpin.
+
+        Loop ini berbagi event loop dengan pengukuran latency, jadi tidak boleh menyapu
+        semua server setiap tick. Batas bawah naik paling cepat (w_median + w_p90) per ms
+        umur query, jadi setiap server disimpan di heap dengan kunci batas - laju·t dan
+        hanya dihitung ulang saat kunci > pemimpin - laju·sekarang (batasnya mungkin sudah
+        melewati pemimpin), atau lebih awal jika ada query yang gagal (batas melompat naik).
+        Perhitungan dipecah per RACE_CHUNK agar balasan yang masuk tetap dibaca tepat waktu.
+        """
+        import asyncio
+        weights = config["scoring"]
+        timeout_ms = config.get("dns_query_timeout_s", 1) * 1000
+        cold_weight = config.get("cold_weight", 0.3)
+        rate = weights["median"] + weights["p90"]
+        active = {server: state for server, state in states.items() if server not in pinned}
+        # Awal ronde: batas bawah semua server >= 0
+        start_ms = time.perf_counter_ns() / 1e6
+        heap = [(rate * start_ms, 0, server) for server in active]  # (-kunci, versi, server)
+        heapq.heapify(heap)
+        versions = dict.fromkeys(active, 0)  # server -> versi entri heap yang masih berlaku
+        while active:
+            await asyncio.sleep(RACE_CHECK_S)
+            leader = self.leader
+            if leader == math.inf:
+                continue
+            threshold = leader - rate * time.perf_counter_ns() / 1e6
+            due = {server for server in self.changed if server in active}
+            self.changed.clear()
+            while heap and -heap[0][0] > threshold:
+                _, version, server = heapq.heappop(heap)
+                if server in active and versions[server] == version:
+                    due.add(server)
+            for i, server in enumerate(due):
+                if i % RACE_CHUNK == 0:
+                    if i:
+                        await asyncio.sleep(0)
+                    leader = self.leader
+                    now_ns = time.perf_counter_ns()
+                    now_ms = now_ns / 1e6
+                state = active.get(server)
+                if state is None:
+                    continue
+                if state["final"]:
+                    del active[server]
+                    continue
+                bound = self._lower_bound(state, now_ns, query_count, weights, timeout_ms, cold_weight)
+                if bound > leader:
+                    del active[server]
+                    state["pruned"] = True
+                    self.pruned[server] = round(bound, 3) if bound != math.inf else timeout_ms
+                    PROBES_PRUNED_TOTAL.inc(sum(1 for result in state["results"] if result is PENDING))
+                    tasks[server].cancel()
+                else:
+                    versions[server] += 1
+                    heapq.heappush(heap, (-(bound - rate * now_ms), versions[server], server))
+
+    @staticmethod
+    def _lower_bound(state, now_ns, query_count, weights, timeout_ms, cold_weight):
+        def split(results, sent):
+            known, pending = [], []
+            for result, sent_ns in zip(results, sent):
+                if result is not PENDING:
+                    known.append(result)
+                else:
+                    pending.append(0.0 if sent_ns is None else min(timeout_ms, (now_ns - sent_ns) / 1e6))
+            return known, pending
+        bound = ScoringEngine.lower_bound(*split(state["results"][:query_count], state["sent"][:query_count]), weights, timeout_ms)
+        if len(state["results"]) > query_count and cold_weight > 0 and bound != math.inf:
+            cold_known, cold_pending = split(state["results"][query_count:], state["sent"][query_count:])
+            cold_bound = ScoringEngine.lower_bound(cold_known, cold_pending, weights, timeout_ms)
+            bound = (1 - cold_weight) * bound + cold_weight * min(cold_bound, timeout_ms)
+        return bound
+
+    async def _query(self, semaphore, dns_server, state, index, cold=False):
+        timeout = config.get("dns_query_timeout_s", 1)
+        domain = config["cold_probe_zone"] if cold else config.get("dns_query_domain", "google.com")
+        async with semaphore:
+            PROBES_IN_FLIGHT.inc()
+            state["sent"][index] = time.perf_counter_ns()
+            try:
+                result = await self._send(dns_server, domain, timeout, cold)
+            finally:
+                PROBES_IN_FLIGHT.dec()
+        if result is not None:
+            rcode, elapsed_ns = result
+            # Untuk cold probe, NXDOMAIN adalah jawaban valid hasil rekursi
+            result = ns_to_ms(elapsed_ns) if rcode == dns.rcode.NOERROR or (cold and rcode == dns.rcode.NXDOMAIN) else None
+        state["results"][index] = result
+        if result is None:
+            self.changed.add(dns_server)
+
+    async def _send(self, dns_server, domain, timeout, cold):
+        """Kirim satu query lewat transport yang dipilih; kembalikan (rcode, latency_ns) atau None."""
+        if config.get("probe_transport", "udp") == "udp":
+            return await self.prober.query(dns_server, domain, 'A', timeout, nonce=cold)
+        import dns.asyncquery
+        import dns.message
+        try:
+            query = dns.message.make_query(make_nonce_name(domain) if cold else domain, 'A')
+            start_ns = time.perf_counter_ns()
+            response = await dns.asyncquery.udp(query, dns_server, timeout=timeout, port=config.get("dns_query_port", 53))
+            elapsed_ns = time.perf_counter_ns() - start_ns
+        except (dns.exception.DNSException, OSError):
+            # Sama seperti test_dns_latency: query gagal diabaikan
+            return None
+        return response.rcode(), elapsed_ns
+
+_probe_engine = None
+
+def get_probe_engine():
+    global _probe_engine
+    if _probe_engine is None:
+        _probe_engine = AsyncProbeEngine(config.get("probe_concurrency", 256))
+    return _probe_engine
 
-    if latencies:
-        return int(median(latencies))
-    return None
+def collect_probe_samples(servers, pinned=()):
+    """Uji semua server; kembalikan (warm, cold) masing-masing {server: [latency_ms|None, ...]}.
+
+    'cold' kosong jika cold_probe_zone tidak diatur. Server 'pinned' tidak dihentikan early stopping.
+    """
+    if config.get("probe_engine", "async") == "async":
+        return get_probe_engine().collect(servers, pinned)
+
+    kinds = [False, True] if config.get("cold_probe_zone") else [False]
+    samples = ({}, {})
+    with ThreadPoolExecutor(max_workers=config["threads"]) as executor:
+        future_to_dns = {executor.submit(collect_dns_samples, dns, cold): (dns, cold) for dns in servers for cold in kinds}
+        for future in as_completed(future_to_dns):
+            dns_server, cold = future_to_dns[future]
+            try:
+                samples[cold][dns_server] = future.result()
+            except Exception as exc:
+                log_warn(f"Error saat menguji {dns_server}: {exc}")
+    return samples
+
+def run_probe_round(servers):
+    """Uji semua server dan kembalikan {server: skor} untuk yang merespons."""
+    warm_samples, cold_samples = collect_probe_samples(servers)
+    return scoring_engine.score(warm_samples, cold_samples)
+
+# -------------------------
+# [FITUR BARU] Probe DNS terenkripsi (DoT / DoH) dengan koneksi yang dipakai ulang
+# -------------------------
+# Endpoint bawaan untuk server di DNS_IPV4_MASTER; koneksi dibuka ke IP tersebut dengan SNI hostname
+ENCRYPTED_ENDPOINTS = {
+    "1.1.1.1": {"dot": "cloudflare-dns.com", "doh": "https://cloudflare-dns.com/dns-query"},
+    "1.0.0.1": {"dot": "cloudflare-dns.com", "doh": "https://cloudflare-dns.com/dns-query"},
+    "8.8.8.8": {"dot": "dns.google", "doh": "https://dns.google/dns-query"},
+    "8.8.4.4": {"dot": "dns.google", "doh": "https://dns.google/dns-query"},
+    "9.9.9.9": {"dot": "dns.quad9.net", "doh": "https://dns.quad9.net/dns-query"},
+    "149.112.112.112": {"dot": "dns.quad9.net", "doh": "https://dns.quad9.net/dns-query"},
+    "94.140.14.14": {"dot": "dns.adguard-dns.com", "doh": "https://dns.adguard-dns.com/dns-query"},
+    "94.140.15.15": {"dot": "dns.adguard-dns.com", "doh": "https://dns.adguard-dns.com/dns-query"},
+    "45.90.28.0": {"dot": "dns.nextdns.io", "doh": "https://dns.nextdns.io/dns-query"},
+    "45.90.30.0": {"dot": "dns.nextdns.io", "doh": "https://dns.nextdns.io/dns-query"},
+}
+DOT_PORT = 853
+
+@lru_cache(maxsize=None)
+def pinned_https_connection_class():
+    """Kelas PinnedHTTPSConnection, dibuat saat DoH pertama kali dipakai (http.client tidak di-import saat start)."""
+    import http.client
+
+    class PinnedHTTPSConnection(http.client.HTTPSConnection):
+        """HTTPSConnection ke IP tertentu, tetapi dengan SNI/verifikasi sertifikat memakai hostname URL."""
+
+        def __init__(self, address, host, port, context, timeout):
+            super().__init__(host, port, context=context, timeout=timeout)
+            self.address = address
+            self.tls_context = context
+
+        def connect(self):
+            sock = socket.create_connection((self.address, self.port), self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.sock = self.tls_context.wrap_socket(sock, server_hostname=self.host)
+
+    return PinnedHTTPSConnection
+
+class EncryptedConnection:
+    """Satu koneksi DoT/DoH yang dipakai ulang lintas query dan ronde (reconnect otomatis jika ditutup server)."""
+
+    def __init__(self, transport, address, endpoint, context, timeout):
+        self.transport = transport
+        self.address = address
+        self.endpoint = endpoint
+        self.context = context
+        self.timeout = timeout
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+            self.conn = None
+
+    def _connect(self):
+        if self.transport == "dot":
+            sock = socket.create_connection((self.address, DOT_PORT), self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # Query kecil: jangan tunggu Nagle
+            self.conn = self.context.wrap_socket(sock, server_hostname=self.endpoint)
+        else:
+            url = urlsplit(self.endpoint)
+            self.conn = pinned_https_connection_class()(self.address, url.hostname, url.port or 443, self.context, self.timeout)
+            self.conn.connect()
+
+    def _exchange(self, wire):
+        if self.transport == "dot":
+            self.conn.sendall(struct.pack("!H", len(wire)) + wire)
+            length = struct.unpack("!H", self._recv_exact(2))[0]
+            return self._recv_exact(length)
+        path = urlsplit(self.endpoint).path or "/dns-query"
+        self.conn.request("POST", path, body=wire, headers={
+            "Content-Type": "application/dns-message", "Accept": "application/dns-message"})
+        response = self.conn.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise OSError(f"HTTP {response.status}")
+        return body
+
+    def _recv_exact(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.conn.recv(size - len(data))
+            if not chunk:
+                raise ConnectionResetError("koneksi ditutup server")
+            data += chunk
+        return data
+
+    def query(self, wire):
+        """Return (handshake_ms atau None jika koneksi dipakai ulang, latency_ms, wire respons)."""
+        import http.client
+        with self.lock:
+            for attempt in range(2):
+                handshake_ms = None
+                if self.conn is None:
+                    start = time.perf_counter()
+                    self._connect()
+                    handshake_ms = (time.perf_counter() - start) * 1000
+                try:
+                    start = time.perf_counter()
+                    response = self._exchange(wire)
+                    return handshake_ms, (time.perf_counter() - start) * 1000, response
+                except (OSError, http.client.HTTPException):
+                    # Koneksi idle ditutup server: buka ulang sekali (handshake dihitung terpisah)
+                    self.close()
+                    if attempt or handshake_ms is not None:
+                        raise
+
+class EncryptedProber:
+    """Probe DoT/DoH di thread pool yang tetap hidup antar ronde.
+
+    submit() menjalankan satu ronde di background sehingga endpoint yang lambat tidak
+    menunda keputusan switch di loop utama; ringkasannya dikirim ke dashboard saat selesai.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = {}  # (transport, server) -> EncryptedConnection
+        self.stats = {}        # (transport, server) -> ServerStats latency query
+        self.handshakes = {}   # (transport, server) -> ServerStats latency handshake (TCP + TLS)
+        self.context_key = None
+        self.context = None
+        self.runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="encrypted-probe")
+        self.workers = None  # Dibuat saat ronde pertama, ukuran mengikuti config "threads"
+        self.workers_size = 0
+        self.pending = None  # Future ronde background yang sedang berjalan
+
+    def _workers(self):
+        size = config["threads"]
+        if self.workers is None or size != self.workers_size:
+            if self.workers is not None:
+                self.workers.shutdown(wait=False)
+            self.workers = ThreadPoolExecutor(max_workers=size, thread_name_prefix="encrypted-probe-query")
+            self.workers_size = size
+        return self.workers
+
+    def _tls_context(self, settings):
+        key = settings.get("ca_file") or ""
+        if self.context is None or key != self.context_key:
+            import ssl
+            self.context = ssl.create_default_context(cafile=key or None)
+            self.context_key = key
+            for conn in self.connections.values():
+                conn.close()
+            self.connections.clear()
+        return self.context
+
+    def targets(self, servers):
+        settings = config["encrypted_probe"]
+        endpoints = {**ENCRYPTED_ENDPOINTS, **settings.get("endpoints", {})}
+        pinned = set(settings.get("endpoints", {}))
+        return [(transport, server, endpoints[server][transport])
+                for server in dict.fromkeys(list(servers) + list(pinned)) if server in endpoints
+                for transport in settings["transports"] if endpoints[server].get(transport)]
+
+    def _probe(self, transport, server, endpoint, context):
+        import dns.message
+        key = (transport, server)
+        with self.lock:
+            conn = self.connections.get(key)
+            if conn is None or conn.endpoint != endpoint:
+                conn = self.connections[key] = EncryptedConnection(
+                    transport, server, endpoint, context, config["encrypted_probe"]["timeout_s"])
+        handshakes, latencies = [], []
+        for _ in range(max(1, config.get("dns_query_count", 3))):
+            query = dns.message.make_query(config.get("dns_query_domain", "google.com"), "A")
+            query.id = 0 if transport == "doh" else query.id  # RFC 8484: ID 0 agar ramah cache HTTP
+            try:
+                handshake_ms, latency_ms, wire = conn.query(query.to_wire())
+                response = dns.message.from_wire(wire)
+                if response.rcode() != dns.rcode.NOERROR:
+                    raise ValueError(dns.rcode.to_text(response.rcode()))
+            except Exception:
+                latencies.append(None)
+                continue
+            if handshake_ms is not None:
+                handshakes.append(handshake_ms)
+            latencies.append(latency_ms)
+        return key, handshakes, latencies
+
+    def run_round(self, servers):
+        """Probe DoT/DoH untuk server yang punya endpoint terenkripsi. Return ringkasan per server."""
+        settings = config["encrypted_probe"]
+        context = self._tls_context(settings)
+        targets = self.targets(servers)
+        if not targets:
+            return {}
+        rounds = list(self._workers().map(lambda target: self._probe(*target, context), targets))
+        with self.lock:
+            for key, handshakes, latencies in rounds:
+                transport, server = key
+                stats = self.stats.setdefault(key, ServerStats())
+                for latency in latencies:
+                    stats.record(latency)
+                    if latency is None:
+                        PROBE_QUERIES_TOTAL.inc(server=f"{transport}://{server}", result="lost")
+                    else:
+                        PROBE_QUERIES_TOTAL.inc(server=f"{transport}://{server}", result="ok")
+                        PROBE_LATENCY_SECONDS.observe(latency / 1000, server=f"{transport}://{server}")
+                handshake_stats = self.handshakes.setdefault(key, ServerStats())
+                for handshake in handshakes:
+                    handshake_stats.record(handshake)
+                    TLS_HANDSHAKE_SECONDS.observe(handshake / 1000, server=server, transport=transport)
+        return self.summary()
+
+    def submit(self, servers):
+        """Jalankan run_round di background. Return Future, atau None jika ronde sebelumnya belum selesai."""
+        if self.pending is not None and not self.pending.done():
+            return None
+        self.pending = self.runner.submit(self._run_and_publish, list(servers))
+        return self.pending
+
+    def _run_and_publish(self, servers):
+        try:
+            summary = self.run_round(servers)
+        except Exception as e:
+            log_warn(f"Probe DoT/DoH gagal: {e}")
+            return None
+        update_dashboard(push=False, encrypted=summary)
+        return summary
+
+    def close(self):
+        """Hentikan thread pool probe (dipanggil saat shutdown)."""
+        self.runner.shutdown(wait=False)
+        if self.workers is not None:
+            self.workers.shutdown(wait=False)
+
+    def summary(self):
+        """{server: {"dot": {..., "handshake": {...}}, "doh": {...}}}"""
+        with self.lock:
+            summary = {}
+            for (transport, server), stats in self.stats.items():
+                entry = stats.summary()
+                handshake = self.handshakes.get((transport, server))
+                entry["handshake"] = handshake.summary() if handshake and handshake.sent else None
+                summary.setdefault(server, {})[transport] = entry
+            return summary
+
+encrypted_prober = EncryptedProber()
+
+# -------------------------
+# [OPTIMASI] Adaptive probe scheduler (UCB bandit)
+# -------------------------
+class ProbeScheduler:
+    """Memilih server mana yang diuji setiap ronde.
+
+    Setiap server adalah "arm" dengan rata-rata latency (EWMA) dan jumlah probe.
+    Indeks UCB untuk minimasi = rata-rata - bonus eksplorasi, sehingga budget ronde
+    dihabiskan untuk kandidat teratas, sementara server ekor panjang otomatis dicek
+    ulang sesekali ketika bonus eksplorasinya sudah cukup besar. Server yang tidak
+    diuji selama probe_max_stale_rounds ronde selalu diuji ulang, sehingga satu ronde
+    buruk (mis. semua query hilang) tidak membuangnya selamanya.
+    """
+
+    EWMA_ALPHA = 0.3
+
+    def __init__(self):
+        self.arms = {}  # server -> [jumlah probe, rata-rata latency ms, ronde terakhir diuji, rata-rata dari penalti?]
+        self.rounds = 0
+
+    def select(self, servers, budget, pinned=()):
+        if budget <= 0 or budget >= len(servers):
+            return list(servers)
+
+        self.rounds += 1
+        known = [self.arms[s][1] for s in servers if s in self.arms]
+        scale = median(known) if known else 0
+        log_t = math.log(self.rounds + 1)
+        explore = config.get("probe_explore", 1.0)
+        max_stale = config.get("probe_max_stale_rounds", 30)
+
+        def ucb_index(server):
+            arm = self.arms.get(server)
+            if arm is None:
+                return float("-inf")  # Belum pernah diuji: prioritas utama
+            count, mean = arm[0], arm[1]
+            return mean - explore * scale * math.sqrt(log_t / count)
+
+        selected = [s for s in pinned if s in servers]
+        if max_stale > 0:
+            # Server yang terlalu lama tidak diuji didahulukan, yang paling lama lebih dulu
+            stale = sorted((s for s in servers if s in self.arms and self.rounds - self.arms[s][2] >= max_stale),
+                           key=lambda s: self.arms[s][2])
+            for server in stale:
+                if len(selected) >= budget:
+                    break
+                if server not in selected:
+                    selected.append(server)
+        for server in sorted(servers, key=ucb_index):
+            if len(selected) >= budget:
+                break
+            if server not in selected:
+                selected.append(server)
+        return selected
+
+    def update(self, probed, results, censored=None):
+        # Server yang tidak merespons sama sekali dinilai dua kali server paling lambat yang masih
+        # menjawab (maksimal skor terburuk), sehingga tetap di bawah server yang menjawab sebagian
+        # query tetapi masih bisa dikejar bonus eksplorasi UCB
+        worst_ms = ScoringEngine.worst_score(config["scoring"], config.get("dns_query_timeout_s", 1) * 1000)
+        answering = list(results.values()) + [arm[1] for arm in self.arms.values() if not arm[3]]
+        penalty_ms = min(worst_ms, 2 * max(answering)) if answering else worst_ms
+        censored = censored or {}
+        for server in probed:
+            arm = self.arms.get(server)
+            penalised = False
+            if server in results:
+                latency = results[server]
+            elif server in censored:
+                # Dihentikan early stopping: batas bawah skor ronde ini adalah satu-satunya informasi
+                latency = censored[server]
+            else:
+                latency = penalty_ms
+                penalised = True
+            if arm is None or arm[3]:
+                # Rata-rata dari penalti tidak dibawa: jawaban pertama setelahnya langsung menggantikannya
+                count = arm[0] + 1 if arm is not None else 1
+                self.arms[server] = [count, float(latency), self.rounds, penalised]
+            else:
+                arm[0] += 1
+                arm[1] += self.EWMA_ALPHA * (latency - arm[1])
+                arm[2] = self.rounds
+                arm[3] = False
+
+probe_scheduler = ProbeScheduler()
+
+# -------------------------
+# [FITUR BARU] Statistik latency per server (EWMA, jitter, loss, kuantil streaming)
+# -------------------------
+class LatencyHistogram:
+    """Histogram dengan bucket tetap berskala log (+10% per bucket) untuk p50/p95/p99.
+
+    Memori tetap per server; jika jumlah sampel melewati MAX_COUNT semua bucket
+    dibagi dua supaya kuantil mengikuti kondisi terbaru.
+    """
+
+    __slots__ = ("counts", "total")
+
+    BASE_MS = 0.5
+    GROWTH = 1.1
+    SIZE = 105  # Bucket terakhir menampung semua >~ 10 detik
+    MAX_COUNT = 10_000
+
+    def __init__(self, counts=None):
+        self.counts = array("l", counts if counts and len(counts) == self.SIZE else [0] * self.SIZE)
+        self.total = sum(self.counts)
+
+    def _upper_bound(self, index):
+        return self.BASE_MS * self.GROWTH ** index
+
+    def add(self, latency_ms):
+        if latency_ms <= self.BASE_MS:
+            index = 0
+        else:
+            index = min(self.SIZE - 1, int(math.log(latency_ms / self.BASE_MS, self.GROWTH)) + 1)
+        self.counts[index] += 1
+        self.total += 1
+        if self.total > self.MAX_COUNT:
+            self.counts = array("l", [count // 2 for count in self.counts])
+            self.total = sum(self.counts)
+
+    def quantile(self, q):
+        if not self.total:
+            return None
+        target = q * self.total
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= target:
+                lower = self._upper_bound(index - 1) if index else 0.0
+                upper = self._upper_bound(index)
+                return lower + (upper - lower) * (target - cumulative) / count
+            cumulative += count
+        return self._upper_bound(self.SIZE - 1)
+
+class SampleRing:
+    """Ring buffer berkapasitas tetap untuk sampel (timestamp, latency) tanpa objek per sampel.
+
+    Timestamp disimpan sebagai int64 (ms epoch) dan latency sebagai float32 di array.array,
+    query hilang sebagai NaN: ~12 byte per sampel, dan setelah penuh memori tidak bertambah lagi.
+    """
+
+    __slots__ = ("capacity", "ts", "ms", "head")
+
+    def __init__(self, capacity):
+        self.capacity = max(1, int(capacity))
+        self.ts = array("q")
+        self.ms = array("f")
+        self.head = 0  # Posisi tulis berikutnya setelah buffer penuh (= sampel terlama)
+
+    def __len__(self):
+        return len(self.ms)
+
+    def append(self, latency_ms, ts=None):
+        ts_ms = int((time.time() if ts is None else ts) * 1000)
+        value = math.nan if latency_ms is None else latency_ms
+        if len(self.ms) < self.capacity:
+            self.ts.append(ts_ms)
+            self.ms.append(value)
+        else:
+            self.ts[self.head] = ts_ms
+            self.ms[self.head] = value
+            self.head = (self.head + 1) % self.capacity
+
+    def items(self):
+        """[(ts detik, latency ms | None), ...] urut dari yang terlama."""
+        ts = self.ts[self.head:] + self.ts[:self.head]
+        ms = self.ms[self.head:] + self.ms[:self.head]
+        return [(t / 1000, None if math.isnan(m) else round(m, 3)) for t, m in zip(ts, ms)]
+
+    def stats(self):
+        """Ringkasan seluruh jendela: jumlah sampel, loss, min/mean/p50/p90/p99/max."""
+        if not self.ms:
+            return None
+        answered = sorted(filter(math.isfinite, self.ms))
+        summary = {"samples": len(self.ms), "loss": round(1 - len(answered) / len(self.ms), 4)}
+        if answered:
+            summary.update({
+                "min_ms": round(answered[0], 2),
+                "mean_ms": round(math.fsum(answered) / len(answered), 2),
+                "p50_ms": round(quantile(answered, 0.50), 2),
+                "p90_ms": round(quantile(answered, 0.90), 2),
+                "p99_ms": round(quantile(answered, 0.99), 2),
+                "max_ms": round(answered[-1], 2),
+            })
+        return summary
+
+class ServerStats:
+    __slots__ = ("ewma_ms", "jitter_ms", "last_ms", "loss_rate", "sent", "lost", "last_seen", "histogram", "window")
+    PERSISTED = ("ewma_ms", "jitter_ms", "last_ms", "loss_rate", "sent", "lost", "last_seen")
+
+    ALPHA = 0.2
+
+    def __init__(self):
+        self.ewma_ms = None
+        self.jitter_ms = 0.0
+        self.last_ms = None
+        self.loss_rate = 0.0
+        self.sent = 0
+        self.lost = 0
+        self.last_seen = 0.0
+        self.histogram = LatencyHistogram()
+        self.window = SampleRing(config.get("stats_window", 1024))
+
+    def record(self, latency_ms):
+        """Catat satu sampel; latency_ms None berarti query hilang/gagal."""
+        self.sent += 1
+        self.last_seen = time.time()
+        self.window.append(latency_ms, self.last_seen)
+        if latency_ms is None:
+            self.lost += 1
+            self.loss_rate += self.ALPHA * (1.0 - self.loss_rate)
+            return
+        self.loss_rate -= self.ALPHA * self.loss_rate
+        if self.ewma_ms is None:
+            self.ewma_ms = float(latency_ms)
+        else:
+            self.ewma_ms += self.ALPHA * (latency_ms - self.ewma_ms)
+        if self.last_ms is not None:
+            # Estimator jitter gaya RFC 3550
+            self.jitter_ms += (abs(latency_ms - self.last_ms) - self.jitter_ms) / 16
+        self.last_ms = latency_ms
+        self.histogram.add(latency_ms)
+
+    def summary(self):
+        def rounded(value):
+            return None if value is None else round(value, 2)
+        return {
+            "ewma_ms": rounded(self.ewma_ms),
+            "jitter_ms": rounded(self.jitter_ms),
+            "loss_rate": round(self.loss_rate, 4),
+            "p50_ms": rounded(self.histogram.quantile(0.50)),
+            "p95_ms": rounded(self.histogram.quantile(0.95)),
+            "p99_ms": rounded(self.histogram.quantile(0.99)),
+            "sent": self.sent,
+            "lost": self.lost,
+            "last_seen": self.last_seen,
+            "window": self.window.stats(),
+        }
+
+    def to_dict(self):
+        # Jendela sampel hanya di memori; yang disimpan cukup ringkasan jangka panjang
+        data = {slot: getattr(self, slot) for slot in self.PERSISTED}
+        data["histogram"] = list(self.histogram.counts)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for slot in cls.PERSISTED:
+            if slot in data:
+                setattr(stats, slot, data[slot])
+        stats.histogram = LatencyHistogram(data.get("histogram"))
+        return stats
+
+class StatsStore:
+    """Statistik per server yang bertahan antar ronde dan disimpan ke disk secara berkala."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.servers = {}
+        self.cold = {}  # Statistik cold probe (cache miss), terpisah dari warm
+        self.scores = {}  # server -> EWMA skor ronde (ScoringEngine), dipakai SwitchPolicy
+        self.last_snapshot = time.monotonic()
+
+    def record_scores(self, results):
+        with self.lock:
+            for dns_server, score in results.items():
+                previous = self.scores.get(dns_server)
+                self.scores[dns_server] = float(score) if previous is None else previous + ServerStats.ALPHA * (score - previous)
+
+    def score(self, dns_server):
+        with self.lock:
+            return self.scores.get(dns_server)
+
+    def record_round(self, samples, cold_samples=None):
+        with self.lock:
+            for table, round_samples in ((self.servers, samples), (self.cold, cold_samples or {})):
+                for dns_server, latencies in round_samples.items():
+                    stats = table.get(dns_server)
+                    if stats is None:
+                        stats = table[dns_server] = ServerStats()
+                    for latency in latencies:
+                        stats.record(latency)
+
+    def get(self, dns_server, cold=False):
+        with self.lock:
+            stats = (self.cold if cold else self.servers).get(dns_server)
+            return stats.summary() if stats else None
+
+    def summary(self):
+        with self.lock:
+            summary = {dns_server: stats.summary() for dns_server, stats in self.servers.items()}
+            for dns_server, stats in self.cold.items():
+                summary.setdefault(dns_server, {})["cold"] = stats.summary()
+            return summary
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            with self.lock:
+                self.servers = {dns_server: ServerStats.from_dict(entry) for dns_server, entry in data.get("servers", {}).items()}
+                self.cold = {dns_server: ServerStats.from_dict(entry) for dns_server, entry in data.get("cold", {}).items()}
+                self.scores = {dns_server: float(score) for dns_server, score in data.get("scores", {}).items()}
+            log_info(f"Statistik {len(self.servers)} server dimuat dari {self.path}.")
+        except (OSError, ValueError, TypeError) as e:
+            log_warn(f"Gagal memuat statistik dari {self.path}: {e}")
+
+    def snapshot(self):
+        with self.lock:
+            data = {
+                "saved_at": time.time(),
+                "servers": {dns_server: stats.to_dict() for dns_server, stats in self.servers.items()},
+                "cold": {dns_server: stats.to_dict() for dns_server, stats in self.cold.items()},
+                "scores": dict(self.scores),
+            }
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log_warn(f"Gagal menyimpan statistik ke {self.path}: {e}")
+        self.last_snapshot = time.monotonic()
+
+    def maybe_snapshot(self):
+        if time.monotonic() - self.last_snapshot >= config.get("stats_snapshot_s", 300):
+            self.snapshot()
+
+stats_store = StatsStore(STATS_FILE)
+
+def probe_round(all_dns, current_dns):
+    """Satu ronde lengkap: pilih target, probe, perbarui scheduler & statistik. Kembalikan {server: latency_ms}."""
+    probe_targets = probe_scheduler.select(all_dns, config.get("probe_budget", 0), pinned=[current_dns])
+    log_info(f"Menguji {len(probe_targets)} dari {len(all_dns)} server DNS...")
+    with PROBE_ROUND_SECONDS.timer():
+        samples, cold_samples = collect_probe_samples(probe_targets, pinned=[current_dns])
+    for dns_server, latencies in samples.items():
+        for latency in latencies:
+            if latency is None:
+                PROBE_QUERIES_TOTAL.inc(server=dns_server, result="lost")
+            else:
+                PROBE_QUERIES_TOTAL.inc(server=dns_server, result="ok")
+                PROBE_LATENCY_SECONDS.observe(latency / 1000, server=dns_server)
+    results = scoring_engine.score(samples, cold_samples)
+    # Server yang dihentikan early stopping dilaporkan ke scheduler dengan batas bawah skornya
+    pruned = _probe_engine.pruned if _probe_engine is not None and config.get("probe_engine") == "async" else {}
+    probe_scheduler.update(probe_targets, results, censored=pruned)
+    stats_store.record_round(samples, cold_samples)
+    stats_store.record_scores(results)
+    return results
+
+# -------------------------
+# [OPTIMASI] Switch policy (hysteresis + dwell time)
+# -------------------------
+class SwitchPolicy:
+    """Memutuskan apakah mengganti DNS sepadan dengan biayanya.
+
+    Setiap switch di Linux berarti 'nmcli connection up' (koneksi putus sebentar)
+    ditambah verifikasi, jadi perbedaan beberapa ms karena noise tidak boleh memicu
+    switch. Perbandingan memakai EWMA skor (median/p90/jitter/loss, lihat ScoringEngine)
+    dari stats_store bila tersedia, sehingga loss ikut menentukan kapan DNS aktif diganti.
+    """
+
+    def __init__(self):
+        self.last_switch = None
+        self.better_since = None
+        self.candidate = None  # Server yang menjadi acuan better_since
+        self.missing = 0  # Ronde berturut-turut tanpa hasil untuk DNS aktif
+
+    def _score(self, dns_server, results):
+        # Skor ronde sudah memuat cold probe (cold_weight), jadi tidak perlu digabung lagi di sini
+        score = stats_store.score(dns_server)
+        return results[dns_server] if score is None else score
+
+    def should_switch(self, current_dns, best_dns, results):
+        """Kembalikan (ganti?, alasan)."""
+        if best_dns == current_dns:
+            self.better_since = None
+            self.missing = 0
+            return False, "DNS terbaik sudah digunakan"
+        policy = config["switch_policy"]
+        if self.last_switch is None and current_dns not in results:
+            # Belum ada DNS yang kita pasang (DHCP): tidak ada yang dipertahankan
+            return True, f"tidak ada hasil untuk {current_dns}"
+        if current_dns not in results:
+            # Satu ronde tanpa jawaban bisa karena gangguan sesaat; ganti tanpa dwell hanya jika berulang
+            self.better_since = None
+            self.missing += 1
+            if self.missing < policy["missing_rounds"]:
+                return False, f"tidak ada hasil untuk {current_dns} ({self.missing}/{policy['missing_rounds']} ronde)"
+            return True, f"tidak ada hasil untuk {current_dns} selama {self.missing} ronde"
+        self.missing = 0
+
+        current_ms = self._score(current_dns, results)
+        gain_ms = current_ms - self._score(best_dns, results)
+        required_ms = max(policy["margin_ms"], current_ms * policy["margin_pct"] / 100)
+        if gain_ms < required_ms:
+            self.better_since = None
+            return False, f"selisih skor {gain_ms:.1f} di bawah margin {required_ms:.1f}"
+
+        now = time.monotonic()
+        if self.better_since is None or self.candidate != best_dns:
+            # Window konsistensi berlaku per kandidat: kandidat baru mulai menghitung dari nol
+            self.better_since = now
+            self.candidate = best_dns
+        if now - self.better_since < policy["window_s"]:
+            return False, f"skor lebih baik {gain_ms:.1f}, menunggu konsisten selama {policy['window_s']}s"
+        if self.last_switch is not None and now - self.last_switch < policy["min_dwell_s"]:
+            return False, f"dwell time minimal {policy['min_dwell_s']}s belum tercapai"
+        return True, f"skor lebih baik {gain_ms:.1f} (margin {required_ms:.1f})"
+
+    def record_switch(self):
+        self.last_switch = time.monotonic()
+        self.better_since = None
+        self.missing = 0
+
+switch_policy = SwitchPolicy()
+
+# -------------------------
+# [FITUR BARU] Forwarder DNS lokal (dns_selection_mode "forwarder")
+# -------------------------
+STALE_TTL = 30  # TTL jawaban basi (RFC 8767 menyarankan 30 detik)
+
+class AnswerCache:
+    """LRU jawaban DNS (wire format) yang menghormati TTL, dengan negative caching & serve-stale."""
+
+    def __init__(self, max_entries, max_ttl, negative_ttl, stale_s):
+        self.entries = OrderedDict()  # (qname, rdtype, rdclass, DO, CD) -> (wire, disimpan_pada, ttl)
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.stale_s = stale_s
+
+    def ttl_for(self, response):
+        """TTL cache untuk respons upstream, atau 0 jika tidak boleh dicache (mis. SERVFAIL)."""
+        rcode = response.rcode()
+        if rcode == dns.rcode.NXDOMAIN or (rcode == dns.rcode.NOERROR and not response.answer):
+            # Negative caching (RFC 2308): min(TTL SOA, SOA MINIMUM), dibatasi negative_ttl
+            soa = [rrset for rrset in response.authority if rrset.rdtype == dns.rdatatype.SOA]
+            ttl = min(soa[0].ttl, soa[0][0].minimum) if soa else self.negative_ttl
+            return min(ttl, self.negative_ttl)
+        if rcode != dns.rcode.NOERROR:
+            return 0
+        return min(min(rrset.ttl for rrset in response.answer), self.max_ttl)
+
+    def get(self, key, now):
+        """Return (wire, umur_detik, basi) atau None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        wire, stored_at, ttl = entry
+        age = now - stored_at
+        if age > ttl + self.stale_s:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return wire, age, age >= ttl
+
+    def put(self, key, wire, ttl, now):
+        if ttl <= 0:
+            return
+        self.entries[key] = (wire, now, ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+@lru_cache(maxsize=None)
+def forwarder_udp_protocol_class():
+    """Kelas protocol UDP forwarder, dibuat saat forwarder dijalankan (asyncio tidak di-import saat start)."""
+    import asyncio
+
+    class ForwarderUDPProtocol(asyncio.DatagramProtocol):
+        def __init__(self, forwarder):
+            self.forwarder = forwarder
+            self.transport = None
+
+        def connection_made(self, transport):
+            self.transport = transport
+
+        def datagram_received(self, data, addr):
+            asyncio.ensure_future(self._answer(data, addr))
+
+        async def _answer(self, data, addr):
+            wire = await self.forwarder.resolve(data, udp=True)
+            if wire is not None:
+                self.transport.sendto(wire, addr)
+
+    return ForwarderUDPProtocol
+
+class DNSForwarder:
+    """Stub resolver di 127.0.0.1 yang meneruskan query ke server teratas hasil probe.
+
+    Jawaban dicache (LRU + TTL); query identik yang sedang berjalan digabung; jika semua
+    upstream gagal, jawaban basi tetap disajikan. Ganti upstream cukup mengganti list,
+    tanpa menyentuh konfigurasi interface.
+    """
+
+    def __init__(self):
+        self.upstreams = []
+        self.cache = None
+        self.inflight = {}
+        self.loop = None
+
+    def set_upstreams(self, servers):
+        self.upstreams = list(servers)
+
+    def start(self):
+        settings = config["forwarder"]
+        self.cache = AnswerCache(settings["cache_size"], settings["max_ttl_s"], settings["negative_ttl_s"], settings["serve_stale_s"])
+        ready = threading.Event()
+        errors = []
+        threading.Thread(target=self._run, args=(settings["listen"], settings["port"], ready, errors), daemon=True).start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        log_info(f"Forwarder DNS aktif di {settings['listen']}:{settings['port']} (UDP/TCP).")
+
+    def _run(self, listen, port, ready, errors):
+        import asyncio
+        protocol = forwarder_udp_protocol_class()
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(loop.create_datagram_endpoint(lambda: protocol(self), local_addr=(listen, port)))
+            loop.run_until_complete(asyncio.start_server(self._handle_tcp, listen, port))
+        except OSError as e:
+            errors.append(e)
+            ready.set()
+            return
+        self.loop = loop
+        ready.set()
+        loop.run_forever()
+
+    async def _handle_tcp(self, reader, writer):
+        import asyncio
+        try:
+            while True:
+                length = struct.unpack("!H", await reader.readexactly(2))[0]
+                wire = await self.resolve(await reader.readexactly(length), udp=False)
+                if wire is None:
+                    break
+                writer.write(struct.pack("!H", len(wire)) + wire)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def resolve(self, data, udp=True):
+        """Jawab satu query wire-format. Return wire respons, atau None jika query tidak bisa di-parse."""
+        import dns.message
+        start = time.perf_counter()
+        try:
+            query = dns.message.from_wire(data)
+        except Exception:
+            return None
+        if len(query.question) != 1:
+            response, result = dns.message.make_response(query), "error"
+            response.set_rcode(dns.rcode.FORMERR)
+        else:
+            question = query.question[0]
+            # DO/CD ikut menentukan isi jawaban (RRSIG, validasi), jadi klien dengan flag berbeda tidak berbagi jawaban
+            key = (question.name.to_text().lower(), question.rdtype, question.rdclass,
+                   bool(query.ednsflags & dns.flags.DO), bool(query.flags & dns.flags.CD))
+            cached = self.cache.get(key, time.monotonic())
+            if cached is not None and not cached[2]:
+                response, result = self._answer_for(query, *cached), "hit"
+            else:
+                wire = await self._forward_shared(key, query)
+                if wire is not None:
+                    response, result = self._answer_for(query, wire), "miss"
+                elif cached is not None:
+                    response, result = self._answer_for(query, *cached), "stale"
+                else:
+                    response, result = dns.message.make_response(query), "error"
+                    response.set_rcode(dns.rcode.SERVFAIL)
+        response.id = query.id
+        if query.edns < 0:
+            response.use_edns(False)
+        wire = response.to_wire()
+        limit = max(512, query.payload) if query.edns >= 0 else 512
+        if udp and len(wire) > limit:
+            # Terlalu besar untuk UDP: kirim respons TC agar klien mengulang lewat TCP
+            truncated = dns.message.make_response(query)
+            truncated.flags |= dns.flags.TC
+            wire = truncated.to_wire()
+        FORWARDER_QUERIES_TOTAL.inc(result=result)
+        FORWARDER_QUERY_SECONDS.observe(time.perf_counter() - start, result=result)
+        return wire
+
+    @staticmethod
+    def _answer_for(query, wire, age=0, stale=False):
+        """Respons milik klien ini dari wire upstream/cache (yang mungkin dijawab untuk klien lain)."""
+        import dns.message
+        response = dns.message.from_wire(wire)
+        # Pertanyaan disalin dari query klien sendiri (kapitalisasi 0x20 tetap cocok)
+        response.question = list(query.question)
+        if age or stale:
+            elapsed = int(age)
+            for section in (response.answer, response.authority, response.additional):
+                for rrset in section:
+                    rrset.ttl = STALE_TTL if stale else max(0, rrset.ttl - elapsed)
+        return response
+
+    async def _forward_shared(self, key, query):
+        """Gabungkan query identik yang sedang berjalan menjadi satu query upstream. Return wire respons atau None."""
+        import asyncio
+        future = self.inflight.get(key)
+        if future is None:
+            future = self.inflight[key] = asyncio.ensure_future(self._forward(key, query))
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def _forward(self, key, query):
+        import dns.asyncquery  # Transport ke upstream, hanya dimuat di mode forwarder
+        import dns.message
+        timeout = config.get("dns_query_timeout_s", 1)
+        port = config.get("dns_query_port", 53)
+        for server in self.upstreams:
+            try:
+                try:
+                    response = await dns.asyncquery.udp(query, server, timeout=timeout, port=port, raise_on_truncation=True)
+                except dns.message.Truncated:
+                    response = await dns.asyncquery.tcp(query, server, timeout=timeout, port=port)
+            except (dns.exception.DNSException, OSError):
+                continue
+            if response.rcode() in (dns.rcode.SERVFAIL, dns.rcode.REFUSED):
+                continue
+            wire = response.to_wire()
+            self.cache.put(key, wire, self.cache.ttl_for(response), time.monotonic())
+            return wire
+        return None
+
+    def metrics(self):
+        entries = len(self.cache.entries) if self.cache else 0
+        FORWARDER_CACHE_ENTRIES.set(entries)
+        return {"upstreams": self.upstreams, "cache_entries": entries, "inflight": len(self.inflight)}
+
+dns_forwarder = DNSForwarder()
 
 # -------------------------
 # DNS set/reset (cross-platform)
 # -------------------------
-def set_dns_on_interface(interface, dns):
-    system = platform.system()
-    try:
+# [OPTIMASI] Lapisan backend konfigurasi DNS. Backend D-Bus (systemd-resolved / NetworkManager) mengubah DNS
+# langsung tanpa fork proses dan tanpa memutus koneksi; kode subprocess lama tetap ada sebagai fallback.
+class DNSBackend:
+    name = "base"
+    requires_admin = True
+
+    def set_dns(self, interface, servers):
+        """Pasang daftar server DNS (IPv4 dan/atau IPv6) pada interface. Return True jika berhasil."""
+        raise NotImplementedError
+
+    def reset_dns(self, interface):
+        """Kembalikan DNS interface ke DHCP / pengaturan profil."""
+        raise NotImplementedError
+
+    def get_dns(self, interface):
+        """Daftar DNS yang sedang aktif di interface, atau None jika tidak bisa dibaca."""
+        return None
+
+class SubprocessBackend(DNSBackend):
+    """Cara lama: netsh (Windows), nmcli (Linux), networksetup (macOS)."""
+    name = "subprocess"
+
+    def set_dns(self, interface, servers):
+        system = platform.system()
+        v4 = [s for s in servers if ":" not in s]
+        v6 = [s for s in servers if ":" in s]
         if system == "Windows":
-            proto = 'ipv6' if ":" in dns else 'ip'
-            cmd = ['netsh', 'interface', proto, 'set', 'dns', f'name="{interface}"', 'static', dns]
-            res = subprocess.run(cmd, capture_output=True, text=True, check=False)
-            ok = (res.returncode == 0)
+            ok = True
+            for proto, group in (("ip", v4), ("ipv6", v6)):
+                for index, server in enumerate(group):
+                    if index == 0:
+                        cmd = ['netsh', 'interface', proto, 'set', 'dns', f'name="{interface}"', 'static', server]
+                    else:
+                        cmd = ['netsh', 'interface', proto, 'add', 'dns', f'name="{interface}"', server, f'index={index + 1}']
+                    ok = run_command(cmd, capture_output=True, text=True, check=False).returncode == 0 and ok
             if ok:
-                subprocess.run(["ipconfig", "/flushdns"], capture_output=True, check=False)
+                run_command(["ipconfig", "/flushdns"], capture_output=True, check=False)
             return ok
         elif system == "Linux" and shutil_which("nmcli"):
-            proto = "ipv6.dns" if ":" in dns else "ipv4.dns"
-            res = subprocess.run(["nmcli", "connection", "modify", interface, proto, dns], capture_output=True, text=True, check=False)
+            # Satu 'modify' untuk IPv4 dan IPv6 sekaligus
+            cmd = ["nmcli", "connection", "modify", interface]
+            if v4:
+                cmd += ["ipv4.dns", " ".join(v4)]
+            if v6:
+                cmd += ["ipv6.dns", " ".join(v6)]
+            res = run_command(cmd, capture_output=True, text=True, check=False)
             if res.returncode == 0:
-                # Re-apply connection to take effect
-                subprocess.run(["nmcli", "connection", "up", interface], capture_output=True, text=True, check=False)
+                self._reapply(interface)
                 return True
             return False
         elif system == "Darwin":
-            res = subprocess.run(["networksetup", "-setdnsservers", interface, dns], capture_output=True, text=True, check=False)
+            res = run_command(["networksetup", "-setdnsservers", interface, *servers], capture_output=True, text=True, check=False)
             return res.returncode == 0
+        return False
+
+    def _reapply(self, interface):
+        # 'device reapply' menerapkan perubahan tanpa memutus link; 'connection up' hanya jika reapply gagal
+        res = run_command(["nmcli", "device", "reapply", interface], capture_output=True, text=True, check=False)
+        if res.returncode != 0:
+            run_command(["nmcli", "connection", "up", interface], capture_output=True, text=True, check=False)
+
+    def reset_dns(self, interface):
+        system = platform.system()
+        if system == "Windows":
+            run_command(['netsh','interface','ip','set','dns', f'name="{interface}"', 'dhcp'], capture_output=True, check=False)
+            run_command(['netsh','interface','ipv6','set','dns', f'name="{interface}"', 'dhcp'], capture_output=True, check=False)
+        elif system == "Linux" and shutil_which("nmcli"):
+            run_command(["nmcli", "connection", 'modify', interface, "ipv4.dns", "", "ipv6.dns", ""], capture_output=True, check=False)
+            self._reapply(interface)
+        elif system == "Darwin":
+            run_command(["networksetup","-setdnsservers",interface,"Empty"], capture_output=True, check=False)
+
+    def get_dns(self, interface):
+        system = platform.system()
+        if system == "Windows":
+            # Metode 1: PowerShell (lebih andal dan tidak tergantung bahasa sistem)
+            try:
+                cmd = f'powershell -Command "Get-NetIPConfiguration -InterfaceAlias \'{interface}\' | Select-Object -ExpandProperty DnsServer | Select-Object -ExpandProperty ServerAddresses | ConvertTo-Json -Compress"'
+                result = run_command(cmd, capture_output=True, text=True, check=True, timeout=5)
+                dns_servers = json.loads(result.stdout)
+                # PowerShell mungkin mengembalikan satu string jika hanya ada satu DNS
+                return [dns_servers] if isinstance(dns_servers, str) else list(dns_servers)
+            except (subprocess.CalledProcessError, FileNotFoundError, json.JSONDecodeError, subprocess.TimeoutExpired):
+                # Metode 2: Fallback ke 'ipconfig' jika PowerShell gagal atau tidak ada
+                log_warn("PowerShell gagal, fallback ke 'ipconfig'.")
+                result = run_command(['ipconfig', '/all'], capture_output=True, text=True, encoding='utf-8', errors='ignore')
+                # Regex yang lebih fleksibel untuk berbagai tipe adapter (Ethernet, Wireless LAN, dll.)
+                pattern = re.compile(rf".*?adapter {re.escape(interface)}:.*?DNS Servers.*?: ([\d\.:\s]+)", re.DOTALL | re.IGNORECASE)
+                match = pattern.search(result.stdout)
+                return match.group(1).split() if match else []
+        elif system == "Linux" and shutil_which("nmcli"):
+            result = run_command(['nmcli', 'dev', 'show', interface], capture_output=True, text=True)
+            servers = []
+            for line in result.stdout.splitlines():
+                # Baris IP4.DNS[1]: / IP6.DNS[1]:
+                key, _, value = line.partition(":")
+                if key.strip().startswith(("IP4.DNS", "IP6.DNS")):
+                    servers.append(value.strip())
+            return servers
+        elif system == "Darwin":
+            result = run_command(['networksetup', '-getdnsservers', interface], capture_output=True, text=True)
+            return [line.strip() for line in result.stdout.splitlines() if line.strip()]
+        return None
+
+class DBusBackend(DNSBackend):
+    """Dasar backend D-Bus (via jeepney): satu koneksi system bus yang dipakai ulang untuk semua panggilan."""
+    bus_name = None
+    call_timeout_s = 5
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.conn = None
+
+    def call(self, msg):
+        with self.lock:
+            if self.conn is None:
+                self.conn = open_dbus_connection(bus="SYSTEM")
+            try:
+                reply = self.conn.send_and_get_reply(msg, timeout=self.call_timeout_s)
+            except (OSError, TimeoutError):
+                # Koneksi putus (mis. dbus restart): buka ulang di panggilan berikutnya
+                self.conn.close()
+                self.conn = None
+                raise
+        return unwrap_msg(reply)
+
+    def get_property(self, address, name):
+        signature, value = self.call(Properties(address).get(name))[0]
+        return value
+
+    def available(self):
+        if platform.system() != "Linux" or not load_jeepney():
+            return False
+        try:
+            return bool(self.call(message_bus.NameHasOwner(self.bus_name))[0])
+        except Exception:
+            return False
+
+def pack_dns_address(dns):
+    family = socket.AF_INET6 if ":" in dns else socket.AF_INET
+    return family, socket.inet_pton(family, dns)
+
+class ResolvedBackend(DBusBackend):
+    """systemd-resolved: SetLinkDNS langsung berlaku, tanpa reconnect."""
+    name = "resolved"
+    bus_name = "org.freedesktop.resolve1"
+    RESOLV_CONF = "/etc/resolv.conf"
+    STUB_ADDRESSES = ("127.0.0.53", "127.0.0.54")
+
+    def __init__(self):
+        super().__init__()
+        self.manager = DBusAddress("/org/freedesktop/resolve1", bus_name=self.bus_name,
+                                   interface="org.freedesktop.resolve1.Manager")
+
+    def available(self):
+        # SetLinkDNS hanya berpengaruh jika aplikasi memang bertanya ke resolved (stub 127.0.0.53)
+        try:
+            with open(self.RESOLV_CONF, "r", encoding="utf-8") as f:
+                if not any(addr in f.read() for addr in self.STUB_ADDRESSES):
+                    return False
+        except OSError:
+            return False
+        return super().available()
+
+    def set_dns(self, interface, servers):
+        ifindex = socket.if_nametoindex(interface)
+        self.call(new_method_call(self.manager, "SetLinkDNS", "ia(iay)", (ifindex, [pack_dns_address(s) for s in servers])))
+        self.call(new_method_call(self.manager, "FlushCaches"))
+        return True
+
+    def reset_dns(self, interface):
+        self.call(new_method_call(self.manager, "RevertLink", "i", (socket.if_nametoindex(interface),)))
+
+    def get_dns(self, interface):
+        ifindex = socket.if_nametoindex(interface)
+        return [socket.inet_ntop(family, bytes(address))
+                for index, family, address in self.get_property(self.manager, "DNS") if index == ifindex]
+
+class NetworkManagerBackend(DBusBackend):
+    """NetworkManager: ubah applied connection lalu Reapply — profil tersimpan tidak diubah, link tidak putus."""
+    name = "networkmanager"
+    bus_name = "org.freedesktop.NetworkManager"
+
+    def __init__(self):
+        super().__init__()
+        self.manager = DBusAddress("/org/freedesktop/NetworkManager", bus_name=self.bus_name,
+                                   interface="org.freedesktop.NetworkManager")
+
+    def device(self, interface):
+        path = self.call(new_method_call(self.manager, "GetDeviceByIpIface", "s", (interface,)))[0]
+        return DBusAddress(path, bus_name=self.bus_name, interface="org.freedesktop.NetworkManager.Device")
+
+    def set_dns(self, interface, servers):
+        device = self.device(interface)
+        settings, version_id = self.call(new_method_call(device, "GetAppliedConnection", "u", (0,)))
+        v4 = [s for s in servers if ":" not in s]
+        v6 = [s for s in servers if ":" in s]
+        for section, group in (("ipv4", v4), ("ipv6", v6)):
+            if not group:
+                continue
+            values = settings.setdefault(section, {})
+            # Kunci lama 'addresses'/'routes' bentrok dengan 'address-data'/'route-data' saat Reapply
+            values.pop("addresses", None)
+            values.pop("routes", None)
+            if section == "ipv4":
+                # ipv4.dns: uint32 dalam urutan byte jaringan (in_addr_t mentah)
+                values["dns"] = ("au", [int.from_bytes(socket.inet_aton(s), sys.byteorder) for s in group])
+            else:
+                values["dns"] = ("aay", [socket.inet_pton(socket.AF_INET6, s) for s in group])
+            values["ignore-auto-dns"] = ("b", True)
+        self.call(new_method_call(device, "Reapply", "a{sa{sv}}tu", (settings, version_id, 0)))
+        return True
+
+    def reset_dns(self, interface):
+        # Reapply dengan koneksi kosong = terapkan ulang profil tersimpan (DNS dari DHCP/profil)
+        self.call(new_method_call(self.device(interface), "Reapply", "a{sa{sv}}tu", ({}, 0, 0)))
+
+    def get_dns(self, interface):
+        device = self.device(interface)
+        servers = []
+        ip4_path = self.get_property(device, "Ip4Config")
+        if ip4_path != "/":
+            ip4 = DBusAddress(ip4_path, bus_name=self.bus_name, interface="org.freedesktop.NetworkManager.IP4Config")
+            servers += [entry["address"][1] for entry in self.get_property(ip4, "NameserverData")]
+        ip6_path = self.get_property(device, "Ip6Config")
+        if ip6_path != "/":
+            ip6 = DBusAddress(ip6_path, bus_name=self.bus_name, interface="org.freedesktop.NetworkManager.IP6Config")
+            servers += [socket.inet_ntop(socket.AF_INET6, bytes(addr)) for addr in self.get_property(ip6, "Nameservers")]
+        return servers
+
+class FakeBackend(DNSBackend):
+    """Backend in-memory untuk menguji & benchmark jalur switch tanpa root."""
+    name = "fake"
+    requires_admin = False
+
+    def __init__(self, delay_s=0.0):
+        self.delay_s = delay_s
+        self.lock = threading.Lock()
+        self.applied = {}
+        self.calls = 0
+
+    def set_dns(self, interface, servers):
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        with self.lock:
+            self.calls += 1
+            self.applied[interface] = list(servers)
+        return True
+
+    def reset_dns(self, interface):
+        with self.lock:
+            self.calls += 1
+            self.applied.pop(interface, None)
+
+    def get_dns(self, interface):
+        with self.lock:
+            return list(self.applied.get(interface, []))
+
+DNS_BACKENDS = {
+    "networkmanager": NetworkManagerBackend,
+    "resolved": ResolvedBackend,
+    "subprocess": SubprocessBackend,
+    "fake": FakeBackend,
+}
+_dns_backend = None
+
+def get_dns_backend():
+    """Pilih backend sekali. 'auto': NetworkManager → systemd-resolved → subprocess."""
+    global _dns_backend
+    if _dns_backend is None:
+        choice = config.get("dns_backend", "auto")
+        if choice == "auto":
+            candidates = ["networkmanager", "resolved"] if platform.system() == "Linux" and load_jeepney() else []
+        elif choice in ("networkmanager", "resolved"):
+            candidates = [choice]
+            if not load_jeepney():
+                log_warn(f"dns_backend '{choice}' butuh paket 'jeepney' (pip install jeepney) — pake 'subprocess'")
+                candidates = []
+        else:
+            candidates = [choice]
+        for name in candidates:
+            backend = DNS_BACKENDS[name]()
+            if not isinstance(backend, DBusBackend) or backend.available():
+                _dns_backend = backend
+                break
+            if choice != "auto":
+                log_warn(f"dns_backend '{name}' tidak tersedia — pake 'subprocess'")
+        if _dns_backend is None:
+            _dns_backend = SubprocessBackend()
+        log_info(f"Backend DNS: {_dns_backend.name}")
+    return _dns_backend
+
+@timed(SET_DNS_SECONDS)
+def set_dns_on_interface(interface, dns):
+    """dns bisa satu alamat atau list alamat (IPv4 dan IPv6 dipasang dalam satu perubahan)."""
+    servers = [dns] if isinstance(dns, str) else list(dns)
+    backend = get_dns_backend()
+    try:
+        return bool(backend.set_dns(interface, servers))
     except Exception as e:
-        log_warn(f"set_dns error: {e}")
+        log_warn(f"set_dns error ({backend.name}) di '{interface}': {e}")
     return False
 
-def reset_dns_on_interface(interface):
-    system = platform.system()
-    try:
-        if system == "Windows":
-            subprocess.run(['netsh','interface','ip','set','dns', f'name="{interface}"', 'dhcp'], capture_output=True, check=False)
-            subprocess.run(['netsh','interface','ipv6','set','dns', f'name="{interface}"', 'dhcp'], capture_output=True, check=False)
-        elif system == "Linux" and shutil_which("nmcli"):
-            subprocess.run(["nmcli", "connection", 'modify', interface, "ipv4.dns", ""], capture_output=True, check=False)
-            subprocess.run(["nmcli", "connection", 'modify', interface, "ipv6.dns", ""], capture_output=True, check=False)
-            subprocess.run(["nmcli", "connection", "up", interface], capture_output=True, text=True, check=False)
-        elif system == "Darwin":
-            subprocess.run(["networksetup","-setdnsservers",interface,"Empty"], capture_output=True, check=False)
-    except Exception as e:
-        log_warn(f"reset_dns error: {e}")
+def reset_dns_on_interface(interface):
+    backend = get_dns_backend()
+    try:
+        backend.reset_dns(interface)
+    except Exception as e:
+        log_warn(f"reset_dns error ({backend.name}) di '{interface}': {e}")
+
+class DNSApplier:
+    """[OPTIMASI] Terapkan/reset DNS ke semua interface secara bersamaan.
+
+    Server IPv4 dan IPv6 dikirim ke backend dalam satu panggilan per interface (satu
+    Reapply per koneksi). Jika hanya sebagian interface berhasil dan apply_atomic aktif,
+    interface yang sudah berubah dikembalikan ke kondisi sebelumnya.
+    """
+
+    def __init__(self, max_workers=8):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dns-apply")
+        self.lock = threading.Lock()
+        self.applied = {}  # interface -> list server yang kita pasang (tidak ada = DHCP/profil)
+        self.current = None  # Server terakhir yang berhasil dipasang, untuk interface yang baru muncul
+        self.last_result = None
+
+    def _run(self, fn, interfaces, *args):
+        """Jalankan fn(interface, *args) bersamaan. Return {interface: {"ok", "ms", "error"}}."""
+        def task(interface):
+            start = time.perf_counter()
+            try:
+                ok, error = fn(interface, *args), None
+            except Exception as e:
+                ok, error = False, str(e)
+            ok = ok is not False
+            if not ok and error is None:
+                error = "gagal (lihat log)"
+            return {"ok": ok, "ms": round((time.perf_counter() - start) * 1000, 1), "error": error}
+        if len(interfaces) == 1:
+            return {interfaces[0]: task(interfaces[0])}
+        return dict(zip(interfaces, self.pool.map(task, interfaces)))
+
+    def _restore(self, interface, previous):
+        if previous:
+            return set_dns_on_interface(interface, previous)
+        reset_dns_on_interface(interface)
+        return True
+
+    def apply(self, interfaces, servers):
+        servers = [servers] if isinstance(servers, str) else list(servers)
+        start = time.perf_counter()
+        with self.lock:
+            previous = {interface: self.applied.get(interface) for interface in interfaces}
+            results = self._run(set_dns_on_interface, interfaces, servers)
+            succeeded = [interface for interface, result in results.items() if result["ok"]]
+            rolled_back = False
+            if succeeded and len(succeeded) < len(interfaces) and config.get("apply_atomic", True):
+                failed = [interface for interface in interfaces if interface not in succeeded]
+                log_warn(f"Apply DNS gagal di {', '.join(failed)} — rollback {len(succeeded)} interface lain.")
+                self._run(lambda interface: self._restore(interface, previous[interface]), succeeded)
+                rolled_back = True
+                succeeded = []
+            for interface in succeeded:
+                self.applied[interface] = servers
+            if succeeded:
+                self.current = servers
+        elapsed = time.perf_counter() - start
+        APPLY_SECONDS.observe(elapsed, op="apply")
+        self.last_result = {"servers": servers, "ok": len(succeeded), "total": len(interfaces),
+                            "rolled_back": rolled_back, "ms": round(elapsed * 1000, 1), "interfaces": results}
+        return self.last_result
+
+    def reset(self, interfaces):
+        start = time.perf_counter()
+        with self.lock:
+            results = self._run(reset_dns_on_interface, interfaces)
+            for interface in interfaces:
+                self.applied.pop(interface, None)
+            self.current = None
+        APPLY_SECONDS.observe(time.perf_counter() - start, op="reset")
+        return results
+
+    def on_interfaces_changed(self, added, removed):
+        """Callback InterfaceRegistry: pasang DNS aktif ke interface baru, lupakan yang hilang."""
+        with self.lock:
+            for interface in removed:
+                self.applied.pop(interface, None)
+            servers = self.current
+        if added and servers:
+            result = self.apply(added, servers)
+            log_info(f"DNS {', '.join(servers)} dipasang ke interface baru: {result['ok']} dari {len(added)} ({result['ms']} ms).")
+
+dns_applier = DNSApplier()
+
+# -------------------------
+# game detection
+# -------------------------
+# Konstanta netlink proc connector (linux/connector.h, linux/cn_proc.h)
+NETLINK_CONNECTOR = 11
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+PROC_CN_MCAST_LISTEN = 1
+PROC_EVENT_EXEC = 0x00000002
+PROC_EVENT_COMM = 0x00000200
+PROC_EVENT_EXIT = 0x80000000
+NLMSG_DONE = 3
+GAME_NAME_REFRESH_S = 30  # Interval pemeriksaan ulang PID lama (exec/rename tidak mengubah PID)
+
+class GameWatcher:
+    """Deteksi game secara inkremental dengan cache PID→nama proses.
+
+    Mode poll: setiap pengecekan hanya men-diff daftar PID (di Linux = isi /proc)
+    dan membaca nama untuk PID baru saja. PID lama diperiksa ulang setiap
+    GAME_NAME_REFRESH_S detik: di Linux hanya yang comm/start time di /proc/<pid>/stat
+    berubah (exec launcher, rename Wine/Proton, PID dipakai ulang) yang dibaca ulang,
+    di OS lain semuanya. Mode netlink (Linux + root): event
+    exec/exit dari proc connector menandai PID yang berubah, sehingga pengecekan
+    hanya menyentuh PID tersebut tanpa memindai daftar proses.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.names = {}        # pid -> nama proses (lowercase)
+        self.game_pids = set()
+        self.pending = set()   # PID dari event exec yang namanya belum dibaca
+        self.signatures = {}   # pid -> (comm, starttime) dari /proc/<pid>/stat (Linux, mode poll)
+        self.last_refresh = 0.0
+        self.game_set = frozenset()
+        self.game_key = None
+        self.events_active = False
+        self.needs_resync = True
+        self.stats = {"source": "poll", "checks": 0, "last_check_ms": 0.0, "total_check_s": 0.0,
+                      "pids_inspected": 0, "events": 0}
+
+    def _refresh_game_set(self):
+        key = tuple(GAMES_BASE + config.get("games", []))
+        if key != self.game_key:
+            self.game_key = key
+            self.game_set = frozenset(g.lower() for g in key)
+            with self.lock:
+                self.game_pids = {pid for pid, name in self.names.items() if name in self.game_set}
+
+    @staticmethod
+    def _process_name(pid):
+        import psutil
+        try:
+            return (psutil.Process(pid).name() or "").lower()
+        except psutil.AccessDenied:
+            return ""  # Tetap dicache agar tidak dibaca ulang setiap pengecekan
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return None
+
+    @staticmethod
+    def _stat_signature(pid):
+        """(comm, starttime) dari /proc/<pid>/stat, atau None jika proses sudah tidak ada."""
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        end = data.rfind(b")")  # comm bisa mengandung spasi/kurung
+        return data[data.find(b"(") + 1:end], data[end + 2:].split()[19]
+
+    def _renamed_pids(self, pids, known):
+        """PID lama yang namanya perlu dibaca ulang karena proses exec/rename tanpa ganti PID."""
+        linux = sys.platform.startswith("linux")
+        if linux:
+            # Di antara pemeriksaan ulang, /proc/<pid>/stat hanya dibaca untuk PID baru
+            for pid in known - pids:
+                self.signatures.pop(pid, None)
+            for pid in pids - known:
+                self.signatures[pid] = self._stat_signature(pid)
+        now = time.monotonic()
+        if now - self.last_refresh < GAME_NAME_REFRESH_S:
+            return set()
+        self.last_refresh = now
+        if not linux:
+            return known & pids
+        renamed = set()
+        for pid in known & pids:
+            signature = self._stat_signature(pid)
+            if signature != self.signatures.get(pid):
+                self.signatures[pid] = signature
+                renamed.add(pid)
+        return renamed
+
+    def _set_names(self, names, dead=()):
+        with self.lock:
+            for pid in dead:
+                self.names.pop(pid, None)
+                self.game_pids.discard(pid)
+            for pid, name in names.items():
+                if name is None:
+                    self.names.pop(pid, None)
+                    self.game_pids.discard(pid)
+                    continue
+                self.names[pid] = name
+                if name in self.game_set:
+                    self.game_pids.add(pid)
+                else:
+                    self.game_pids.discard(pid)
+
+    def _sync(self):
+        """Diff daftar PID: baca nama hanya untuk PID baru/berganti nama, buang PID yang sudah mati."""
+        import psutil
+        pids = set(psutil.pids())
+        with self.lock:
+            known = set(self.names)
+            self.pending.clear()
+        stale = (pids - known) | self._renamed_pids(pids, known)
+        self._set_names({pid: self._process_name(pid) for pid in stale}, dead=known - pids)
+        return len(stale)
+
+    def _resolve_pending(self):
+        with self.lock:
+            pending, self.pending = self.pending, set()
+        self._set_names({pid: self._process_name(pid) for pid in pending})
+        return len(pending)
+
+    def is_game_running(self):
+        start = time.perf_counter()
+        self._refresh_game_set()
+        try:
+            if self.events_active and not self.needs_resync:
+                inspected = self._resolve_pending()
+            else:
+                self.needs_resync = False
+                inspected = self._sync()
+        except Exception as e:
+            log_warn(f"Game detection error: {e}")
+            inspected = 0
+        with self.lock:
+            running = bool(self.game_pids)
+        elapsed = time.perf_counter() - start
+        self.stats["checks"] += 1
+        self.stats["last_check_ms"] = round(elapsed * 1000, 3)
+        self.stats["total_check_s"] += elapsed
+        self.stats["pids_inspected"] += inspected
+        GAME_CHECK_SECONDS.observe(elapsed)
+        GAME_PIDS_INSPECTED_TOTAL.inc(inspected)
+        GAME_TRACKED_PIDS.set(len(self.names))
+        return running
+
+    def start_events(self):
+        """Berlangganan event proses lewat netlink proc connector (Linux, butuh root)."""
+        if not sys.platform.startswith("linux") or not is_admin():
+            return False
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+            sock.bind((0, CN_IDX_PROC))
+            payload = struct.pack("=I", PROC_CN_MCAST_LISTEN)
+            cn_msg = struct.pack("=IIIIHH", CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(payload), 0) + payload
+            sock.send(struct.pack("=IHHII", 16 + len(cn_msg), NLMSG_DONE, 0, 0, 0) + cn_msg)
+        except (OSError, AttributeError) as e:
+            log_warn(f"Netlink proc connector tidak tersedia, fallback ke polling: {e}")
+            return False
+        self.events_active = True
+        self.needs_resync = True
+        self.stats["source"] = "netlink"
+        threading.Thread(target=self._event_loop, args=(sock,), daemon=True).start()
+        return True
+
+    def _event_loop(self, sock):
+        while True:
+            try:
+                data = sock.recv(65536)
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    # Event hilang karena buffer penuh: lakukan diff penuh di pengecekan berikutnya
+                    self.needs_resync = True
+                    continue
+                log_warn(f"Netlink proc connector berhenti, fallback ke polling: {e}")
+                self.events_active = False
+                self.stats["source"] = "poll"
+                return
+            offset = 0
+            while offset + 16 <= len(data):
+                msg_len = struct.unpack_from("=I", data, offset)[0]
+                if msg_len < 16:
+                    break
+                # nlmsghdr (16) + cn_msg (20) lalu proc_event: what, cpu, timestamp_ns, event_data
+                base = offset + 36
+                if base + 24 <= offset + msg_len:
+                    what = struct.unpack_from("=I", data, base)[0]
+                    pid, tgid = struct.unpack_from("=II", data, base + 16)
+                    if pid == tgid and what in (PROC_EVENT_EXEC, PROC_EVENT_COMM, PROC_EVENT_EXIT):
+                        self.stats["events"] += 1
+                        GAME_PROC_EVENTS_TOTAL.inc()
+                        with self.lock:
+                            if what == PROC_EVENT_EXIT:
+                                self.pending.discard(pid)
+                                self.names.pop(pid, None)
+                                self.game_pids.discard(pid)
+                            else:
+                                self.pending.add(pid)
+                offset += (msg_len + 3) & ~3
+
+game_watcher = GameWatcher()
 
-# -------------------------
-# game detection
-# -------------------------
 def is_game_running():
     if not config.get("game_pause", True):
         return False
-    
-    game_list = GAMES_BASE + config.get("games", [])
-    if not game_list:
-        return False
-    
-    game_set = {g.lower() for g in game_list}
-    try:
-        for proc in psutil.process_iter(['name']):
-            if proc.info['name'].lower() in game_set:
-                return True
-    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-        pass
-    except Exception as e:
-        log_warn(f"Game detection error: {e}")
-    
-    return False
+    return game_watcher.is_game_running()
 
 # -------------------------
-# [PENYEMPURNAAN AKHIR] Fungsi verifikasi DNS yang sangat andal
+# [OPTIMASI] Verifikasi DNS berbasis event
 # -------------------------
-def verify_dns_change(interfaces, expected_dns):
-    system = platform.system()
-    time.sleep(2)  # Beri waktu sistem untuk menerapkan perubahan
+# inotify (linux/inotify.h): resolv.conf biasanya diganti lewat rename, jadi yang dipantau direktorinya
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_CLOEXEC = 0o2000000
+RESOLV_CONF_DIRS = ("/etc", "/run/systemd/resolve", "/run/NetworkManager")
+VERIFY_INITIAL_DELAY_S = 0.05
+VERIFY_MAX_DELAY_S = 1.0
+
+class DNSVerifier:
+    """Verifikasi perubahan DNS tanpa sleep tetap.
+
+    Semua interface dibaca bersamaan; jika DNS belum terlihat, pengecekan diulang dengan
+    backoff eksponensial sampai deadline. Di Linux, inotify pada resolv.conf membangunkan
+    pengecekan lebih awal. submit() berjalan di thread sendiri sehingga loop utama tidak menunggu.
+    """
+
+    def __init__(self):
+        self.changed = threading.Event()
+        self.stopping = False
+        self.watching = False
+        self.runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dns-verify")
+        self.readers = ThreadPoolExecutor(max_workers=8, thread_name_prefix="dns-verify-read")
+        self.last_result = None
 
-    for interface in interfaces:
+    def start_watch(self):
+        """Pantau perubahan resolv.conf lewat inotify (Linux). Gagal = cukup backoff saja."""
+        if self.watching or not sys.platform.startswith("linux"):
+            return self.watching
         try:
-            if system == "Windows":
-                # Metode 1: PowerShell (lebih andal dan tidak tergantung bahasa sistem)
-                try:
-                    cmd = f'powershell -Command "Get-NetIPConfiguration -InterfaceAlias \'{interface}\' | Select-Object -ExpandProperty DnsServer | Select-Object -ExpandProperty ServerAddresses | ConvertTo-Json -Compress"'
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=5)
-                    dns_servers = json.loads(result.stdout)
-                    # PowerShell mungkin mengembalikan satu string jika hanya ada satu DNS
-                    if isinstance(dns_servers, str):
-                        dns_servers = [dns_servers]
-                    if expected_dns in dns_servers:
-                        log_info(f"✓ Verifikasi via PowerShell di '{interface}' berhasil: {expected_dns} aktif.")
-                        return True
-                except (subprocess.CalledProcessError, FileNotFoundError, json.JSONDecodeError, subprocess.TimeoutExpired):
-                    # Metode 2: Fallback ke 'ipconfig' jika PowerShell gagal atau tidak ada
-                    log_warn("PowerShell gagal, fallback ke 'ipconfig'.")
-                    result = subprocess.run(['ipconfig', '/all'], capture_output=True, text=True, encoding='utf-8', errors='ignore')
-                    # Regex yang lebih fleksibel untuk berbagai tipe adapter (Ethernet, Wireless LAN, dll.)
-                    pattern = re.compile(rf".*?adapter {re.escape(interface)}:.*?DNS Servers.*?: ([\d\.:\s]+)", re.DOTALL | re.IGNORECASE)
-                    match = pattern.search(result.stdout)
-                    if match and expected_dns in match.group(1):
-                        log_info(f"✓ Verifikasi via ipconfig di '{interface}' berhasil: {expected_dns} aktif.")
-                        return True
-
-            elif system == "Linux" and shutil_which("nmcli"):
-                # Verifikasi spesifik via nmcli, mencari baris yang relevan
-                cmd = ['nmcli', 'dev', 'show', interface]
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                for line in result.stdout.splitlines():
-                    # Cari baris IP4.DNS atau IP6.DNS yang berisi DNS yang diharapkan
-                    if (line.strip().startswith("IP4.DNS") or line.strip().startswith("IP6.DNS")) and expected_dns in line:
-                        log_info(f"✓ Verifikasi via nmcli di '{interface}' berhasil: {expected_dns} aktif.")
-                        return True
-
-            elif system == "Darwin":
-                # Verifikasi spesifik untuk macOS menggunakan perintah yang konsisten dengan setter
-                cmd = ['networksetup', '-getdnsservers', interface]
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                if expected_dns in result.stdout.splitlines():
-                    log_info(f"✓ Verifikasi via networksetup di '{interface}' berhasil: {expected_dns} aktif.")
-                    return True
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1")
+            watched = [d for d in RESOLV_CONF_DIRS
+                       if os.path.isdir(d) and libc.inotify_add_watch(fd, d.encode(), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) >= 0]
+            if not watched:
+                os.close(fd)
+                return False
+        except (OSError, AttributeError) as e:
+            log_warn(f"inotify tidak tersedia, verifikasi DNS memakai polling: {e}")
+            return False
+        self.watching = True
+        threading.Thread(target=self._watch_loop, args=(fd,), daemon=True).start()
+        return True
+
+    def _watch_loop(self, fd):
+        while True:
+            try:
+                data = os.read(fd, 4096)
+            except OSError:
+                return
+            offset = 0
+            while offset + 16 <= len(data):
+                wd, mask, cookie, name_len = struct.unpack_from("=iIII", data, offset)
+                name = data[offset + 16:offset + 16 + name_len].rstrip(b"\0")
+                offset += 16 + name_len
+                if name == b"resolv.conf":
+                    self.changed.set()
+
+    def _read(self, backend, interface):
+        try:
+            return backend.get_dns(interface)
         except Exception as e:
             log_warn(f"Gagal saat verifikasi DNS di '{interface}': {e}")
-            continue  # Coba interface berikutnya jika ada
+            return None
 
-    log_warn(f"⚠ Verifikasi DNS gagal. {expected_dns} tidak ditemukan di interface aktif manapun.")
-    return False
+    def check(self, interfaces, expected_dns):
+        """Satu pengecekan bersamaan di semua interface. Return interface tempat DNS aktif, atau None."""
+        backend = get_dns_backend()
+        if len(interfaces) == 1:
+            found = [self._read(backend, interfaces[0])]
+        else:
+            found = list(self.readers.map(lambda interface: self._read(backend, interface), interfaces))
+        for interface, dns_servers in zip(interfaces, found):
+            if dns_servers and expected_dns in dns_servers:
+                return interface
+        return None
+
+    def verify(self, interfaces, expected_dns, timeout=None):
+        timeout = config["verify_timeout_s"] if timeout is None else timeout
+        self.start_watch()
+        backend = get_dns_backend()
+        start = time.perf_counter()
+        deadline = start + timeout
+        delay = VERIFY_INITIAL_DELAY_S
+        attempts = 0
+        while True:
+            self.changed.clear()
+            attempts += 1
+            interface = self.check(interfaces, expected_dns)
+            elapsed = time.perf_counter() - start
+            if interface is not None:
+                log_info(f"✓ Verifikasi via {backend.name} di '{interface}' berhasil: {expected_dns} aktif "
+                         f"({elapsed * 1000:.0f} ms, {attempts} pengecekan).")
+                return self._finish(True, expected_dns, elapsed, attempts)
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or self.stopping:
+                log_warn(f"⚠ Verifikasi DNS gagal. {expected_dns} tidak ditemukan di interface aktif manapun.")
+                return self._finish(False, expected_dns, elapsed, attempts)
+            self.changed.wait(min(delay, remaining))
+            delay = min(delay * 2, VERIFY_MAX_DELAY_S)
+
+    def _finish(self, ok, expected_dns, elapsed, attempts):
+        VERIFY_SECONDS.observe(elapsed)
+        VERIFY_TOTAL.inc(result="ok" if ok else "failed")
+        self.last_result = {"dns": expected_dns, "ok": ok, "ms": round(elapsed * 1000, 1), "attempts": attempts}
+        return ok
+
+    def close(self):
+        """Hentikan verifikasi yang sedang menunggu (dipanggil saat shutdown)."""
+        self.stopping = True
+        self.changed.set()
+        self.runner.shutdown(wait=False)
+
+    def submit(self, interfaces, expected_dns):
+        """Verifikasi di background; return Future berisi True/False."""
+        return self.runner.submit(self.verify, list(interfaces), expected_dns)
+
+dns_verifier = DNSVerifier()
+
+def verify_dns_change(interfaces, expected_dns):
+    return dns_verifier.verify(interfaces, expected_dns)
 
 # -------------------------
-# CSV history & Dashboard (Flask)
+# History (SQLite) & Dashboard (Flask)
 # -------------------------
-def save_to_csv(dns, latency):
-    file_exists = os.path.isfile(CSV_FILE)
-    try:
-        with open(CSV_FILE, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            if not file_exists:
-                writer.writerow(['Timestamp', 'DNS', 'Latency (ms)'])
-            writer.writerow([datetime.now().isoformat(), dns, latency])
-    except IOError as e:
-        log_err(f"Gagal menyimpan ke CSV: {e}")
-
-def load_history_from_csv(limit=30): # Increased limit for better chart view
-    history = []
-    if not os.path.isfile(CSV_FILE):
-        return history
+class HistoryStore:
+    """History DNS terbaik per ronde di SQLite (mode WAL).
+
+    Append, baca N baris terakhir dan query rentang waktu memakai index sehingga
+    tidak perlu memindai seluruh history. dns_history.csv lama dimigrasikan sekali
+    saat database pertama kali dibuka.
+
+    Sampel lama di-rollup ke tier 1 menit / 1 jam / 1 hari (min/avg/p95/max),
+    masing-masing dengan retensi sendiri, sehingga grafik jangka panjang dibaca
+    dari beberapa ratus titik yang sudah dihitung dan ukuran file tetap terbatas.
+    """
+
+    ROLLUP_TIERS = {"1m": 60, "1h": 3600, "1d": 86400}
+    ROLLUP_EVERY_S = 60
+
+    def __init__(self, path, csv_path=None):
+        self.path = path
+        self.csv_path = csv_path
+        self.lock = threading.Lock()
+        self.conn = None
+        self.last_rollup = 0.0
+
+    def _connect(self):
+        if self.conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS samples (ts REAL NOT NULL, dns TEXT NOT NULL, latency INTEGER NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_samples_ts ON samples (ts)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            for tier in self.ROLLUP_TIERS:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS rollup_{tier} (bucket INTEGER PRIMARY KEY, count INTEGER NOT NULL, "
+                             "min INTEGER NOT NULL, avg REAL NOT NULL, p95 REAL NOT NULL, max INTEGER NOT NULL)")
+            conn.commit()
+            self.conn = conn
+            if self.csv_path:
+                self._migrate_csv()
+        return self.conn
+
+    def _migrate_csv(self):
+        if not os.path.isfile(self.csv_path):
+            return
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = 'csv_migrated'").fetchone():
+            return
+        rows = []
+        try:
+            with open(self.csv_path, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                next(reader, None)  # Lewati header
+                for row in reader:
+                    try:
+                        timestamp_str, dns_server, latency_str = row
+                        rows.append((datetime.fromisoformat(timestamp_str).timestamp(), dns_server, int(latency_str)))
+                    except (ValueError, IndexError):
+                        continue
+        except OSError as e:
+            log_warn(f"Gagal membaca {self.csv_path} untuk migrasi: {e}")
+            return
+        with self.conn:
+            self.conn.executemany("INSERT INTO samples (ts, dns, latency) VALUES (?, ?, ?)", rows)
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_migrated', ?)", (datetime.now().isoformat(),))
+        log_info(f"{len(rows)} baris history dimigrasikan dari {self.csv_path} ke {self.path}.")
+
+    def append(self, dns_server, latency, ts=None):
+        try:
+            with self.lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute("INSERT INTO samples (ts, dns, latency) VALUES (?, ?, ?)",
+                                 (time.time() if ts is None else ts, dns_server, int(latency)))
+        except sqlite3.Error as e:
+            log_err(f"Gagal menyimpan history: {e}")
+
+    def tail(self, limit, before=None):
+        """N baris terakhir (sebelum ts 'before' jika diisi), urut dari yang terlama: [(ts, dns, latency), ...]."""
+        with self.lock:
+            rows = self._connect().execute(
+                "SELECT ts, dns, latency FROM samples WHERE ts < ? ORDER BY ts DESC LIMIT ?",
+                (time.time() + 1 if before is None else before, limit)).fetchall()
+        rows.reverse()
+        return rows
+
+    def range(self, start_ts, end_ts=None):
+        with self.lock:
+            return self._connect().execute(
+                "SELECT ts, dns, latency FROM samples WHERE ts >= ? AND ts < ? ORDER BY ts",
+                (start_ts, time.time() + 1 if end_ts is None else end_ts)).fetchall()
+
+    def _rollup_tier(self, conn, tier, bucket_s, now):
+        key = f"rollup_{tier}_until"
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        if row:
+            start = float(row[0])
+        else:
+            first = conn.execute("SELECT MIN(ts) FROM samples").fetchone()[0]
+            if first is None:
+                return None
+            start = (int(first) // bucket_s) * bucket_s
+        end = (int(now) // bucket_s) * bucket_s  # Hanya bucket yang sudah lengkap
+        if end <= start:
+            return start
+        buckets = {}
+        for ts, latency in conn.execute("SELECT ts, latency FROM samples WHERE ts >= ? AND ts < ?", (start, end)):
+            buckets.setdefault(int(ts) // bucket_s * bucket_s, []).append(latency)
+        rows = []
+        for bucket, latencies in buckets.items():
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, math.ceil(0.95 * len(latencies)) - 1)]
+            rows.append((bucket, len(latencies), latencies[0], sum(latencies) / len(latencies), p95, latencies[-1]))
+        conn.executemany(f"INSERT OR REPLACE INTO rollup_{tier} (bucket, count, min, avg, p95, max) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(end)))
+        return end
+
+    def rollup(self, now=None):
+        """Rollup bucket yang sudah lengkap lalu buang data yang melewati retensi."""
+        now = time.time() if now is None else now
+        retention = config["history_retention_days"]
+        try:
+            with self.lock:
+                conn = self._connect()
+                with conn:
+                    watermarks = [self._rollup_tier(conn, tier, bucket_s, now) for tier, bucket_s in self.ROLLUP_TIERS.items()]
+                    # Sampel mentah hanya dibuang setelah masuk ke semua tier
+                    rolled_until = min((w for w in watermarks if w is not None), default=0)
+                    conn.execute("DELETE FROM samples WHERE ts < ? AND ts < ?", (now - retention["raw"] * 86400, rolled_until))
+                    for tier in self.ROLLUP_TIERS:
+                        conn.execute(f"DELETE FROM rollup_{tier} WHERE bucket < ?", (now - retention[tier] * 86400,))
+            self.last_rollup = time.monotonic()
+        except sqlite3.Error as e:
+            log_warn(f"Gagal melakukan rollup history: {e}")
+
+    def maybe_rollup(self):
+        if time.monotonic() - self.last_rollup >= self.ROLLUP_EVERY_S:
+            self.rollup()
+
+    def rollups(self, tier, start_ts, end_ts=None):
+        """Bucket rollup di rentang waktu: [(bucket, count, min, avg, p95, max), ...]."""
+        if tier not in self.ROLLUP_TIERS:
+            raise ValueError(f"Tier rollup tidak dikenal: {tier}")
+        with self.lock:
+            return self._connect().execute(
+                f"SELECT bucket, count, min, avg, p95, max FROM rollup_{tier} WHERE bucket >= ? AND bucket < ? ORDER BY bucket",
+                (start_ts, time.time() + 1 if end_ts is None else end_ts)).fetchall()
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+history_store = HistoryStore(HISTORY_DB, csv_path=CSV_FILE)
+
+def save_history(dns, latency):
+    history_store.append(dns, latency)
+
+def load_history(limit=30, before=None):
+    """[(ts, latency), ...] terakhir dari database, urut dari yang terlama."""
     try:
-        with open(CSV_FILE, 'r', newline='', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            next(reader, None) # Lewati header
-            all_data = list(reader)
-            for row in all_data[-limit:]:
-                try:
-                    timestamp_str, _, latency_str = row
-                    dt_obj = datetime.fromisoformat(timestamp_str)
-                    history.append({
-                        "time": dt_obj.strftime("%H:%M:%S"),
-                        "latency": int(latency_str)
-                    })
-                except (ValueError, IndexError):
-                    continue
-    except Exception as e:
-        log_warn(f"Gagal memuat history dari CSV: {e}")
-    return history
+        rows = history_store.tail(limit, before)
+    except sqlite3.Error as e:
+        log_warn(f"Gagal memuat history: {e}")
+        return []
+    return [(ts, latency) for ts, _, latency in rows]
 
-app = Flask(__name__)
+def history_point(ts, latency):
+    """Satu titik grafik "Live" dalam format yang dipakai dashboard."""
+    return {"time": datetime.fromtimestamp(ts).strftime("%H:%M:%S"), "latency": latency}
+
+# Rentang grafik -> (tier, durasi detik). Tier dipilih agar tiap grafik cukup beberapa ratus titik.
+HISTORY_RANGES = {
+    "1h": ("raw", 3600),
+    "24h": ("1m", 86400),
+    "7d": ("1h", 7 * 86400),
+    "30d": ("1h", 30 * 86400),
+    "365d": ("1d", 365 * 86400),
+}
+
+def load_history_range(range_key):
+    tier, duration_s = HISTORY_RANGES[range_key]
+    start_ts = time.time() - duration_s
+    if tier == "raw":
+        return [{"t": ts, "min": latency, "avg": latency, "p95": latency, "max": latency}
+                for ts, _, latency in history_store.range(start_ts)]
+    return [{"t": bucket, "min": low, "avg": round(avg, 1), "p95": p95, "max": high}
+            for bucket, _, low, avg, p95, high in history_store.rollups(tier, start_ts)]
 
 # Lock ini penting untuk mencegah 'race condition' di mana thread utama (worker) menulis
 # data bersamaan dengan thread Flask (dashboard) yang membacanya.
@@ -423,11 +3076,134 @@ dashboard_data = {
     "latency": 0,
     "status": "Initializing...",
     "last_update": "N/A",
-    "history": load_history_from_csv(30)
+    "history": SampleRing(HISTORY_LEN)  # History lama dimuat oleh load_dashboard_history()
 }
 
-def get_client_info():
-    user_agent = flask_request.user_agent.string.lower()
+# -------------------------
+# [OPTIMASI] Server-Sent Events: worker mendorong perubahan ke dashboard
+# -------------------------
+class EventBroker:
+    """Menyebarkan perubahan state ke semua klien SSE yang terhubung.
+
+    Setiap klien punya antrean sendiri; klien yang terlalu lambat (antrean penuh)
+    diputus dan browser akan reconnect lalu menerima state penuh lagi.
+    """
+
+    QUEUE_SIZE = 64
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = set()
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.discard(q)
+
+    def publish(self, changes):
+        with self.lock:
+            if not self.subscribers:
+                return
+            subscribers = list(self.subscribers)
+        message = json.dumps(changes)
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                self.unsubscribe(q)
+                self._close(q)
+
+    @staticmethod
+    def _close(q):
+        """Kirim sinyal penutup ke klien lambat. Pesan yang tertunda dibuang (klien menerima
+        state penuh saat reconnect) agar sinyal pasti muat di antrean."""
+        while True:
+            try:
+                while True:
+                    q.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                q.put_nowait(None)
+                return
+            except queue.Full:
+                continue  # publish lain sempat mengisi antrean lagi
+
+event_broker = EventBroker()
+
+# -------------------------
+# [OPTIMASI] Snapshot state yang sudah di-encode untuk handler dashboard
+# -------------------------
+class StateSnapshot:
+    """State dashboard yang tidak berubah lagi setelah dibuat, beserta JSON-nya.
+
+    Worker membuat snapshot baru setiap kali state berubah; handler cukup membaca
+    referensi 'state_snapshot' tanpa lock. JSON disimpan tanpa '}' penutup agar
+    info klien (per User-Agent) bisa langsung disambung.
+    """
+
+    __slots__ = ("version", "state", "prefix")
+
+    def __init__(self, version, state):
+        self.version = version
+        self.state = state
+        self.prefix = json.dumps(state, separators=(",", ":")).encode()[:-1]
+
+state_snapshot = None
+# Versi snapshot mulai dari 1 di setiap proses; ETag juga memuat id acak per proses
+# supaya ETag lama dari sebelum daemon restart tidak lagi dijawab 304
+SNAPSHOT_BOOT_ID = os.urandom(4).hex()
+
+def _rebuild_snapshot_locked():
+    global state_snapshot
+    state = dict(dashboard_data)
+    state["history"] = [history_point(ts, latency) for ts, latency in state["history"].items()]
+    state_snapshot = StateSnapshot(state_snapshot.version + 1 if state_snapshot else 1, state)
+
+with data_lock:
+    _rebuild_snapshot_locked()
+
+def update_dashboard(history_latency=None, push=True, **fields):
+    """Perbarui dashboard_data dan snapshot-nya.
+
+    Hanya field yang benar-benar berubah dikirim ke klien SSE; push=False untuk
+    data yang sering berubah tapi tidak perlu didorong (mis. metrik).
+    """
+    with data_lock:
+        changes = {key: value for key, value in fields.items() if dashboard_data.get(key) != value}
+        dashboard_data.update(changes)
+        if history_latency is not None:
+            now = time.time()
+            dashboard_data["history"].append(history_latency, now)
+            changes["history_append"] = [history_point(now, round(history_latency, 3))]
+        if changes:
+            _rebuild_snapshot_locked()
+    if changes and push:
+        event_broker.publish(changes)
+
+def load_dashboard_history():
+    """[OPTIMASI] Muat history lama untuk grafik "Live" saat dashboard dijalankan, bukan saat import.
+
+    Hanya baris dari sebelum program mulai yang dibaca dari database; baris sesudahnya
+    sudah masuk ke ring buffer lewat update_dashboard, jadi tidak ada yang tercatat dua kali.
+    """
+    rows = load_history(HISTORY_LEN, before=STARTED_AT)
+    with data_lock:
+        history = SampleRing(HISTORY_LEN)
+        for ts, latency in rows + dashboard_data["history"].items():
+            history.append(latency, ts)
+        dashboard_data["history"] = history
+        _rebuild_snapshot_locked()
+
+@lru_cache(maxsize=256)
+def parse_user_agent(user_agent):
+    """(platform, browser) dari string User-Agent; di-cache karena browser yang sama mengirim UA yang sama."""
+    user_agent = user_agent.lower()
     platform_name, browser_name = "Unknown", "Unknown"
     if 'windows' in user_agent: platform_name = "Windows"
     elif 'linux' in user_agent: platform_name = "Linux"
@@ -440,8 +3216,15 @@ def get_client_info():
     elif 'safari' in user_agent and 'chrome' not in user_agent: browser_name = "Safari"
     elif 'edg' in user_agent: browser_name = "Edge"
     elif 'opera' in user_agent: browser_name = "Opera"
-    return {"client_platform": platform_name, "client_browser": browser_name
-}
+    return platform_name, browser_name
+
+def get_client_info(user_agent):
+    platform_name, browser_name = parse_user_agent(user_agent)
+    return {"client_platform": platform_name, "client_browser": browser_name}
+
+@lru_cache(maxsize=64)
+def client_json_suffix(platform_name, browser_name):
+    return ("," + json.dumps({"client_platform": platform_name, "client_browser": browser_name}, separators=(",", ":"))[1:]).encode()
 
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -587,7 +3370,7 @@ HTML_TEMPLATE = """
                 <div class="meta-row" style="margin-top:16px">
                     <div class="meta"><i class="fas fa-clock"></i><span id="lastUpdate">{{ data.last_update }}</span></div>
                     <div class="meta tooltip"><i class="fas fa-info-circle"></i><span>Info</span>
-                        <div class="tt">Dashboard refresh setiap {{ refresh_rate }} detik</div>
+                        <div class="tt">Dashboard diperbarui langsung saat ada perubahan (fallback: setiap {{ refresh_rate }} detik)</div>
                     </div>
                 </div>
             </article>
@@ -617,6 +3400,16 @@ HTML_TEMPLATE = """
         </section>
 
         <div class="chart-wrap">
+            <div style="display:flex; justify-content:flex-end; margin-bottom:8px">
+                <select id="chartRange" onchange="changeRange(this.value)" style="font-family:inherit; padding:4px 8px; border-radius:8px">
+                    <option value="live">Live</option>
+                    <option value="1h">1 jam</option>
+                    <option value="24h">24 jam</option>
+                    <option value="7d">7 hari</option>
+                    <option value="30d">30 hari</option>
+                    <option value="365d">1 tahun</option>
+                </select>
+            </div>
             <canvas id="chartCanvas"></canvas>
         </div>
 
@@ -628,6 +3421,11 @@ HTML_TEMPLATE = """
     let myChart = null;
     let prevLatency = null;
     let prevBestDns = null;
+    let chartRange = 'live';
+    let liveHistory = [];
+    let state = {};
+    let pollTimer = null;
+    const historyLen = {{ history_len }};
 
     // --- HELPER FUNCTIONS ---
     function getTextColor() {
@@ -714,6 +3512,23 @@ HTML_TEMPLATE = """
         myChart.update('none');
     }
 
+    async function changeRange(range) {
+        chartRange = range;
+        if (range === 'live') return updateChart(liveHistory);
+        try {
+            const res = await fetch(`/history?range=${range}`);
+            if (!res.ok) throw new Error('Network response was not ok');
+            const data = await res.json();
+            const longRange = range !== '1h' && range !== '24h';
+            updateChart(data.points.map(p => {
+                const d = new Date(p.t * 1000);
+                return { time: longRange ? d.toLocaleDateString() + ' ' + d.toLocaleTimeString([], {hour: '2-digit'}) : d.toLocaleTimeString(), latency: p.avg };
+            }));
+        } catch (err) {
+            console.error('History fetch error:', err);
+        }
+    }
+
     // --- UI UPDATE LOGIC ---
     function updateStatus(statusStr) {
         const badge = document.getElementById('statusBadge');
@@ -773,51 +3588,88 @@ HTML_TEMPLATE = """
     }
 
     // --- MAIN FETCH & UPDATE LOOP ---
+    function applyData(data) {
+        updateStatus(data.status || 'Unknown');
+        updateText('currentDns', data.current_dns || 'N/A');
+        updateText('lastUpdate', data.last_update || 'N/A');
+        
+        const latency = data.latency === "N/A" ? null : parseInt(data.latency);
+        if (latency !== null) {
+            updateText('latency', latency);
+            if (prevLatency !== null && latency !== prevLatency) {
+                flashLatency(latency - prevLatency);
+            }
+            prevLatency = latency;
+        } else {
+            updateText('latency', 'N/A');
+        }
+
+        if (data.best_dns && data.best_dns !== prevBestDns) {
+            updateText('bestDns', data.best_dns);
+            document.getElementById('bestDns').style.transform = 'scale(1.1)';
+            setTimeout(() => { document.getElementById('bestDns').style.transform = 'scale(1)'; }, 300);
+            prevBestDns = data.best_dns;
+        }
+        
+        updateClientIcons(data.client_platform, data.client_browser);
+        liveHistory = data.history || [];
+        if (chartRange === 'live') updateChart(liveHistory);
+    }
+
+    // --- FALLBACK: POLLING /data ---
     async function fetchData() {
         try {
             const res = await fetch('/data');
             if (!res.ok) throw new Error('Network response was not ok');
-            const data = await res.json();
-
-            updateStatus(data.status || 'Unknown');
-            updateText('currentDns', data.current_dns || 'N/A');
-            updateText('lastUpdate', data.last_update || 'N/A');
-            
-            const latency = data.latency === "N/A" ? null : parseInt(data.latency);
-            if (latency !== null) {
-                updateText('latency', latency);
-                if (prevLatency !== null && latency !== prevLatency) {
-                    flashLatency(latency - prevLatency);
-                }
-                prevLatency = latency;
-            } else {
-                updateText('latency', 'N/A');
-            }
-
-            if (data.best_dns && data.best_dns !== prevBestDns) {
-                updateText('bestDns', data.best_dns);
-                document.getElementById('bestDns').style.transform = 'scale(1.1)';
-                setTimeout(() => { document.getElementById('bestDns').style.transform = 'scale(1)'; }, 300);
-                prevBestDns = data.best_dns;
-            }
-            
-            updateClientIcons(data.client_platform, data.client_browser);
-            updateChart(data.history || []);
-
+            state = await res.json();
+            applyData(state);
         } catch (err) {
             console.error('Fetch error:', err);
             updateStatus('Error: Disconnected');
         }
     }
 
+    function startPolling() {
+        if (pollTimer) return;
+        fetchData();
+        pollTimer = setInterval(fetchData, refreshRate * 1000);
+    }
+
+    function stopPolling() {
+        if (pollTimer) { clearInterval(pollTimer); pollTimer = null; }
+    }
+
+    // --- PUSH: SERVER-SENT EVENTS ---
+    function startEvents() {
+        if (!window.EventSource) return startPolling();
+        const source = new EventSource('/events');
+        // State penuh dikirim setiap kali (re)connect
+        source.addEventListener('state', (e) => {
+            stopPolling();
+            state = JSON.parse(e.data);
+            applyData(state);
+        });
+        // Setelah itu hanya field yang berubah + titik history baru
+        source.onmessage = (e) => {
+            const changes = JSON.parse(e.data);
+            if (changes.history_append) {
+                state.history = (state.history || []).concat(changes.history_append).slice(-historyLen);
+                delete changes.history_append;
+            }
+            Object.assign(state, changes);
+            applyData(state);
+        };
+        // EventSource reconnect sendiri; sementara itu pakai polling
+        source.onerror = () => startPolling();
+    }
+
     // --- INITIALIZATION ---
     window.addEventListener('load', () => {
         // Create chart immediately with data injected from server
         createChart({{ data.history | tojson }});
         
-        // Fetch fresh data to populate all fields and then start the timer
-        fetchData();
-        setInterval(fetchData, refreshRate * 1000);
+        // Dengarkan perubahan lewat SSE; polling /data hanya sebagai fallback
+        startEvents();
 
         // Set initial theme icon
         if (window.matchMedia && window.matchMedia('(prefers-color-scheme: dark)').matches) {
@@ -829,65 +3681,278 @@ HTML_TEMPLATE = """
 </html>
 """
 
-@app.route('/')
-def dashboard():
-    client_data = get_client_info()
-    with data_lock:
-        current_data = dashboard_data.copy()
-        # FIX: Convert deque to list for Jinja serialization as suggested
-        if isinstance(current_data['history'], deque):
-            current_data['history'] = list(current_data['history'])
-    return render_template_string(HTML_TEMPLATE, 
-                                data={**current_data, **client_data}, 
-                                refresh_rate=config['dashboard']['refresh_s'])
-
-@app.route('/data')
-def data_api():
-    client_data = get_client_info()
-    with data_lock:
-        current_data = dashboard_data.copy()
-        # Saat mengirim ke API, ubah deque menjadi list agar menjadi JSON yang valid
-        if isinstance(current_data['history'], deque):
-            current_data['history'] = list(current_data['history'])
-    return jsonify({**current_data, **client_data})
+@lru_cache(maxsize=1)
+def page_template():
+    # Dikompilasi sekali; render_template_string mengompilasi ulang di setiap request
+    return get_app().jinja_env.from_string(HTML_TEMPLATE)
+
+@lru_cache(maxsize=32)
+def render_page(snapshot, platform_name, browser_name):
+    return page_template().render(
+        data={**snapshot.state, "client_platform": platform_name, "client_browser": browser_name},
+        refresh_rate=config['dashboard']['refresh_s'],
+        history_len=HISTORY_LEN).encode()
+
+_app = None
+
+def get_app():
+    """Aplikasi Flask dashboard, dibuat saat pertama kali dibutuhkan."""
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
+
+def create_app():
+    # [OPTIMASI] Flask (+ werkzeug/jinja2) hanya di-import jika dashboard aktif
+    from flask import Flask, Response, g as flask_g, jsonify, request as flask_request
+
+    app = Flask(__name__)
+
+    def snapshot_response(body_fn, mimetype):
+        """Layani snapshot terbaru dengan ETag per (proses, versi state, jenis klien) dan dukungan 304."""
+        snapshot = state_snapshot
+        platform_name, browser_name = parse_user_agent(flask_request.headers.get("User-Agent", ""))
+        etag = f"{SNAPSHOT_BOOT_ID}-{snapshot.version}-{platform_name}-{browser_name}"
+        headers = {"ETag": f'"{etag}"', "Cache-Control": "no-cache"}
+        if flask_request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+        return Response(body_fn(snapshot, platform_name, browser_name), mimetype=mimetype, headers=headers)
+
+    @app.route('/')
+    def dashboard():
+        return snapshot_response(render_page, "text/html")
+
+    @app.route('/data')
+    def data_api():
+        return snapshot_response(lambda snapshot, platform_name, browser_name:
+                                 snapshot.prefix + client_json_suffix(platform_name, browser_name), "application/json")
+
+    @app.route('/events')
+    def events_stream():
+        subscriber = event_broker.subscribe()
+        initial = json.dumps({**state_snapshot.state, **get_client_info(flask_request.headers.get("User-Agent", ""))})
+
+        def stream():
+            try:
+                yield f"retry: 5000\nevent: state\ndata: {initial}\n\n"
+                while True:
+                    try:
+                        message = subscriber.get(timeout=15)
+                    except queue.Empty:
+                        yield ": keep-alive\n\n"  # Juga mendeteksi klien yang sudah putus
+                        continue
+                    if message is None:
+                        return
+                    yield f"data: {message}\n\n"
+            finally:
+                event_broker.unsubscribe(subscriber)
+
+        return Response(stream(), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @app.route('/history')
+    def history_api():
+        range_key = flask_request.args.get("range", "24h")
+        if range_key not in HISTORY_RANGES:
+            return jsonify({"error": f"range harus salah satu dari: {', '.join(HISTORY_RANGES)}"}), 400
+        try:
+            points = load_history_range(range_key)
+        except sqlite3.Error as e:
+            log_warn(f"Gagal memuat history {range_key}: {e}")
+            return jsonify({"error": "history tidak tersedia"}), 500
+        return jsonify({"range": range_key, "tier": HISTORY_RANGES[range_key][0], "points": points})
+
+    @app.before_request
+    def _start_request_timer():
+        flask_g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_request_latency(response):
+        start = getattr(flask_g, "request_start", None)
+        if start is not None:
+            DASHBOARD_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=flask_request.endpoint or "unknown")
+        return response
+
+    @app.route('/metrics')
+    def metrics_api():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+    @app.route('/stats')
+    def stats_api():
+        summary = stats_store.summary()
+        for dns_server, entry in encrypted_prober.summary().items():
+            summary.setdefault(dns_server, {}).update(entry)
+        return jsonify(summary)
+
+    return app
 
 def run_dashboard():
     if config['dashboard']['enabled']:
         host = config['dashboard']['host']
         port = config['dashboard']['port']
+        load_dashboard_history()
         log_info(f"Dashboard berjalan di http://{host}:{port}")
-        app.run(host=host, port=port, debug=False, use_reloader=False)
+        get_app().run(host=host, port=port, debug=False, use_reloader=False)
+
+# -------------------------
+# [FITUR BARU] Hot reload config (SIGHUP / config.json berubah)
+# -------------------------
+CONFIG_POLL_S = 2
+# Kunci yang hanya berlaku setelah restart (server dashboard, backend DNS, mode manual)
+RESTART_KEYS = ("dashboard", "dns_backend", "dns_selection_mode", "manual_dns", "forwarder")
+
+class ConfigReloader:
+    """Muat ulang config.json tanpa restart dan tanpa reset DNS.
+
+    SIGHUP atau perubahan mtime config.json menandai reload; loop utama menjalankannya
+    di awal iterasi berikutnya (dibangunkan dari sleep interval). Config baru divalidasi
+    dulu — jika gagal dibaca, config lama tetap dipakai — lalu hanya selisihnya diterapkan.
+    """
+
+    def __init__(self):
+        self.requested = threading.Event()
+        self.wake = threading.Event()
+        self.mtime = self._mtime()
+        self.watching = False
+
+    @staticmethod
+    def _mtime():
+        try:
+            return os.stat(CONFIG_FILE).st_mtime_ns
+        except OSError:
+            return None
+
+    def request(self, signum=None, frame=None):
+        self.requested.set()
+        self.wake.set()
+
+    def start_watch(self):
+        if not self.watching:
+            self.watching = True
+            threading.Thread(target=self._watch_loop, daemon=True).start()
+
+    def _watch_loop(self):
+        while True:
+            time.sleep(CONFIG_POLL_S)
+            if self._mtime() != self.mtime:
+                self.request()
+
+    def sleep(self, seconds):
+        """Sleep interval loop utama; bangun lebih awal jika ada reload. Return detik yang benar-benar berlalu."""
+        start = time.monotonic()
+        self.wake.wait(seconds)
+        self.wake.clear()
+        return time.monotonic() - start
+
+    def reload(self):
+        """Terapkan config baru. Return {kunci: (lama, baru)} untuk kunci yang berubah."""
+        self.requested.clear()
+        self.mtime = self._mtime()
+        try:
+            new = load_config(strict=True)
+        except Exception as e:
+            log_warn(f"Config baru tidak valid ({e}) — tetap memakai config lama.")
+            return {}
+        changes = {key: (config.get(key), value) for key, value in new.items() if config.get(key) != value}
+        for key in RESTART_KEYS:
+            if changes.pop(key, None) is not None:
+                new[key] = config[key]
+                log_warn(f"Perubahan '{key}' baru berlaku setelah restart.")
+        if not changes:
+            return {}
+        config.update(new)
+        self._apply(changes)
+        log_info(f"Config dimuat ulang: {', '.join(sorted(changes))}")
+        return changes
+
+    def _apply(self, changes):
+        global DNS_IPV4, DNS_IPV6
+        if "custom_dns" in changes:
+            before = set(DNS_IPV4 + DNS_IPV6)
+            DNS_IPV4, DNS_IPV6 = build_dns_list()
+            after = set(DNS_IPV4 + DNS_IPV6)
+            # Statistik & scheduler dikunci per server, jadi server yang dihapus lalu ditambah lagi tidak mulai dari nol
+            log_info(f"Target probe: +{len(after - before)} / -{len(before - after)} server.")
+        if "dns_update_url" in changes:
+            if not config["dns_update_url"]:
+                resolver_sync._merge([])
+            resolver_sync.trigger()
+        if "probe_concurrency" in changes and _probe_engine is not None:
+            _probe_engine.concurrency = config["probe_concurrency"]
+        if "game_pause" in changes and config["game_pause"] and not game_watcher.events_active:
+            game_watcher.start_events()
+
+config_reloader = ConfigReloader()
 
 # -------------------------
 # Graceful shutdown
 # -------------------------
 def cleanup_and_exit(signum=None, frame=None):
     log_info("Membersihkan dan keluar...")
-    interfaces = get_interfaces()
+    stats_store.snapshot()
+    history_store.close()
+    dns_verifier.close()
+    encrypted_prober.close()
+    interfaces = interface_registry.active() if interface_registry.source else get_interfaces()
     if interfaces:
         log_info(f"Mereset DNS ke DHCP untuk: {', '.join(interfaces)}")
-        for interface in interfaces:
-            reset_dns_on_interface(interface)
+        dns_applier.reset(interfaces)
     log_info("Selesai.")
     sys.exit(0)
 
-# Register signal handlers
-signal.signal(signal.SIGINT, cleanup_and_exit)
-signal.signal(signal.SIGTERM, cleanup_and_exit)
-if hasattr(signal, 'SIGHUP'):
-    signal.signal(signal.SIGHUP, cleanup_and_exit)
+def register_signal_handlers():
+    signal.signal(signal.SIGINT, cleanup_and_exit)
+    signal.signal(signal.SIGTERM, cleanup_and_exit)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, config_reloader.request)
+
+def startup():
+    """[OPTIMASI] Efek samping saat program mulai (bukan saat import): file log, config.json, daftar DNS."""
+    global DNS_IPV4, DNS_IPV6
+    setup_logging()
+    config.update(load_config())
+    DNS_IPV4, DNS_IPV6 = build_dns_list()
+    STARTUP_SECONDS.set(round(time.perf_counter() - STARTUP_T0, 4), phase="startup")
 
 # -------------------------
 # Main worker
 # -------------------------
+def resolve_use_ipv6():
+    # Logika untuk auto-disable IPv6
+    effective_use_ipv6 = config.get("use_ipv6", True)
+    if effective_use_ipv6 and config.get("auto_disable_ipv6", True):
+        if not check_ipv6_connectivity():
+            log_warn("Auto-disabling IPv6 karena konektivitas tidak terdeteksi.")
+            effective_use_ipv6 = False
+    return effective_use_ipv6
+
+def run_in_background(fn):
+    """Jalankan fn di thread daemon; kembalikan Future berisi hasilnya."""
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+def switch_servers(best_dns, results):
+    """DNS terbaik + server tercepat dari address family lainnya, agar IPv4 & IPv6 dipasang dalam satu apply."""
+    other = [(latency, dns) for dns, latency in results.items() if (":" in dns) != (":" in best_dns)]
+    return [best_dns, min(other)[1]] if other else [best_dns]
+
 def worker_main():
-    if not is_admin():
+    if get_dns_backend().requires_admin and not is_admin():
         msg = "Script harus dijalankan sebagai Administrator/root!"
         log_err(msg)
         show_error_popup(msg)
         return
 
-    interfaces = get_interfaces()
+    interfaces = interface_registry.start()
+    interface_registry.on_change(dns_applier.on_interfaces_changed)
     if not interfaces:
         msg = "Tidak menemukan interface jaringan yang aktif. Periksa koneksi Anda."
         log_err(msg)
@@ -910,19 +3975,18 @@ def worker_main():
             threading.Thread(target=run_dashboard, daemon=True).start()
             time.sleep(1)
 
-        success_count = sum(1 for interface in interfaces if set_dns_on_interface(interface, manual_dns_to_set))
-
-        if success_count > 0:
-            log_info(f"DNS manual berhasil diatur pada {success_count} dari {len(interfaces)} interface.")
-            verify_dns_change(interfaces, manual_dns_to_set)
-            with data_lock:
-                dashboard_data.update({
-                    "current_dns": manual_dns_to_set,
-                    "best_dns": manual_dns_to_set,
-                    "latency": "N/A",
-                    "status": f"Manual Mode",
-                    "last_update": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
+        applied = dns_applier.apply(interfaces, manual_dns_to_set)
+
+        if applied["ok"] > 0:
+            log_info(f"DNS manual berhasil diatur pada {applied['ok']} dari {len(interfaces)} interface ({applied['ms']} ms).")
+            dns_verifier.submit(interfaces, manual_dns_to_set)
+            update_dashboard(
+                current_dns=manual_dns_to_set,
+                best_dns=manual_dns_to_set,
+                latency="N/A",
+                status="Manual Mode",
+                last_update=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            )
             log_info("Script akan tetap berjalan untuk menyajikan dashboard. Tekan Ctrl+C untuk keluar.")
             try:
                 while True: time.sleep(3600)
@@ -935,12 +3999,18 @@ def worker_main():
         
         return
 
-    # Logika untuk auto-disable IPv6
+    stats_store.load()
+    if config['game_pause']:
+        game_watcher.start_events()
+
     effective_use_ipv6 = config.get("use_ipv6", True)
+    ipv6_check = None
     if effective_use_ipv6 and config.get("auto_disable_ipv6", True):
-        if not check_ipv6_connectivity():
-            log_warn("Auto-disabling IPv6 karena konektivitas tidak terdeteksi.")
-            effective_use_ipv6 = False
+        # [OPTIMASI] Ping IPv6 (bisa sampai 5 detik) jalan di background; sampai selesai hanya IPv4 yang diuji
+        effective_use_ipv6 = False
+        ipv6_check = run_in_background(resolve_use_ipv6)
+    config_reloader.start_watch()
+    resolver_sync.start()
     
     if config['dashboard']['enabled']:
         threading.Thread(target=run_dashboard, daemon=True).start()
@@ -948,9 +4018,40 @@ def worker_main():
     current_dns = "DHCP"
     last_game_check = 0
     is_game_currently_running = False
+    first_round = True
+
+    forwarder_mode = config.get("dns_selection_mode") == "forwarder"
+    if forwarder_mode:
+        # Upstream awal = fallback_dns sampai ronde probe pertama selesai
+        dns_forwarder.set_upstreams(config.get("fallback_dns", []))
+        stub = config["forwarder"]["listen"]
+        try:
+            dns_forwarder.start()
+        except OSError as e:
+            msg = f"Forwarder DNS gagal listen di {stub}:{config['forwarder']['port']}: {e}"
+            log_err(msg)
+            show_error_popup(msg)
+            return
+        applied = dns_applier.apply(interfaces, stub)
+        if not applied["ok"]:
+            msg = f"Gagal mengarahkan interface ke forwarder {stub}."
+            log_err(msg)
+            show_error_popup(msg)
+            return
+        current_dns = stub
+        update_dashboard(current_dns=stub)
 
     while True:
         try:
+            if config_reloader.requested.is_set():
+                changes = config_reloader.reload()
+                if "use_ipv6" in changes or "auto_disable_ipv6" in changes:
+                    ipv6_check = None
+                    effective_use_ipv6 = resolve_use_ipv6()
+            if ipv6_check is not None and ipv6_check.done():
+                effective_use_ipv6 = ipv6_check.result()
+                ipv6_check = None
+
             # Cek game (dengan cache)
             if config['game_pause'] and (time.time() - last_game_check > config['game_cache_seconds']):
                 last_game_check = time.time()
@@ -958,19 +4059,17 @@ def worker_main():
                 is_game_currently_running = is_game_running()
                 if is_game_currently_running and not game_was_running:
                     log_info("Game terdeteksi, switching DNS dijeda.")
-                    with data_lock:
-                        dashboard_data["status"] = "Dijeda (Game Aktif)"
+                    update_dashboard(status="Dijeda (Game Aktif)")
                 elif not is_game_currently_running and game_was_running:
                     log_info("Game berakhir, switching DNS dilanjutkan.")
-                    with data_lock:
-                        dashboard_data["status"] = "Berjalan"
+                    update_dashboard(status="Berjalan")
 
             if is_game_currently_running:
-                time.sleep(config["interval"])
+                GAME_PAUSE_SECONDS_TOTAL.inc(config_reloader.sleep(config["interval"]))
                 continue
             
-            with data_lock:
-                dashboard_data["status"] = "Menguji..."
+            interfaces = interface_registry.active()
+            update_dashboard(status="Menguji...")
             if config["clear_terminal"]:
                 os.system('cls' if platform.system() == 'Windows' else 'clear')
                 print("DNS Switcher - Monitoring Kinerja DNS\n" + "="*50)
@@ -979,61 +4078,73 @@ def worker_main():
                 print("="*50 + "\n")
 
             all_dns = DNS_IPV4 + (DNS_IPV6 if effective_use_ipv6 else [])
-            log_info(f"Menguji {len(all_dns)} server DNS...")
-            
-            results = {}
-            with ThreadPoolExecutor(max_workers=config["threads"]) as executor:
-                future_to_dns = {executor.submit(test_dns_latency, dns): dns for dns in all_dns}
-                for future in as_completed(future_to_dns):
-                    dns_server = future_to_dns[future]
-                    try:
-                        latency = future.result()
-                        if latency is not None:
-                            results[dns_server] = latency
-                    except Exception as exc:
-                        log_warn(f"Error saat menguji {dns_server}: {exc}")
+            pinned_dns = dns_forwarder.upstreams[0] if forwarder_mode and dns_forwarder.upstreams else current_dns
+            results = probe_round(all_dns, pinned_dns)
+            stats_store.maybe_snapshot()
+            if config["encrypted_probe"]["enabled"]:
+                encrypted_prober.submit(all_dns)  # Hasil masuk ke dashboard saat ronde DoT/DoH selesai
 
             if results:
-                best_dns, best_latency = min(results.items(), key=lambda item: item[1])
+                best_dns, best_score = min(results.items(), key=lambda item: item[1])
+                best = scoring_engine.last[best_dns]
+                best_latency = best["median_ms"]
                 
-                log_info(f"DNS terbaik: {best_dns} ({best_latency} ms)")
+                log_info(f"DNS terbaik: {best_dns} (skor {best_score}: median {best_latency} ms, p90 {best['p90_ms']} ms, "
+                         f"jitter {best['jitter_ms']} ms, loss {best['loss']:.0%})")
                 
-                with data_lock:
-                    dashboard_data.update({
-                        "best_dns": best_dns,
-                        "latency": best_latency,
-                        "last_update": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "status": "Berjalan"
-                    })
-                    history_entry = {"time": datetime.now().strftime("%H:%M:%S"), "latency": best_latency}
-                    # Gunakan deque untuk efisiensi
-                    if not isinstance(dashboard_data["history"], deque):
-                        dashboard_data["history"] = deque(dashboard_data["history"], maxlen=30)
-                    dashboard_data["history"].append(history_entry)
+                update_dashboard(push=False, scores=scoring_engine.last)
+                update_dashboard(
+                    history_latency=best_latency,
+                    best_dns=best_dns,
+                    latency=best_latency,
+                    last_update=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    status="Berjalan",
+                )
                 
-                save_to_csv(best_dns, best_latency)
+                save_history(best_dns, best_latency)
+                history_store.maybe_rollup()
                 
-                if best_dns != current_dns:
-                    log_info(f"Mengganti DNS ke {best_dns}...")
-                    success_count = sum(1 for interface in interfaces if set_dns_on_interface(interface, best_dns))
+                if forwarder_mode:
+                    # Ganti upstream forwarder saja — interface tetap menunjuk ke stub lokal
+                    ranked = sorted(results, key=results.get)
+                    upstreams = ranked[:config["forwarder"]["upstreams"]]
+                    if upstreams != dns_forwarder.upstreams:
+                        log_info(f"Upstream forwarder: {', '.join(upstreams)}")
+                        dns_forwarder.set_upstreams(upstreams)
+                    update_dashboard(push=False, forwarder=dns_forwarder.metrics())
+                else:
+                    should_switch, reason = switch_policy.should_switch(current_dns, best_dns, results)
+                    if should_switch:
+                        log_info(f"Mengganti DNS ke {best_dns} ({reason})...")
+                        applied = dns_applier.apply(interfaces, switch_servers(best_dns, results))
                     
-                    if success_count > 0:
-                        log_info(f"DNS berhasil diubah pada {success_count} interface.")
-                        current_dns = best_dns
-                        with data_lock:
-                            dashboard_data["current_dns"] = current_dns
-                        verify_dns_change(interfaces, best_dns)
+                        if applied["ok"] > 0:
+                            log_info(f"DNS berhasil diubah pada {applied['ok']} interface ({applied['ms']} ms).")
+                            SWITCH_TOTAL.inc(result="ok")
+                            current_dns = best_dns
+                            switch_policy.record_switch()
+                            update_dashboard(current_dns=current_dns)
+                            dns_verifier.submit(interfaces, best_dns)
+                        else:
+                            SWITCH_TOTAL.inc(result="rolled_back" if applied["rolled_back"] else "failed")
+                            failed = {i: r["error"] for i, r in applied["interfaces"].items() if not r["ok"]}
+                            log_err(f"Gagal mengubah DNS ke {best_dns}: {failed}")
+                    elif best_dns == current_dns:
+                        log_info(f"DNS terbaik ({best_dns}) sudah digunakan.")
                     else:
-                        log_err(f"Gagal mengubah DNS ke {best_dns}.")
-                else:
-                    log_info(f"DNS terbaik ({best_dns}) sudah digunakan.")
+                        log_info(f"Tetap memakai {current_dns}: {reason}.")
 
             else:
                 log_err("Tidak ada server DNS yang merespons. Mempertahankan DNS saat ini.")
-                with data_lock:
-                    dashboard_data["status"] = "Error: Tidak ada DNS"
+                update_dashboard(status="Error: Tidak ada DNS")
 
-            time.sleep(config["interval"])
+            if first_round:
+                first_round = False
+                elapsed_s = time.perf_counter() - STARTUP_T0
+                STARTUP_SECONDS.set(round(elapsed_s, 4), phase="first_round")
+                log_info(f"Ronde pertama selesai {elapsed_s * 1000:.0f} ms setelah start.")
+
+            config_reloader.sleep(config["interval"])
             
         except KeyboardInterrupt:
             break
@@ -1041,10 +4152,381 @@ def worker_main():
             log_err(f"Terjadi error pada loop utama: {e}")
             time.sleep(30)
 
+# -------------------------
+# [FITUR BARU] Benchmark offline dengan server DNS palsu di loopback
+# -------------------------
+BENCH_PORT = 53530
+BENCH_DEFAULT_SIZES = "10,100,1000,10000"
+BENCH_DEFAULT_ENGINES = "async:udp,async:dnspython,threads"
+BENCH_ROUND_TIMEOUT_S = 300  # Batas waktu per ronde sebelum proses benchmark dianggap macet
+
+def bench_addresses(count):
+    # Seluruh 127.0.0.0/8 mengarah ke loopback di Linux, jadi setiap server palsu mendapat alamat sendiri
+    return [f"127.10.{i // 254}.{i % 254 + 1}" for i in range(count)]
+
+def raise_fd_limit(needed):
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+def reset_signal_handlers():
+    # Benchmark tidak boleh memicu cleanup_and_exit (yang mereset DNS sistem)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+
+def fake_dns_response(query, rcode):
+    """Bangun response minimal (satu record A) langsung dari bytes query."""
+    end = 12
+    while end < len(query) and query[end]:
+        end += query[end] + 1
+    end += 5  # Label root + QTYPE + QCLASS
+    if end > len(query):
+        return None
+    answer = b"" if rcode else b"\xc0\x0c\x00\x01\x00\x01\x00\x00\x00\x3c\x00\x04\x01\x02\x03\x04"
+    header = query[:2] + (0x8180 | rcode).to_bytes(2, "big") + b"\x00\x01" + (b"\x00\x01" if answer else b"\x00\x00") + b"\x00\x00\x00\x00"
+    return header + query[12:end] + answer
+
+@lru_cache(maxsize=None)
+def fake_dns_protocol_class():
+    """Kelas protocol server DNS palsu, dibuat di proses benchmark (asyncio tidak di-import saat start)."""
+    import asyncio
+
+    class FakeDNSProtocol(asyncio.DatagramProtocol):
+        def __init__(self, loop, latency_s, jitter_s, loss, servfail):
+            self.loop = loop
+            self.latency_s = latency_s
+            self.jitter_s = jitter_s
+            self.loss = loss
+            self.servfail = servfail
+            self.transport = None
+
+        def connection_made(self, transport):
+            self.transport = transport
+
+        def datagram_received(self, data, addr):
+            if random.random() < self.loss:
+                return
+            response = fake_dns_response(data, dns.rcode.SERVFAIL if random.random() < self.servfail else dns.rcode.NOERROR)
+            if response is None:
+                return
+            delay = max(0.0, random.gauss(self.latency_s, self.jitter_s)) if self.jitter_s else self.latency_s
+            self.loop.call_later(delay, self.transport.sendto, response, addr)
+
+    return FakeDNSProtocol
+
+def run_fake_dns_servers(addresses, port, latency_ms, jitter_ms, loss, servfail, ready):
+    """Proses anak: satu socket UDP per server palsu, semuanya dalam satu event loop."""
+    reset_signal_handlers()
+    import asyncio
+    raise_fd_limit(len(addresses) + 64)
+    protocol = fake_dns_protocol_class()
+    loop = asyncio.new_event_loop()
+    rng = random.Random(0)
+    for address in addresses:
+        # Latency dasar tiap server bervariasi 0.5x–1.5x agar ada pemenang yang jelas
+        latency_s = latency_ms * (0.5 + rng.random()) / 1000
+        loop.run_until_complete(loop.create_datagram_endpoint(
+            lambda latency_s=latency_s: protocol(loop, latency_s, jitter_ms / 1000, loss, servfail),
+            local_addr=(address, port)))
+    ready.set()
+    loop.run_forever()
+
+def bench_probe_worker(addresses, settings, rounds, queue):
+    """Proses anak: jalankan ronde probe dan laporkan wall time, CPU time, peak RSS dan latency terukur."""
+    reset_signal_handlers()
+    config.update(settings)
+    raise_fd_limit(len(addresses) * config["dns_query_count"] + 64)
+    round_times = []
+    answered = 0
+    cpu_start = time.process_time()
+    for _ in range(rounds):
+        start = time.perf_counter()
+        answered = len(probe_round(addresses, "DHCP"))
+        round_times.append(time.perf_counter() - start)
+    cpu_s = time.process_time() - cpu_start
+    # Median latency terukur (ronde terakhir); harus sama dengan/tanpa early_stop jika event loop tidak tertahan
+    medians = [entry["median_ms"] for entry in scoring_engine.last.values()]
+    peak_rss_mb = None
+    if resource is not None:
+        # ru_maxrss dalam KB di Linux, dalam bytes di macOS
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    queue.put({
+        "round_s": round(median(round_times), 4),
+        "probes_per_s": round(len(addresses) * config["dns_query_count"] * rounds / sum(round_times), 1),
+        "cpu_s_per_round": round(cpu_s / rounds, 4),
+        "peak_rss_mb": None if peak_rss_mb is None else round(peak_rss_mb, 1),
+        "answered": answered,
+        "median_ms": round(median(medians), 3) if medians else None,
+        "pruned": len(_probe_engine.pruned) if _probe_engine is not None and config["probe_engine"] == "async" else 0,
+    })
+
+def wait_bench_result(worker, results, timeout_s):
+    """Tunggu hasil bench_probe_worker. Return (hasil, None), atau (None, alasan) jika proses mati/macet."""
+    deadline = time.monotonic() + timeout_s
+    while True:
+        try:
+            return results.get(timeout=1), None
+        except queue.Empty:
+            pass
+        if not worker.is_alive():
+            # Hasil bisa saja masih di pipe saat proses baru selesai
+            try:
+                return results.get(timeout=1), None
+            except queue.Empty:
+                return None, f"proses berhenti (exit code {worker.exitcode})"
+        if time.monotonic() > deadline:
+            worker.terminate()
+            return None, f"tidak selesai dalam {timeout_s}s"
+
+def run_benchmark(sizes, engines, rounds=3, latency_ms=20, jitter_ms=5, loss=0.01, servfail=0.01, output=None,
+                  early_stops=(False,)):
+    import multiprocessing  # Hanya --bench yang memakai proses anak
+    reset_signal_handlers()
+    ctx = multiprocessing.get_context()
+    rows = []
+    print(f"{'engine':<16} {'early':>5} {'servers':>8} {'round_s':>9} {'probes/s':>10} {'cpu_s':>8} {'rss_mb':>8} "
+          f"{'answered':>9} {'pruned':>7} {'median_ms':>10}")
+    for count in sizes:
+        addresses = bench_addresses(count)
+        ready = ctx.Event()
+        server = ctx.Process(target=run_fake_dns_servers, args=(addresses, BENCH_PORT, latency_ms, jitter_ms, loss, servfail, ready), daemon=True)
+        server.start()
+        while not ready.wait(0.5):
+            if not server.is_alive():
+                break
+        if not ready.is_set():
+            log_err(f"Server DNS palsu untuk {count} server gagal dijalankan.")
+            continue
+        try:
+            for engine in engines:
+                probe_engine, _, transport = engine.partition(":")
+                # early_stop hanya berlaku untuk engine async
+                for early_stop in early_stops if probe_engine == "async" else (False,):
+                    settings = {
+                        "probe_engine": probe_engine,
+                        "probe_transport": transport or "udp",
+                        "dns_query_port": BENCH_PORT,
+                        "probe_budget": 0,
+                        "cold_probe_zone": "",
+                        "early_stop": early_stop,
+                    }
+                    results = ctx.Queue()
+                    worker = ctx.Process(target=bench_probe_worker, args=(addresses, settings, rounds, results))
+                    worker.start()
+                    result, error = wait_bench_result(worker, results, rounds * BENCH_ROUND_TIMEOUT_S)
+                    worker.join()
+                    if result is None:
+                        rows.append({"engine": engine, "early_stop": early_stop, "servers": count, "error": error})
+                        log_err(f"Benchmark {engine} dengan {count} server gagal: {error}")
+                        continue
+                    row = {"engine": engine, "early_stop": early_stop, "servers": count, **result}
+                    rows.append(row)
+                    print(f"{engine:<16} {'on' if early_stop else 'off':>5} {count:>8} {row['round_s']:>9} {row['probes_per_s']:>10} "
+                          f"{row['cpu_s_per_round']:>8} {str(row['peak_rss_mb']):>8} {row['answered']:>9} {row['pruned']:>7} "
+                          f"{str(row['median_ms']):>10}")
+        finally:
+            server.terminate()
+            server.join()
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({"timestamp": datetime.now().isoformat(), "rounds": rounds, "latency_ms": latency_ms,
+                       "jitter_ms": jitter_ms, "loss": loss, "servfail": servfail, "results": rows}, f, indent=2)
+    return rows
+
+def run_switch_benchmark(switches=100, interface_count=4):
+    """Ukur biaya satu switch (set + verifikasi) lewat backend aktif. Pakai dns_backend "fake" untuk uji tanpa root."""
+    reset_signal_handlers()
+    backend = get_dns_backend()
+    interfaces = [f"bench{i}" for i in range(interface_count)] if isinstance(backend, FakeBackend) else get_interfaces()
+    if not interfaces:
+        log_err("Tidak ada interface untuk benchmark switch.")
+        return None
+    servers = DNS_IPV4[:8]
+    timings = []
+    failures = 0
+    try:
+        for i in range(switches):
+            dns = servers[i % len(servers)]
+            start = time.perf_counter()
+            ok = dns_applier.apply(interfaces, dns)["ok"] == len(interfaces)
+            if not (ok and verify_dns_change(interfaces, dns)):
+                failures += 1
+            timings.append(time.perf_counter() - start)
+    finally:
+        dns_applier.reset(interfaces)
+    timings.sort()
+    row = {
+        "backend": backend.name,
+        "interfaces": len(interfaces),
+        "switches": switches,
+        "median_ms": round(median(timings) * 1000, 3),
+        "p95_ms": round(timings[int(0.95 * (len(timings) - 1))] * 1000, 3),
+        "failures": failures,
+    }
+    print(json.dumps(row))
+    return row
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return None
+        # Fallback: peak RSS (KB di Linux, bytes di macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+def run_memory_report(rounds=2000, server_count=300, top=8):
+    """Laporan tracemalloc: simulasi pemakaian jangka panjang StatsStore + history dashboard.
+
+    Memori harus naik sampai jendela sampel per server penuh lalu datar, berapa pun jumlah rondenya.
+    """
+    import tracemalloc
+    reset_signal_handlers()
+    rng = random.Random(0)
+    servers = [f"10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(server_count)]
+    query_count = config.get("dns_query_count", 3)
+    store = StatsStore(STATS_FILE + ".bench")  # Tidak pernah disimpan
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    rows = []
+    print(f"{'ronde':>7} {'sampel/server':>14} {'traced_mb':>10} {'rss_mb':>8}")
+    for index in range(1, rounds + 1):
+        store.record_round({server: [None if rng.random() < 0.01 else rng.uniform(5, 80) for _ in range(query_count)]
+                            for server in servers})
+        update_dashboard(history_latency=rng.uniform(5, 80), push=False)
+        if index % max(1, rounds // 10) == 0 or index == rounds:
+            traced_mb = (tracemalloc.get_traced_memory()[0] - baseline) / (1024 * 1024)
+            rss_mb = current_rss_mb()
+            rows.append({"round": index, "samples_per_server": len(store.servers[servers[0]].window),
+                         "traced_mb": round(traced_mb, 2), "rss_mb": None if rss_mb is None else round(rss_mb, 1)})
+            print(f"{index:>7} {rows[-1]['samples_per_server']:>14} {rows[-1]['traced_mb']:>10} {str(rows[-1]['rss_mb']):>8}")
+    snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(True, __file__)])
+    print(f"Alokasi terbesar di {os.path.basename(__file__)}:")
+    for stat in snapshot.statistics("lineno")[:top]:
+        frame = stat.traceback[0]
+        print(f"  {stat.size / 1024:>10.1f} KB  {stat.count:>8} blok  baris {frame.lineno}")
+    # Pembanding: jendela yang sama sebagai list dict {"ts", "latency"}
+    window = store.servers[servers[0]].window
+    start = tracemalloc.get_traced_memory()[0]
+    boxed = [{"ts": ts, "latency": latency} for ts, latency in window.items()]
+    boxed_bytes = tracemalloc.get_traced_memory()[0] - start
+    ring_bytes = window.ts.itemsize * len(window.ts) + window.ms.itemsize * len(window.ms)
+    tracemalloc.stop()
+    print(f"Per server ({len(boxed)} sampel): ring buffer {ring_bytes / 1024:.1f} KB vs list dict {boxed_bytes / 1024:.1f} KB")
+    return rows
+
+# -------------------------
+# [OPTIMASI] Benchmark startup di proses baru (gaya python -X importtime)
+# -------------------------
+STARTUP_HEAVY_MODULES = ("flask", "requests", "psutil", "dns.message", "dns.resolver", "dns.asyncquery", "jeepney",
+                         "asyncio", "ssl", "http.client", "multiprocessing")
+STARTUP_BENCH_CODE = """
+import importlib.util, json, sys, time
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("dns_switcher", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+module.startup()
+done = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "startup_ms": (done - imported) * 1000,
+                  "heavy": [name for name in module.STARTUP_HEAVY_MODULES if name in sys.modules]}))
+"""
+
+def startup_process(importtime=False):
+    # -I: direktori kerja tidak masuk sys.path (dns.py tidak menutupi paket dnspython), -B: tanpa .pyc baru
+    cmd = [sys.executable, "-I", "-B"] + (["-X", "importtime"] if importtime else []) + ["-c", STARTUP_BENCH_CODE, os.path.abspath(__file__)]
+    start = time.perf_counter()
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit {result.returncode}")
+    return {"wall_ms": wall_ms, **json.loads(result.stdout.strip().splitlines()[-1])}, result.stderr
+
+def parse_importtime(stderr, top=15):
+    """Baris 'import time: self | cumulative | nama' -> modul tingkat atas dengan waktu kumulatif terbesar."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, self_us, cumulative_us, name = re.split(r"import time:|\|", line)
+        if name.startswith("  "):
+            continue  # Di-import oleh modul lain, sudah termasuk di kumulatif induknya
+        modules.append((int(cumulative_us) / 1000, name.strip()))
+    modules.sort(reverse=True)
+    return modules[:top]
+
+def run_startup_benchmark(rounds=3, output=None):
+    """Ukur waktu start (interpreter + import + startup()) dan modul apa saja yang termuat."""
+    try:
+        runs = [startup_process()[0] for _ in range(rounds)]
+        _, importtime = startup_process(importtime=True)
+    except RuntimeError as e:
+        log_err(f"Benchmark startup gagal: {e}")
+        return None
+    row = {key: round(median(run[key] for run in runs), 2) for key in ("wall_ms", "import_ms", "startup_ms")}
+    row["heavy_loaded"] = runs[-1]["heavy"]
+    row["slowest_imports"] = [{"module": name, "cumulative_ms": round(ms, 2)} for ms, name in parse_importtime(importtime)]
+    print(f"Startup (median {rounds}x): total {row['wall_ms']} ms, import modul {row['import_ms']} ms, startup() {row['startup_ms']} ms")
+    print(f"Modul berat yang ikut termuat: {', '.join(row['heavy_loaded']) or '-'}")
+    print("Import terlama (-X importtime, kumulatif):")
+    for entry in row["slowest_imports"]:
+        print(f"  {entry['cumulative_ms']:>8.2f} ms  {entry['module']}")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({"timestamp": datetime.now().isoformat(), "rounds": rounds, **row}, f, indent=2)
+    return row
+
 # -------------------------
 # ENTRY POINT
 # -------------------------
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="DNS Switcher")
+    parser.add_argument("--bench", action="store_true", help="Jalankan benchmark probe offline dengan server DNS palsu di loopback")
+    parser.add_argument("--bench-sizes", default=BENCH_DEFAULT_SIZES, help="Jumlah server palsu, dipisah koma")
+    parser.add_argument("--bench-engines", default=BENCH_DEFAULT_ENGINES, help="Engine probe yang dibandingkan (engine:transport), dipisah koma")
+    parser.add_argument("--bench-rounds", type=int, default=3)
+    parser.add_argument("--bench-latency-ms", type=float, default=20)
+    parser.add_argument("--bench-jitter-ms", type=float, default=5)
+    parser.add_argument("--bench-loss", type=float, default=0.01)
+    parser.add_argument("--bench-servfail", type=float, default=0.01)
+    parser.add_argument("--bench-early-stop", default="off,on", help="Mode early_stop engine async yang dibandingkan (off,on)")
+    parser.add_argument("--bench-output", help="Simpan hasil benchmark sebagai JSON")
+    parser.add_argument("--bench-switch", type=int, metavar="N", help="Benchmark N kali switch DNS lewat backend dari config (dns_backend)")
+    parser.add_argument("--bench-memory", type=int, metavar="N", help="Laporan memori tracemalloc untuk N ronde simulasi (StatsStore + history dashboard)")
+    parser.add_argument("--bench-memory-servers", type=int, default=300)
+    parser.add_argument("--bench-startup", action="store_true", help="Ukur waktu startup di proses baru (pakai --bench-rounds) beserta laporan -X importtime")
+    args = parser.parse_args()
+
+    if args.bench_startup:
+        run_startup_benchmark(max(1, args.bench_rounds), output=args.bench_output)
+        sys.exit(0)
+
+    startup()
+
+    if args.bench_switch:
+        run_switch_benchmark(args.bench_switch)
+        sys.exit(0)
+
+    if args.bench_memory:
+        run_memory_report(args.bench_memory, max(1, args.bench_memory_servers))
+        sys.exit(0)
+
+    if args.bench:
+        run_benchmark([int(n) for n in args.bench_sizes.split(",")], args.bench_engines.split(","),
+                      rounds=max(1, args.bench_rounds), latency_ms=args.bench_latency_ms, jitter_ms=args.bench_jitter_ms,
+                      loss=args.bench_loss, servfail=args.bench_servfail, output=args.bench_output,
+                      early_stops=[mode.strip() == "on" for mode in args.bench_early_stop.split(",")])
+        sys.exit(0)
+
+    register_signal_handlers()
     log_info("DNS Switcher mulai...")
     try:
         worker_main()
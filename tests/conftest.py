@@ -0,0 +1,26 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# dns.py di root repo menutupi paket dnspython "dns" jika root ada di sys.path
+sys.path[:] = [path for path in sys.path if os.path.abspath(path or os.curdir) != ROOT]
+import dns.message  # noqa: E402,F401
+
+
+@pytest.fixture(scope="session")
+def dns_switcher():
+    spec = importlib.util.spec_from_file_location("dns_switcher", os.path.join(ROOT, "dns.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Modul menulis file (stats, history, cache) relatif terhadap direktori kerja
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
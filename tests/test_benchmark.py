@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+import statistics
+import sys
+
+import pytest
+
+
+def test_crashed_bench_worker_is_reported_instead_of_hanging(dns_switcher):
+    d = dns_switcher
+    ctx = multiprocessing.get_context()
+    results = ctx.Queue()
+    # Meniru bench_probe_worker yang mati (mis. OOM-kill) sebelum mengirim hasil
+    worker = ctx.Process(target=os._exit, args=(3,))
+    worker.start()
+
+    result, error = d.wait_bench_result(worker, results, timeout_s=30)
+    worker.join()
+
+    assert result is None
+    assert "exit code 3" in error
+
+
+def test_bench_worker_result_is_returned(dns_switcher):
+    d = dns_switcher
+    ctx = multiprocessing.get_context()
+    results = ctx.Queue()
+    worker = ctx.Process(target=results.put, args=({"answered": 1},))
+    worker.start()
+
+    assert d.wait_bench_result(worker, results, timeout_s=30) == ({"answered": 1}, None)
+    worker.join()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="server palsu memakai alamat 127.10.x.y (loopback Linux)")
+def test_early_stop_does_not_inflate_measured_latency(dns_switcher, monkeypatch):
+    d = dns_switcher
+    addresses = d.bench_addresses(2000)
+    ctx = multiprocessing.get_context("fork")
+    ready = ctx.Event()
+    server = ctx.Process(target=d.run_fake_dns_servers, args=(addresses, d.BENCH_PORT, 20, 0, 0, 0, ready), daemon=True)
+    server.start()
+    try:
+        assert ready.wait(30)
+        for key, value in {"dns_query_port": d.BENCH_PORT, "probe_engine": "async", "probe_transport": "udp",
+                           "dns_query_count": 3, "cold_probe_zone": ""}.items():
+            monkeypatch.setitem(d.config, key, value)
+        medians = {}
+        for early_stop in (False, True):
+            monkeypatch.setitem(d.config, "early_stop", early_stop)
+            warm, _ = d.collect_probe_samples(addresses)
+            medians[early_stop] = {s: statistics.median(v) for s, v in warm.items() if None not in v}
+    finally:
+        server.terminate()
+        server.join()
+
+    assert d.get_probe_engine().pruned
+    common = set(medians[False]) & set(medians[True])
+    # Server yang sama harus terukur sama; race yang menahan event loop dulu menambah ~8 ms
+    assert statistics.median(medians[True][s] - medians[False][s] for s in common) < 4
@@ -0,0 +1,44 @@
+import json
+
+
+def write_config(path, settings):
+    path.write_text(json.dumps(settings), encoding="utf-8")
+
+
+def test_restart_keys_are_not_hot_applied(dns_switcher, workdir, monkeypatch, capsys):
+    d = dns_switcher
+    monkeypatch.setattr(d, "config", d.load_config(path=None))
+    before = dict(d.config)
+    write_config(workdir / "config.json", {
+        "threads": 20,
+        "dashboard": {"enabled": True, "host": "127.0.0.1", "port": 9090, "refresh_s": 5},
+        "dns_selection_mode": "manual",
+        "manual_dns": "9.9.9.9",
+    })
+
+    changes = d.ConfigReloader().reload()
+
+    assert changes == {"threads": (10, 20)}
+    assert d.config["threads"] == 20
+    out = capsys.readouterr().out
+    for key in ("dashboard", "dns_selection_mode", "manual_dns"):
+        assert d.config[key] == before[key]
+        assert f"Perubahan '{key}' baru berlaku setelah restart." in out
+
+
+def test_malformed_config_keeps_previous_settings(dns_switcher, workdir, monkeypatch, capsys):
+    d = dns_switcher
+    monkeypatch.setattr(d, "config", d.load_config(path=None))
+    reloader = d.ConfigReloader()
+    write_config(workdir / "config.json", {"threads": 20})
+    assert reloader.reload() == {"threads": (10, 20)}
+    before = dict(d.config)
+
+    (workdir / "config.json").write_text('{"threads": 30, "interval": ', encoding="utf-8")
+    reloader.request()
+    changes = reloader.reload()
+
+    assert changes == {}
+    assert d.config == before and d.config["threads"] == 20
+    assert not reloader.requested.is_set()
+    assert "tetap memakai config lama" in capsys.readouterr().out
@@ -0,0 +1,12 @@
+def test_etag_from_previous_process_is_not_answered_with_304(dns_switcher, monkeypatch):
+    d = dns_switcher
+    client = d.create_app().test_client()
+    first = client.get("/data")
+    etag = first.headers["ETag"]
+    assert client.get("/data", headers={"If-None-Match": etag}).status_code == 304
+
+    # Daemon restart: versi snapshot sama, tetapi id proses berbeda
+    monkeypatch.setattr(d, "SNAPSHOT_BOOT_ID", "restarted")
+    second = client.get("/data", headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != etag
@@ -0,0 +1,46 @@
+def failing_backend(d, monkeypatch, broken):
+    """FakeBackend yang menolak set_dns di interface `broken` selama broken.fail bernilai benar."""
+    class FlakyBackend(d.FakeBackend):
+        fail = False
+
+        def set_dns(self, interface, servers):
+            if self.fail and interface == broken:
+                raise OSError(f"{interface} menolak perubahan")
+            return super().set_dns(interface, servers)
+
+    backend = FlakyBackend(delay_s=0.01)
+    monkeypatch.setattr(d, "_dns_backend", backend)
+    monkeypatch.setitem(d.config, "apply_atomic", True)
+    return backend
+
+
+def test_partial_failure_restores_previous_dns_on_other_interfaces(dns_switcher, monkeypatch):
+    d = dns_switcher
+    interfaces = ["eth0", "wlan0", "eth1", "wg0"]
+    backend = failing_backend(d, monkeypatch, broken="eth1")
+    applier = d.DNSApplier(max_workers=4)
+    previous = ["1.1.1.1", "2606:4700:4700::1111"]
+    assert applier.apply(interfaces, previous)["ok"] == len(interfaces)
+
+    backend.fail = True
+    result = applier.apply(interfaces, ["8.8.8.8"])
+
+    assert result["rolled_back"] and result["ok"] == 0
+    assert not result["interfaces"]["eth1"]["ok"]
+    for interface in interfaces:
+        assert backend.get_dns(interface) == previous
+        assert applier.applied[interface] == previous
+    assert applier.current == previous
+
+
+def test_partial_failure_without_previous_dns_resets_to_dhcp(dns_switcher, monkeypatch):
+    d = dns_switcher
+    backend = failing_backend(d, monkeypatch, broken="eth1")
+    backend.fail = True
+    applier = d.DNSApplier(max_workers=4)
+
+    result = applier.apply(["eth0", "wlan0", "eth1"], ["8.8.8.8"])
+
+    assert result["rolled_back"]
+    assert backend.applied == {}  # reset_dns: kembali ke DHCP/profil
+    assert applier.applied == {} and applier.current is None
@@ -0,0 +1,71 @@
+import asyncio
+
+
+def stub_send(latencies_ms):
+    """_send palsu: setiap server menjawab query ke-i setelah latencies_ms[server][i] ms."""
+    calls = {}
+
+    async def send(dns_server, domain, timeout, cold):
+        index = calls[dns_server] = calls.get(dns_server, -1) + 1
+        latency_ms = latencies_ms[dns_server][index]
+        await asyncio.sleep(latency_ms / 1000)
+        return 0, int(latency_ms * 1e6)  # NOERROR
+
+    return send
+
+
+def test_pruned_server_cannot_win_with_partial_answers(dns_switcher, workdir, monkeypatch):
+    d = dns_switcher
+    leader, pruned = "192.0.2.10", "192.0.2.11"
+    monkeypatch.setitem(d.config, "probe_engine", "async")
+    monkeypatch.setitem(d.config, "early_stop", True)
+    monkeypatch.setitem(d.config, "dns_query_count", 3)
+    monkeypatch.setitem(d.config, "cold_probe_zone", "")
+    engine = d.get_probe_engine()
+    monkeypatch.setattr(engine, "_send", stub_send({leader: [20, 20, 20], pruned: [15, 40, 40]}))
+
+    results = d.probe_round([leader, pruned], "DHCP")
+
+    assert pruned in engine.pruned
+    assert engine.pruned[pruned] > results[leader]
+    assert pruned not in results
+    assert min(results, key=results.get) == leader
+    # Jawaban parsial server yang dihentikan tidak masuk statistik
+    assert d.stats_store.get(pruned) is None
+    assert d.stats_store.get(leader)["sent"] == 3
+
+
+def test_without_early_stop_all_answers_are_scored(dns_switcher, workdir, monkeypatch):
+    d = dns_switcher
+    leader, slower = "192.0.2.20", "192.0.2.21"
+    monkeypatch.setitem(d.config, "probe_engine", "async")
+    monkeypatch.setitem(d.config, "early_stop", False)
+    monkeypatch.setitem(d.config, "dns_query_count", 3)
+    monkeypatch.setitem(d.config, "cold_probe_zone", "")
+    engine = d.get_probe_engine()
+    monkeypatch.setattr(engine, "_send", stub_send({leader: [20, 20, 20], slower: [15, 40, 40]}))
+
+    results = d.probe_round([leader, slower], "DHCP")
+
+    assert engine.pruned == {}
+    assert results[slower] > results[leader]
+
+
+def test_pinned_current_server_is_never_pruned(dns_switcher, workdir, monkeypatch):
+    d = dns_switcher
+    leader, current = "192.0.2.30", "192.0.2.31"
+    monkeypatch.setitem(d.config, "probe_engine", "async")
+    monkeypatch.setitem(d.config, "early_stop", True)
+    monkeypatch.setitem(d.config, "dns_query_count", 3)
+    monkeypatch.setitem(d.config, "cold_probe_zone", "")
+    monkeypatch.setitem(d.config, "switch_policy", {"margin_ms": 20, "margin_pct": 10, "window_s": 0, "min_dwell_s": 0})
+    engine = d.get_probe_engine()
+    monkeypatch.setattr(engine, "_send", stub_send({leader: [32, 32, 32], current: [45, 45, 45]}))
+
+    results = d.probe_round([leader, current], current)
+
+    assert current not in engine.pruned
+    assert results[current] > results[leader]
+    # Selisih 13 ms di bawah margin 20 ms: DNS aktif dipertahankan, bukan diganti karena "tidak ada hasil"
+    switch, reason = d.SwitchPolicy().should_switch(current, leader, results)
+    assert not switch, reason
@@ -0,0 +1,205 @@
+import http.server
+import shutil
+import socket
+import ssl
+import struct
+import subprocess
+import threading
+import time
+
+import dns.message
+import dns.rrset
+import pytest
+
+HOSTNAME = "dns.test"
+
+
+@pytest.fixture(scope="module")
+def tls_files(tmp_path_factory):
+    """Sertifikat self-signed untuk HOSTNAME; dipakai sebagai ca_file oleh prober."""
+    if shutil.which("openssl") is None:
+        pytest.skip("openssl tidak tersedia")
+    path = tmp_path_factory.mktemp("tls")
+    cert, key = str(path / "cert.pem"), str(path / "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1",
+                    "-nodes", "-keyout", key, "-out", cert, "-days", "1", "-subj", f"/CN={HOSTNAME}",
+                    "-addext", f"subjectAltName=DNS:{HOSTNAME}"], check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return cert, context
+
+
+def answer(wire):
+    query = dns.message.from_wire(wire)
+    response = dns.message.make_response(query)
+    response.answer.append(dns.rrset.from_text(query.question[0].name, 300, "IN", "A", "192.0.2.1"))
+    return response.to_wire()
+
+
+def recv_exact(conn, size):
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+class DotServer:
+    """Server DoT minimal; close_after menutup koneksi setelah N jawaban (meniru idle timeout server)."""
+
+    def __init__(self, context, close_after=None, handshake_delay_s=0):
+        self.context = context
+        self.close_after = close_after
+        self.handshake_delay_s = handshake_delay_s
+        self.connections = 0
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                raw, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._handle, args=(raw,), daemon=True).start()
+
+    def _handle(self, raw):
+        time.sleep(self.handshake_delay_s)
+        try:
+            conn = self.context.wrap_socket(raw, server_side=True)
+        except OSError:
+            return  # Klien menolak sertifikat
+        with conn:
+            answered = 0
+            while self.close_after is None or answered < self.close_after:
+                header = recv_exact(conn, 2)
+                if header is None:
+                    return
+                wire = answer(recv_exact(conn, struct.unpack("!H", header)[0]))
+                conn.sendall(struct.pack("!H", len(wire)) + wire)
+                answered += 1
+
+    def close(self):
+        self.sock.close()
+
+
+class DohHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, agar koneksi bisa dipakai ulang
+
+    def setup(self):
+        self.server.connections += 1
+        super().setup()
+
+    def do_POST(self):
+        wire = answer(self.rfile.read(int(self.headers["Content-Length"])))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/dns-message")
+        self.send_header("Content-Length", str(len(wire)))
+        self.end_headers()
+        self.wfile.write(wire)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def prober(dns_switcher, tls_files, monkeypatch):
+    d = dns_switcher
+    cert, _ = tls_files
+
+    def configure(transport, endpoint):
+        monkeypatch.setitem(d.config, "encrypted_probe", {
+            "enabled": True, "transports": [transport], "timeout_s": 2, "ca_file": cert,
+            "endpoints": {"127.0.0.1": {transport: endpoint}}})
+        monkeypatch.setitem(d.config, "dns_query_count", 3)
+        return d.EncryptedProber()
+
+    return configure
+
+
+def test_dot_connection_is_reused_and_handshake_counted_separately(dns_switcher, tls_files, prober, monkeypatch):
+    server = DotServer(tls_files[1], handshake_delay_s=0.05)
+    monkeypatch.setattr(dns_switcher, "DOT_PORT", server.port)
+    encrypted = prober("dot", HOSTNAME)
+
+    encrypted.run_round([])
+    encrypted.run_round([])
+    server.close()
+
+    key = ("dot", "127.0.0.1")
+    assert server.connections == 1
+    assert encrypted.stats[key].sent == 6 and encrypted.stats[key].lost == 0
+    assert encrypted.handshakes[key].sent == 1
+    # Handshake (tertunda 50 ms) tidak ikut dalam latency query
+    assert encrypted.handshakes[key].ewma_ms >= 50
+    assert encrypted.stats[key].ewma_ms < 50
+
+
+def test_dot_reconnects_once_when_server_closes_idle_connection(dns_switcher, tls_files, prober, monkeypatch):
+    server = DotServer(tls_files[1], close_after=2)
+    monkeypatch.setattr(dns_switcher, "DOT_PORT", server.port)
+    encrypted = prober("dot", HOSTNAME)
+
+    encrypted.run_round([])
+    server.close()
+
+    key = ("dot", "127.0.0.1")
+    assert encrypted.stats[key].sent == 3 and encrypted.stats[key].lost == 0
+    assert server.connections == 2
+    assert encrypted.handshakes[key].sent == 2
+
+
+def test_doh_connection_is_reused(tls_files, prober):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), DohHandler)
+    server.connections = 0
+    server.daemon_threads = True
+    server.socket = tls_files[1].wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    encrypted = prober("doh", f"https://{HOSTNAME}:{server.server_port}/dns-query")
+
+    encrypted.run_round([])
+    encrypted.run_round([])
+    server.shutdown()
+    server.server_close()
+
+    key = ("doh", "127.0.0.1")
+    assert encrypted.stats[key].sent == 6 and encrypted.stats[key].lost == 0
+    assert server.connections == 1
+    assert encrypted.handshakes[key].sent == 1
+
+
+def test_untrusted_certificate_is_a_loss(dns_switcher, tls_files, prober, monkeypatch):
+    server = DotServer(tls_files[1])
+    monkeypatch.setattr(dns_switcher, "DOT_PORT", server.port)
+    encrypted = prober("dot", "bukan.dns.test")  # SNI tidak cocok dengan sertifikat
+
+    encrypted.run_round([])
+    server.close()
+
+    assert encrypted.stats[("dot", "127.0.0.1")].lost == 3
+
+
+def test_background_round_reuses_workers_and_publishes_summary(dns_switcher, tls_files, prober, monkeypatch):
+    d = dns_switcher
+    server = DotServer(tls_files[1], handshake_delay_s=0.2)
+    monkeypatch.setattr(d, "DOT_PORT", server.port)
+    published = []
+    monkeypatch.setattr(d, "update_dashboard", lambda push=True, **fields: published.append(fields))
+    encrypted = prober("dot", HOSTNAME)
+
+    future = encrypted.submit([])
+    # Ronde sebelumnya belum selesai (handshake tertunda): tidak ditumpuk
+    assert encrypted.submit([]) is None
+    future.result(timeout=5)
+    workers = encrypted.workers
+    encrypted.submit([]).result(timeout=5)
+    encrypted.close()
+    server.close()
+
+    assert encrypted.workers is workers
+    assert encrypted.stats[("dot", "127.0.0.1")].sent == 6
+    assert [fields["encrypted"]["127.0.0.1"]["dot"]["sent"] for fields in published] == [3, 6]
@@ -0,0 +1,23 @@
+def drain(q):
+    messages = []
+    while not q.empty():
+        messages.append(q.get_nowait())
+    return messages
+
+
+def test_slow_subscriber_is_closed_and_can_resubscribe(dns_switcher):
+    d = dns_switcher
+    broker = d.EventBroker()
+    slow = broker.subscribe()
+    for i in range(broker.QUEUE_SIZE + 1):
+        broker.publish({"n": i})
+
+    # Antrean penuh: pesan tertunda dibuang dan hanya sinyal penutup yang tersisa
+    assert slow not in broker.subscribers
+    assert drain(slow) == [None]
+    broker.publish({"n": "late"})
+    assert drain(slow) == []
+
+    fresh = broker.subscribe()
+    broker.publish({"n": "after"})
+    assert drain(fresh) == ['{"n": "after"}']
@@ -0,0 +1,61 @@
+import asyncio
+
+import dns.flags
+import dns.message
+import dns.rrset
+
+
+def make_forwarder(d, monkeypatch):
+    """Forwarder tanpa socket; _forward palsu menjawab A 192.0.2.1 dan mencatat query upstream."""
+    forwarder = d.DNSForwarder()
+    settings = d.config["forwarder"]
+    forwarder.cache = d.AnswerCache(settings["cache_size"], settings["max_ttl_s"], settings["negative_ttl_s"], settings["serve_stale_s"])
+    upstream = []
+
+    async def forward(key, query):
+        upstream.append(query)
+        await asyncio.sleep(0.01)
+        response = dns.message.make_response(query)
+        response.answer.append(dns.rrset.from_text(query.question[0].name, 300, "IN", "A", "192.0.2.1"))
+        wire = response.to_wire()
+        forwarder.cache.put(key, wire, 300, d.time.monotonic())
+        return wire
+
+    monkeypatch.setattr(forwarder, "_forward", forward)
+    return forwarder, upstream
+
+
+def ask(forwarder, queries):
+    async def run():
+        return await asyncio.gather(*(forwarder.resolve(query.to_wire()) for query in queries))
+    return [dns.message.from_wire(wire) for wire in asyncio.run(run())]
+
+
+def test_coalesced_and_cached_answers_echo_each_clients_question(dns_switcher, monkeypatch):
+    forwarder, upstream = make_forwarder(dns_switcher, monkeypatch)
+    queries = [dns.message.make_query(name, "A") for name in ("ExAmPlE.com.", "eXaMpLe.CoM.")]
+
+    responses = ask(forwarder, queries)
+    responses += ask(forwarder, [dns.message.make_query("EXAMPLE.COM.", "A")])  # dari cache
+
+    assert len(upstream) == 1
+    for query, response in zip(queries + [None], responses):
+        expected = query.question[0].name.to_text() if query else "EXAMPLE.COM."
+        assert response.question[0].name.to_text() == expected
+        assert response.answer[0][0].address == "192.0.2.1"
+    assert responses[0].id == queries[0].id and responses[1].id == queries[1].id
+
+
+def test_do_and_cd_queries_do_not_share_answers(dns_switcher, monkeypatch):
+    forwarder, upstream = make_forwarder(dns_switcher, monkeypatch)
+    plain = dns.message.make_query("example.com.", "A", use_edns=0)
+    dnssec = dns.message.make_query("example.com.", "A", want_dnssec=True)
+    checking_disabled = dns.message.make_query("example.com.", "A", use_edns=0)
+    checking_disabled.flags |= dns.flags.CD
+
+    ask(forwarder, [plain, dnssec, checking_disabled])
+    ask(forwarder, [plain, dnssec, checking_disabled])  # ketiganya sudah dicache terpisah
+
+    assert len(upstream) == 3
+    assert sum(bool(query.ednsflags & dns.flags.DO) for query in upstream) == 1
+    assert sum(bool(query.flags & dns.flags.CD) for query in upstream) == 1
@@ -0,0 +1,89 @@
+import pytest
+
+
+@pytest.fixture
+def processes(dns_switcher, monkeypatch):
+    """Tabel proses palsu: pid -> [nama, comm, starttime]; mencatat PID yang nama/stat-nya dibaca."""
+    import psutil
+    d = dns_switcher
+    table, reads, stat_reads = {}, [], []
+
+    def process_name(pid):
+        reads.append(pid)
+        return table[pid][0] if pid in table else None
+
+    monkeypatch.setattr(psutil, "pids", lambda: list(table))
+    monkeypatch.setattr(d.GameWatcher, "_process_name", staticmethod(process_name))
+
+    def stat_signature(pid):
+        stat_reads.append(pid)
+        return tuple(table[pid][1:]) if pid in table else None
+
+    monkeypatch.setattr(d.GameWatcher, "_stat_signature", staticmethod(stat_signature))
+    monkeypatch.setattr(d.sys, "platform", "linux")
+    return table, reads, stat_reads
+
+
+@pytest.fixture
+def clock(dns_switcher, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dns_switcher.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_poll_mode_rereads_names_after_exec_or_rename(dns_switcher, processes, clock):
+    d = dns_switcher
+    table, reads, _ = processes
+    table.update({100: ["launcher", b"launcher", b"5"], 200: ["bash", b"bash", b"7"]})
+    watcher = d.GameWatcher()
+    assert watcher.is_game_running() is False
+    assert sorted(reads) == [100, 200]
+
+    # Tidak ada perubahan: nama tidak dibaca ulang
+    reads.clear()
+    clock[0] += d.GAME_NAME_REFRESH_S
+    assert watcher.is_game_running() is False
+    assert reads == []
+
+    # Launcher exec menjadi game dengan PID yang sama
+    table[100] = ["valorant.exe", b"valorant.exe", b"5"]
+    clock[0] += d.GAME_NAME_REFRESH_S
+    assert watcher.is_game_running() is True
+    assert reads == [100]
+
+    # PID dipakai ulang oleh proses lain (start time berubah, comm kebetulan sama)
+    reads.clear()
+    table[100] = ["notgame", b"valorant.exe", b"9"]
+    clock[0] += d.GAME_NAME_REFRESH_S
+    assert watcher.is_game_running() is False
+    assert reads == [100]
+
+
+def test_poll_mode_reads_stat_only_for_new_pids_between_sweeps(dns_switcher, processes, clock):
+    table, reads, stat_reads = processes
+    table.update({100: ["launcher", b"launcher", b"5"], 200: ["bash", b"bash", b"7"]})
+    watcher = dns_switcher.GameWatcher()
+    watcher.is_game_running()
+
+    stat_reads.clear()
+    table[300] = ["vim", b"vim", b"11"]
+    del table[200]
+    for _ in range(5):
+        watcher.is_game_running()
+    assert stat_reads == [300]
+    assert set(watcher.signatures) == {100, 300}
+
+
+def test_other_platforms_reread_names_periodically(dns_switcher, processes, clock, monkeypatch):
+    d = dns_switcher
+    table, reads, _ = processes
+    monkeypatch.setattr(d.sys, "platform", "win32")
+    table[100] = ["launcher.exe", None, None]
+    watcher = d.GameWatcher()
+    watcher.is_game_running()
+
+    table[100][0] = "fortnite.exe"
+    assert watcher.is_game_running() is False  # Belum waktunya membaca ulang
+    clock[0] += d.GAME_NAME_REFRESH_S
+    assert watcher.is_game_running() is True
+    assert reads == [100, 100]
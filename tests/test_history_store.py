@@ -0,0 +1,118 @@
+import csv
+from datetime import datetime
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "dns", "latency_ms"])
+        writer.writerows(rows)
+
+
+def count_samples(store):
+    with store.lock:
+        return store._connect().execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+
+
+def test_csv_history_is_migrated_once(dns_switcher, workdir):
+    d = dns_switcher
+    base = datetime(2024, 5, 1, 12, 0, 0)
+    write_csv("history.csv", [
+        [base.replace(second=0).isoformat(), "1.1.1.1", "12"],
+        [base.replace(second=5).isoformat(), "8.8.8.8", "not-a-number"],  # Baris rusak dilewati
+        ["bukan-tanggal", "8.8.8.8", "20"],
+        [base.replace(second=10).isoformat(), "9.9.9.9"],
+        [base.replace(second=15).isoformat(), "8.8.8.8", "18"],
+    ])
+
+    store = d.HistoryStore("history.db", csv_path="history.csv")
+    assert store.tail(10) == [(base.timestamp(), "1.1.1.1", 12), (base.replace(second=15).timestamp(), "8.8.8.8", 18)]
+    store.append("9.9.9.9", 25, ts=base.replace(second=20).timestamp())
+    store.close()
+
+    # CSV lama masih ada (dan bahkan bertambah), tapi tidak diimpor ulang saat dibuka lagi
+    with open("history.csv", "a", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow([base.replace(second=30).isoformat(), "1.0.0.1", "30"])
+    reopened = d.HistoryStore("history.db", csv_path="history.csv")
+    assert count_samples(reopened) == 3
+    assert [row[1] for row in reopened.tail(10)] == ["1.1.1.1", "8.8.8.8", "9.9.9.9"]
+    reopened.close()
+
+
+def test_missing_csv_leaves_store_empty(dns_switcher, workdir):
+    store = dns_switcher.HistoryStore("history.db", csv_path="history.csv")
+    assert store.tail(10) == []
+    store.close()
+
+
+DAY = 86400
+T0 = 1_700_000_000 // DAY * DAY  # Awal hari UTC, jadi juga awal bucket 1m/1h/1d
+
+
+def rollup_rows(store, tier):
+    return store.rollups(tier, 0, T0 + 30 * DAY)
+
+
+def test_rollup_covers_only_complete_buckets(dns_switcher, workdir):
+    store = dns_switcher.HistoryStore("history.db")
+    for i in range(20):
+        store.append("1.1.1.1", 10 + i, ts=T0 + i * 2.9)  # 0..55.1 s: bucket T0
+    store.append("1.1.1.1", 50, ts=T0 + 60)  # Tepat di batas: bucket berikutnya
+    store.append("1.1.1.1", 70, ts=T0 + 119.9)
+    store.append("1.1.1.1", 99, ts=T0 + 120)  # Bucket yang belum lengkap
+
+    store.rollup(now=T0 + 150)
+
+    assert rollup_rows(store, "1m") == [(T0, 20, 10, 19.5, 28, 29), (T0 + 60, 2, 50, 60.0, 70, 70)]
+    assert rollup_rows(store, "1h") == [] and rollup_rows(store, "1d") == []
+    store.close()
+
+
+def test_rollup_resumes_from_high_water_mark(dns_switcher, workdir):
+    store = dns_switcher.HistoryStore("history.db")
+    store.append("1.1.1.1", 10, ts=T0 + 5)
+    store.rollup(now=T0 + 60)
+    store.close()
+
+    store = dns_switcher.HistoryStore("history.db")
+    store.append("1.1.1.1", 500, ts=T0 + 30)  # Di bawah watermark: bucket lama tidak dihitung ulang
+    store.append("1.1.1.1", 20, ts=T0 + 65)
+    store.rollup(now=T0 + 125)
+
+    assert rollup_rows(store, "1m") == [(T0, 1, 10, 10.0, 10, 10), (T0 + 60, 1, 20, 20.0, 20, 20)]
+    with store.lock:
+        watermark = store._connect().execute("SELECT value FROM meta WHERE key = 'rollup_1m_until'").fetchone()[0]
+    assert float(watermark) == T0 + 120
+    store.close()
+
+
+def test_rollup_prunes_each_tier_by_its_retention(dns_switcher, workdir, monkeypatch):
+    d = dns_switcher
+    monkeypatch.setitem(d.config, "history_retention_days", {"raw": 2, "1m": 1, "1h": 2, "1d": 1825})
+    store = d.HistoryStore("history.db")
+    for hour in range(3 * 24):
+        store.append("1.1.1.1", 10, ts=T0 + hour * 3600)
+    now = T0 + 3 * DAY + 10
+
+    store.rollup(now=now)
+
+    assert [row[0] for row in store.range(0)] == [T0 + hour * 3600 for hour in range(25, 3 * 24)]
+    assert [row[0] for row in rollup_rows(store, "1m")] == [T0 + hour * 3600 for hour in range(49, 3 * 24)]
+    assert [row[0] for row in rollup_rows(store, "1h")] == [T0 + hour * 3600 for hour in range(25, 3 * 24)]
+    assert rollup_rows(store, "1d") == [(T0 + day * DAY, 24, 10, 10.0, 10, 10) for day in range(3)]
+    store.close()
+
+
+def test_raw_samples_are_kept_until_every_tier_has_them(dns_switcher, workdir, monkeypatch):
+    d = dns_switcher
+    monkeypatch.setitem(d.config, "history_retention_days", {"raw": 0, "1m": 14, "1h": 180, "1d": 1825})
+    store = d.HistoryStore("history.db")
+    for ts in (T0 + 100, T0 + DAY + 100, T0 + DAY + 7200):
+        store.append("1.1.1.1", 10, ts=ts)
+
+    store.rollup(now=T0 + DAY + 7300)
+
+    # Hari kedua belum lengkap di tier 1d, jadi sampelnya tetap disimpan walau retensi raw 0
+    assert [row[0] for row in store.range(0)] == [T0 + DAY + 100, T0 + DAY + 7200]
+    assert [row[0] for row in rollup_rows(store, "1d")] == [T0]
+    store.close()
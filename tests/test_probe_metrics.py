@@ -0,0 +1,31 @@
+import threading
+import time
+
+import dns.resolver
+
+
+def test_threaded_probes_are_counted_in_flight(dns_switcher, monkeypatch):
+    d = dns_switcher
+    monkeypatch.setitem(d.config, "probe_engine", "threads")
+    monkeypatch.setitem(d.config, "threads", 4)
+    monkeypatch.setitem(d.config, "dns_query_count", 2)
+    monkeypatch.setitem(d.config, "dns_query_delay_s", 0)
+    monkeypatch.setitem(d.config, "cold_probe_zone", "")
+    gauge = d.PROBES_IN_FLIGHT
+    base = gauge.values.get((), 0)
+    seen = []
+    barrier = threading.Barrier(4, timeout=5)
+
+    def resolve(self, qname, rdtype):
+        barrier.wait()  # Keempat server sedang di-query bersamaan
+        seen.append(gauge.values.get((), 0) - base)
+        time.sleep(0.01)
+        if self.nameservers[0].endswith(".4"):
+            raise dns.resolver.Timeout()
+
+    monkeypatch.setattr(dns.resolver.Resolver, "resolve", resolve)
+    warm, _ = d.collect_probe_samples([f"192.0.2.{i}" for i in range(1, 5)])
+
+    assert warm["192.0.2.4"] == [None, None]
+    assert max(seen) == 4
+    assert gauge.values.get((), 0) == base  # Query yang gagal juga dikurangi
@@ -0,0 +1,89 @@
+import http.server
+import json
+import threading
+
+import pytest
+
+
+class ResolverListHandler(http.server.BaseHTTPRequestHandler):
+    """Sajikan server.body dengan ETag server.etag; balas 304 jika If-None-Match cocok."""
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == self.server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = self.server.body.encode()
+        self.send_response(200)
+        self.send_header("ETag", self.server.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def list_server():
+    server = http.server.HTTPServer(("127.0.0.1", 0), ResolverListHandler)
+    server.requests, server.etag, server.body = [], '"v1"', json.dumps(["192.0.2.53", "2001:db8:0::53"])
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_parse_resolver_list_formats(dns_switcher):
+    parse = dns_switcher.parse_resolver_list
+    from_json = '{"ipv4": ["192.0.2.1", "192.0.2.1"], "ipv6": ["2001:DB8:0:0::1"], "servers": ["bukan-ip"]}'
+    from_text = "192.0.2.1  # utama\n\n224.0.0.1\n0.0.0.0\n2001:db8::1\n"
+
+    assert parse(from_json) == ["192.0.2.1", "2001:db8::1"]
+    assert parse(from_text) == ["192.0.2.1", "2001:db8::1"]
+    with pytest.raises(ValueError):
+        parse('"bukan daftar"')
+
+
+def test_sync_uses_etag_and_disk_cache(dns_switcher, workdir, list_server, monkeypatch):
+    d = dns_switcher
+    url = f"http://127.0.0.1:{list_server.server_port}/resolvers.json"
+    monkeypatch.setitem(d.config, "dns_update_url", url)
+    for name in ("REMOTE_DNS", "DNS_IPV4", "DNS_IPV6"):
+        monkeypatch.setattr(d, name, getattr(d, name))
+
+    sync = d.ResolverListSync(str(workdir / "cache.json"))
+    assert sync.sync() is True
+    assert d.REMOTE_DNS == ["192.0.2.53", "2001:db8::53"]
+    assert "192.0.2.53" in d.DNS_IPV4 and "2001:db8::53" in d.DNS_IPV6
+
+    # Daftar tidak berubah: conditional GET dijawab 304
+    assert sync.sync() is False
+    assert list_server.requests[-1]["If-None-Match"] == '"v1"'
+
+    # Instance baru (mis. setelah restart) memakai ETag dari cache di disk
+    restarted = d.ResolverListSync(str(workdir / "cache.json"))
+    restarted._load_cache()
+    assert restarted.sync() is False
+
+    list_server.etag, list_server.body = '"v2"', "192.0.2.99\n"
+    assert restarted.sync() is True
+    assert d.REMOTE_DNS == ["192.0.2.99"]
+    with open(workdir / "cache.json", encoding="utf-8") as f:
+        assert json.load(f)["etag"] == '"v2"'
+
+
+def test_sync_rejects_empty_list_and_keeps_previous(dns_switcher, workdir, list_server, monkeypatch):
+    d = dns_switcher
+    monkeypatch.setitem(d.config, "dns_update_url", f"http://127.0.0.1:{list_server.server_port}/")
+    for name in ("DNS_IPV4", "DNS_IPV6"):
+        monkeypatch.setattr(d, name, getattr(d, name))
+    monkeypatch.setattr(d, "REMOTE_DNS", ["192.0.2.7"])
+    list_server.body = "bukan-ip\n"
+
+    sync = d.ResolverListSync(str(workdir / "cache.json"))
+    with pytest.raises(ValueError):
+        sync.sync()
+    assert d.REMOTE_DNS == ["192.0.2.7"]
+    assert not (workdir / "cache.json").exists()
@@ -0,0 +1,46 @@
+import math
+import random
+
+
+def reference_stats(window, quantile):
+    answered = sorted(value for value in window if value is not None)
+    summary = {"samples": len(window), "loss": round(1 - len(answered) / len(window), 4)}
+    if answered:
+        summary.update({
+            "min_ms": round(answered[0], 2),
+            "mean_ms": round(math.fsum(answered) / len(answered), 2),
+            "p50_ms": round(quantile(answered, 0.50), 2),
+            "p90_ms": round(quantile(answered, 0.90), 2),
+            "p99_ms": round(quantile(answered, 0.99), 2),
+            "max_ms": round(answered[-1], 2),
+        })
+    return summary
+
+
+def test_ring_matches_plain_list_after_wraparound(dns_switcher, monkeypatch):
+    d = dns_switcher
+    monkeypatch.setitem(d.config, "stats_window", 7)
+    ring = d.ServerStats().window
+    rng = random.Random(7)
+    samples = []
+
+    for i in range(7 * 4 + 3):
+        # Kelipatan 0.25 terwakili persis di float32; sesekali query hilang
+        latency = None if rng.random() < 0.2 else rng.randrange(4, 800) / 4
+        samples.append((1_700_000_000 + i, latency))
+        ring.append(latency, ts=samples[-1][0])
+        window = samples[-7:]
+
+        assert len(ring) == len(window)
+        assert ring.items() == window
+        assert ring.stats() == reference_stats([latency for _, latency in window], d.quantile)
+
+    assert len(ring.ts) == len(ring.ms) == 7  # Array tidak tumbuh setelah penuh
+
+
+def test_ring_of_one_keeps_only_latest(dns_switcher):
+    ring = dns_switcher.SampleRing(1)
+    for i, latency in enumerate([10.5, None, 3.25]):
+        ring.append(latency, ts=i)
+    assert ring.items() == [(2.0, 3.25)]
+    assert ring.stats()["samples"] == 1
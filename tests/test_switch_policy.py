@@ -0,0 +1,93 @@
+def probe_results(d, samples):
+    d.stats_store.record_scores(d.scoring_engine.score(samples))
+    return d.scoring_engine.score(samples)
+
+
+def test_lossy_active_server_is_replaced_by_steady_one(dns_switcher, monkeypatch):
+    d = dns_switcher
+    monkeypatch.setitem(d.config, "switch_policy", {"margin_ms": 5, "margin_pct": 10, "window_s": 0, "min_dwell_s": 0})
+    monkeypatch.setitem(d.config, "cold_probe_zone", "")
+    policy = d.SwitchPolicy()
+    lossy, steady = "198.51.100.1", "198.51.100.2"
+    for _ in range(5):
+        results = probe_results(d, {lossy: [10, None, None], steady: [20, 20, 20]})
+    assert results[lossy] > d.config["dns_query_timeout_s"] * 1000
+    switch, reason = policy.should_switch(lossy, steady, results)
+    assert switch, reason
+
+
+def test_dead_server_ranks_below_partially_answering_server(dns_switcher):
+    d = dns_switcher
+    scheduler = d.ProbeScheduler()
+    lossy, dead = "198.51.100.3", "198.51.100.4"
+    results = d.scoring_engine.score({lossy: [10, None, None], dead: [None, None, None]})
+    scheduler.update([lossy, dead], results)
+    assert scheduler.arms[dead][1] > scheduler.arms[lossy][1]
+
+
+def test_consistency_window_is_per_candidate(dns_switcher, monkeypatch):
+    d = dns_switcher
+    monkeypatch.setitem(d.config, "switch_policy", {"margin_ms": 5, "margin_pct": 10, "window_s": 120, "min_dwell_s": 0})
+    now = [1000.0]
+    monkeypatch.setattr(d.time, "monotonic", lambda: now[0])
+    policy = d.SwitchPolicy()
+    current, first, second = "198.51.100.5", "198.51.100.6", "198.51.100.7"
+    results = {current: 100.0, first: 20.0, second: 20.0}
+
+    assert not policy.should_switch(current, first, results)[0]
+    now[0] += 121
+    # Kandidat lain yang baru sekali unggul belum boleh dipilih
+    assert not policy.should_switch(current, second, results)[0]
+    now[0] += 121
+    assert policy.should_switch(current, second, results)[0]
+
+
+def test_server_that_lost_one_round_is_probed_again(dns_switcher, monkeypatch):
+    d = dns_switcher
+    monkeypatch.setitem(d.config, "probe_max_stale_rounds", 30)
+    scheduler = d.ProbeScheduler()
+    servers = [f"198.51.100.{100 + i}" for i in range(51)]
+    latency = {server: 15.0 + 3 * i for i, server in enumerate(servers)}
+    fastest = servers[0]
+    probes = 0
+    for round_no in range(200):
+        selected = scheduler.select(servers, 10)
+        # Server tercepat kehilangan semua query di ronde pertama saja
+        scheduler.update(selected, {s: latency[s] for s in selected if round_no or s != fastest})
+        probes += fastest in selected
+    assert probes > 150
+    assert scheduler.arms[fastest][1] == min(arm[1] for arm in scheduler.arms.values())
+
+
+def test_censored_bound_replaces_previous_mean(dns_switcher):
+    d = dns_switcher
+    scheduler = d.ProbeScheduler()
+    server = "198.51.100.8"
+    scheduler.update([server], {server: 50.0})
+    # Batas bawah lebih kecil dari rata-rata lama tetap menarik rata-rata turun
+    scheduler.update([server], {}, censored={server: 30.0})
+    assert 30.0 < scheduler.arms[server][1] < 50.0
+
+
+def test_missing_active_server_skips_dwell_only_after_consecutive_rounds(dns_switcher, monkeypatch):
+    d = dns_switcher
+    monkeypatch.setitem(d.config, "switch_policy",
+                        {"margin_ms": 5, "margin_pct": 10, "window_s": 120, "min_dwell_s": 600, "missing_rounds": 3})
+    now = [1000.0]
+    monkeypatch.setattr(d.time, "monotonic", lambda: now[0])
+    policy = d.SwitchPolicy()
+    current, best = "198.51.100.8", "198.51.100.9"
+    # Masih DHCP: langsung pasang DNS terbaik
+    assert policy.should_switch("DHCP", best, {best: 20.0})[0]
+    policy.record_switch()
+
+    missing = {best: 20.0}
+    assert not policy.should_switch(current, best, missing)[0]
+    assert not policy.should_switch(current, best, missing)[0]
+    # Satu ronde dengan jawaban dari DNS aktif mengulang hitungan
+    assert not policy.should_switch(current, best, {current: 21.0, best: 20.0})[0]
+    assert not policy.should_switch(current, best, missing)[0]
+    assert not policy.should_switch(current, best, missing)[0]
+    switch, reason = policy.should_switch(current, best, missing)
+    assert switch and "3 ronde" in reason
+    assert now[0] - policy.last_switch < d.config["switch_policy"]["min_dwell_s"]
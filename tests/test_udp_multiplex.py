@@ -0,0 +1,76 @@
+import asyncio
+import socket
+import threading
+
+import pytest
+
+
+def reply(query, query_id=None, rcode=0, response=True):
+    """Balasan DNS minimal: query yang sama dengan bit QR, rcode dan (opsional) ID lain."""
+    data = bytearray(query)
+    if query_id is not None:
+        data[0:2] = query_id.to_bytes(2, "big")
+    if response:
+        data[2] |= 0x80
+    data[3] = (data[3] & 0xF0) | rcode
+    return bytes(data)
+
+
+@pytest.fixture
+def loopback_server():
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(("127.0.0.1", 0))
+    server.settimeout(5)
+    impostor = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        impostor.bind(("127.0.0.2", 0))
+    except OSError:
+        pytest.skip("127.0.0.2 tidak bisa dipakai di sistem ini")
+    yield server, impostor
+    server.close()
+    impostor.close()
+
+
+def test_replies_are_matched_by_id_and_source(dns_switcher, monkeypatch, loopback_server):
+    d = dns_switcher
+    server, impostor = loopback_server
+    monkeypatch.setitem(d.config, "dns_query_port", server.getsockname()[1])
+    sent_ids = []
+
+    def serve():
+        query, client = server.recvfrom(512)
+        query_id = int.from_bytes(query[:2], "big")
+        sent_ids.append(query_id)
+        server.sendto(reply(query, query_id ^ 0x5A5A), client)  # ID lain
+        server.sendto(reply(query, response=False), client)  # Bukan response (QR=0)
+        server.sendto(b"\x00", client)  # Terlalu pendek
+        impostor.sendto(reply(query), client)  # ID benar, alamat sumber lain
+        threading.Event().wait(0.05)
+        server.sendto(reply(query, rcode=3), client)  # Balasan asli: NXDOMAIN
+        server.sendto(reply(query, rcode=0), client)  # Duplikat
+        # Query kedua hanya menerima duplikat basi dari query pertama
+        second, client = server.recvfrom(512)
+        sent_ids.append(int.from_bytes(second[:2], "big"))
+        server.sendto(reply(second, query_id), client)
+
+    async def run():
+        prober = d.UDPMultiplexProber(asyncio.get_running_loop())
+        prober._allocate_id = lambda addr, ids=iter([0x1234, 0xBEEF]): next(ids)  # ID query berbeda, deterministik
+        try:
+            first = await prober.query("127.0.0.1", "example.com", "A", timeout=2)
+            second = await prober.query("127.0.0.1", "example.com", "A", timeout=0.2)
+            return first, second, dict(prober.pending)
+        finally:
+            prober.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    first, second, pending = asyncio.run(run())
+    thread.join(5)
+
+    assert sent_ids == [0x1234, 0xBEEF]
+    rcode, latency_ns = first
+    assert rcode == 3  # Bukan rcode 0 dari balasan palsu yang tiba lebih dulu
+    assert latency_ns >= 50e6
+    assert second is None
+    assert pending == {}